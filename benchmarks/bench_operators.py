@@ -0,0 +1,54 @@
+"""
+Operator and pipeline benchmarks for pytest-benchmark.
+
+These are not collected by the regular test run; run them explicitly with
+
+    pytest benchmarks/bench_operators.py --benchmark-autosave
+
+and compare saved runs with `pytest-benchmark compare`.
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from io import BytesIO
+from image_utils.bench import CASES, DEFAULT_FORMATS, DEFAULT_MODES, make_image
+from image_utils.image_io import mode_for_format, open_image, save_image
+
+SIZES = (256, 1024, 4096)
+
+@pytest.fixture(scope='module', params=[(size, mode) for size in SIZES for mode in DEFAULT_MODES],
+                ids=lambda param: f'{param[0]}-{param[1]}')
+def image(request):
+    size, mode = request.param
+    return make_image(size, mode)
+
+@pytest.mark.parametrize('case', list(CASES))
+def test_case(benchmark, image, case):
+    transformer = CASES[case](image.size)
+    benchmark.group = f'{case}'
+    benchmark.extra_info['bytes'] = len(image.tobytes())
+    benchmark(lambda: transformer(image).load())
+
+def _encode(image, format):
+    if mode_for_format(image, format) != image.mode:
+        # Measure the encoder on modes it writes, not save_image's conversion
+        pytest.skip(f'{format} cannot store {image.mode} images')
+    buffer = BytesIO()
+    try:
+        save_image(image, buffer, format=format)
+    except (OSError, KeyError, ValueError):
+        pytest.skip(f'{format} cannot store {image.mode} images')
+    return buffer.getvalue()
+
+@pytest.mark.parametrize('format', DEFAULT_FORMATS)
+def test_encode(benchmark, image, format):
+    _encode(image, format)
+    benchmark.group = f'encode-{format}'
+    benchmark(_encode, image, format)
+
+@pytest.mark.parametrize('format', DEFAULT_FORMATS)
+def test_decode(benchmark, image, format):
+    data = _encode(image, format)
+    benchmark.group = f'decode-{format}'
+    benchmark(lambda: open_image(BytesIO(data)).load())
@@ -0,0 +1,33 @@
+"""
+CLI start-up time budget.
+
+Wall-clock budgets depend on the machine and its load, so this is not collected by the regular
+test run (which only checks that the heavy modules stay deferred); run it explicitly with
+
+    pytest benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time of image_utils.cli, in microseconds. Importing it takes about 70 ms
+# here (mostly click); eager operator, PIL, tkinter and metadata imports took about 190 ms.
+IMPORT_BUDGET_US = 150_000
+
+def cli_import_time():
+    # The cumulative time of image_utils.cli, from `python -X importtime`
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import image_utils.cli'],
+                            capture_output=True, text=True, env=env, cwd=ROOT)
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.rstrip().endswith('| image_utils.cli'):
+            return int(line.split('|')[1])
+    raise AssertionError(f"image_utils.cli was not imported:\n{result.stderr}")
+
+def test_cli_import_time_budget():
+    # Take the best of a few runs to keep the check stable on busy machines
+    best = min(cli_import_time() for _ in range(3))
+
+    assert best < IMPORT_BUDGET_US
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image
+from typing import Any, AsyncGenerator, AsyncIterable, AsyncIterator, Deque, Dict, Iterable, Optional, Union
+from .core.image_transformer import ImageTransformer
+from .image_io import open_image, save_image
+
+DEFAULT_WORKERS = 4
+
+# Paths, encoded bytes, images, or async readers with an awaitable read() (e.g. aiohttp's
+# StreamReader or Starlette's UploadFile)
+Source = Union[str, 'os.PathLike[str]', bytes, bytearray, memoryview, Image.Image, Any]
+
+class Cancelled(Exception):
+    """Raised in a worker thread when the request it is processing was cancelled."""
+
+class AsyncRunner:
+    """
+    Runs pipelines from asyncio code without blocking the event loop.
+
+    Decoding, transforming and encoding run on a fixed pool of threads (Pillow releases the
+    GIL for most of this work), input bytes are read without blocking the loop, and at most
+    `max_pending` requests per event loop are admitted at a time; further requests wait for
+    a slot, so a burst of clients cannot queue unbounded work.
+
+    Cancelling a request (e.g. because the client disconnected) releases its slot at once, and
+    the worker thread stops before the next transformer of the pipeline instead of finishing it.
+
+    Attributes:
+        workers (int): Number of worker threads.
+        max_pending (int): Maximum number of requests admitted at a time, per event loop.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_pending: Optional[int] = None):
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-utils-aio')
+        # Semaphores belong to one event loop, so each loop gets its own
+        self._semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = \
+            weakref.WeakKeyDictionary()
+
+    async def run(self, transformer: ImageTransformer, source: Source, format: Optional[str] = None,
+                  opaque: bool = False, encoder: Optional[Dict[str, Any]] = None) -> Union[Image.Image, bytes]:
+        """
+        Apply a transformer to one source.
+
+        Args:
+            transformer (ImageTransformer): The transformer to apply.
+            source (Source): An image path, encoded image bytes, an image, or an async reader.
+            format (Optional[str]): If given, return the result encoded in this format.
+            opaque (bool): Convert the encoded output to an opaque format. Default is False.
+            encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+
+        Returns:
+            Union[Image.Image, bytes]: The transformed image, or its encoded bytes.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(loop):
+            data = await read_source(source)
+            cancelled = threading.Event()
+            future = loop.run_in_executor(self._executor, _process, transformer, data, format, opaque,
+                                          encoder, cancelled)
+            try:
+                return await future
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    async def map(self, transformer: ImageTransformer,
+                  sources: Union[Iterable[Source], AsyncIterable[Source]],
+                  ordered: bool = True, format: Optional[str] = None, opaque: bool = False,
+                  encoder: Optional[Dict[str, Any]] = None) -> AsyncIterator[Union[Image.Image, bytes]]:
+        """
+        Apply a transformer to many sources, yielding the results as an async iterator.
+
+        Sources are pulled lazily, keeping at most `max_pending` of them in flight. Leaving
+        the loop early (or cancelling the consumer) cancels the requests still in flight.
+
+        Args:
+            transformer (ImageTransformer): The transformer to apply.
+            sources (Union[Iterable[Source], AsyncIterable[Source]]): The sources to process.
+            ordered (bool): Yield results in input order (True) or as completed (False).
+            format (Optional[str]): If given, yield the results encoded in this format.
+            opaque (bool): Convert the encoded outputs to an opaque format. Default is False.
+            encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+
+        Yields:
+            Union[Image.Image, bytes]: The transformed images, or their encoded bytes.
+        """
+        pending: Deque[asyncio.Task] = deque()
+        iterator = _aiter(sources)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_pending:
+                    try:
+                        source = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.append(asyncio.ensure_future(
+                        self.run(transformer, source, format=format, opaque=opaque, encoder=encoder)))
+                if not pending:
+                    return
+                if ordered:
+                    task = pending.popleft()
+                    yield await task
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        pending.remove(task)
+                    for task in done:
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            await iterator.aclose()
+
+    def close(self) -> None:
+        """Stop the worker threads once the pending work is done."""
+        self._executor.shutdown()
+
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+        return semaphore
+
+    async def __aenter__(self) -> 'AsyncRunner':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+_default_runner: Optional[AsyncRunner] = None
+_default_lock = threading.Lock()
+
+def default_runner() -> AsyncRunner:
+    """Return the runner shared by `Pipeline.arun` and `Pipeline.amap`, creating it on first use."""
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = AsyncRunner()
+        return _default_runner
+
+async def read_source(source: Source) -> Union[bytes, Image.Image]:
+    """
+    Read the encoded bytes of a source without blocking the event loop.
+
+    Args:
+        source (Source): An image path, encoded image bytes, an image, or an async reader.
+
+    Returns:
+        Union[bytes, Image.Image]: The encoded bytes, or the image itself.
+
+    Raises:
+        TypeError: If the source is none of the supported kinds.
+    """
+    if isinstance(source, (Image.Image, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        return await asyncio.get_running_loop().run_in_executor(None, _read_file, source)
+    read = getattr(source, 'read', None)
+    if read is not None:
+        data = read()
+        return await data if asyncio.iscoroutine(data) or isinstance(data, asyncio.Future) else data
+    raise TypeError(f"Cannot read an image from {type(source).__name__}.")
+
+def _read_file(path: Union[str, 'os.PathLike[str]']) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _process(transformer: ImageTransformer, data: Union[bytes, Image.Image], format: Optional[str],
+             opaque: bool, encoder: Optional[Dict[str, Any]],
+             cancelled: threading.Event) -> Union[Image.Image, bytes]:
+    """Decode, transform and optionally encode one source in a worker thread."""
+    from .optimizer import flatten
+
+    image = data if isinstance(data, Image.Image) else open_image(BytesIO(data))
+    for step in flatten(transformer):
+        if cancelled.is_set():
+            raise Cancelled()
+        image = step(image)
+    if cancelled.is_set():
+        raise Cancelled()
+    if format is None:
+        # Decode lazily opened images here rather than on the event loop
+        image.load()
+        return image
+    buffer = BytesIO()
+    save_image(image, buffer, format=format, opaque=opaque, encoder=encoder)
+    return buffer.getvalue()
+
+async def _aiter(sources: Union[Iterable[Source], AsyncIterable[Source]]) -> AsyncGenerator[Source, None]:
+    if hasattr(sources, '__aiter__'):
+        async for source in sources:
+            yield source
+    else:
+        for source in sources:
+            yield source
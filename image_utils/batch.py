@@ -0,0 +1,223 @@
+import glob
+import os
+import shutil
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .cache import ResultCache, cache_key, path_digest
+from .core.image_transformer import ImageTransformer
+from .frames import is_animated, save_animation, saves_frames
+from .image_io import format_for_path, is_passthrough, open_image, reduce_for, reencodes, save_image
+from .parallel import parallel_process_files
+from .staged import run_staged
+
+DEFAULT_OUTPUT_TEMPLATE = '{name}'
+
+def collect_inputs(input_dir: Optional[str] = None, input_glob: Optional[str] = None) -> List[str]:
+    """
+    Collect the input image paths for a batch run.
+
+    Files directly inside `input_dir` are included if their extension is a registered image format.
+    Files matched by `input_glob` are included as-is (`**` is expanded recursively).
+
+    Args:
+        input_dir (Optional[str]): A directory containing the input images.
+        input_glob (Optional[str]): A glob pattern matching the input images.
+
+    Returns:
+        List[str]: The sorted, de-duplicated list of input paths.
+    """
+    paths = set()
+    if input_dir:
+        for entry in os.scandir(input_dir):
+            if entry.is_file() and format_for_path(entry.path):
+                paths.add(entry.path)
+    if input_glob:
+        paths.update(p for p in glob.glob(input_glob, recursive=True) if os.path.isfile(p))
+    return sorted(paths)
+
+def output_path(input_path: str, output_dir: str, template: str = DEFAULT_OUTPUT_TEMPLATE,
+                index: int = 0, root: Optional[str] = None) -> str:
+    """
+    Build the output path of an input image from a filename template.
+
+    The template is a `str.format` pattern which may use the fields `{name}` (file name with
+    extension), `{stem}` (file name without extension), `{ext}` (extension including the dot),
+    `{index}` (position of the file in the batch) and `{path}` (path of the file relative to
+    `root`, which keeps the layout of inputs collected from several directories).
+
+    Args:
+        input_path (str): The input image path.
+        output_dir (str): The directory to write the output to.
+        template (str): The filename template. Default is '{name}'.
+        index (int): The position of the file in the batch. Default is 0.
+        root (Optional[str]): The directory `{path}` is relative to. Defaults to the input's directory.
+
+    Returns:
+        str: The output path.
+    """
+    name = os.path.basename(input_path)
+    stem, ext = os.path.splitext(name)
+    path = os.path.relpath(input_path, root) if root else name
+    filename = template.format(name=name, stem=stem, ext=ext, index=index, path=path)
+    return os.path.join(output_dir, filename)
+
+def output_paths(input_paths: Iterable[str], output_dir: str,
+                 template: str = DEFAULT_OUTPUT_TEMPLATE) -> List[Tuple[str, str]]:
+    """
+    Build the output paths of a batch and check that no output overwrites another file of it.
+
+    `{path}` fields are relative to the deepest directory containing all the inputs.
+
+    Args:
+        input_paths (Iterable[str]): The input image paths.
+        output_dir (str): The directory to write the outputs to.
+        template (str): The output filename template. Default is '{name}'.
+
+    Returns:
+        List[Tuple[str, str]]: The (input path, output path) pairs, in input order.
+
+    Raises:
+        ValueError: If two inputs map to the same output, or an output is one of the inputs.
+    """
+    input_paths = list(input_paths)
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in input_paths]) if input_paths else None
+    targets = [(input_path, output_path(input_path, output_dir, template, index, root))
+               for index, input_path in enumerate(input_paths)]
+    inputs = {_normalize(input_path) for input_path in input_paths}
+    written: Dict[str, str] = {}
+    for input_path, target in targets:
+        key = _normalize(target)
+        if key in inputs:
+            raise ValueError(f"The output of '{input_path}' would overwrite the input '{target}'.")
+        if key in written:
+            raise ValueError(f"'{written[key]}' and '{input_path}' would both be written to '{target}'.")
+        written[key] = input_path
+    return targets
+
+def _normalize(path: str) -> str:
+    """Return a form of a path under which two spellings of the same file compare equal."""
+    return os.path.normcase(os.path.realpath(path))
+
+def process_file(transformer: ImageTransformer, input_path: str, output_path: str,
+                 opaque: bool = False, draft: bool = False, format: Optional[str] = None,
+                 encoder: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Load an image, apply the transformer and save the result.
+
+    Unless `format` is given, the output format is taken from the output extension, falling
+    back to the input format. If the transformer returns the input image unchanged and no
+    conversion or re-encoding is needed, the input file is copied without being decoded.
+    Animated and multi-page inputs are processed frame by frame when the output format can
+    hold several frames (see `frames.save_animation`), and keep their first frame otherwise.
+
+    Args:
+        transformer (ImageTransformer): The transformer (usually a Pipeline) to apply.
+        input_path (str): The input image path.
+        output_path (str): The output image path.
+        opaque (bool): Convert the output image to an opaque format. Default is False.
+        draft (bool): Decode at a reduced scale ahead of a leading downscale. Default is False.
+        format (Optional[str]): The output format. Default is None.
+        encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+
+    Returns:
+        str: The output path.
+    """
+    with open_image(input_path) as image:
+        format = format or format_for_path(output_path, image.format)
+        if is_animated(image) and saves_frames(format):
+            save_animation(transformer, image, output_path, format=format, opaque=opaque, encoder=encoder)
+            return output_path
+        source, steps = reduce_for(image, transformer) if draft else (image, transformer)
+        output_image = steps(source)
+        if not reencodes(encoder) and is_passthrough(image, output_image, format, opaque):
+            shutil.copyfile(input_path, output_path)
+        else:
+            save_image(output_image, output_path, format=format, opaque=opaque, encoder=encoder)
+    return output_path
+
+def run_batch(transformer: ImageTransformer, input_paths: Iterable[str], output_dir: str,
+              template: str = DEFAULT_OUTPUT_TEMPLATE, opaque: bool = False,
+              jobs: int = 1, draft: bool = False,
+              cache: Optional[ResultCache] = None, format: Optional[str] = None,
+              encoder: Optional[Dict[str, Any]] = None, threads: int = 1,
+              queue_depth: Optional[int] = None) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+    """
+    Apply a transformer to many images.
+
+    The same transformer instance is reused for every file. With `jobs` greater than 1 the
+    files are spread over a pool of worker processes, each receiving the transformer once.
+    Otherwise, with `threads` greater than 1, reading, decoding, transforming, encoding and
+    writing overlap in thread stages connected by bounded queues (see `staged.run_staged`).
+    Failures are reported per file instead of aborting the whole batch, but outputs that would
+    overwrite each other or an input are rejected before any file is processed (see `output_paths`).
+
+    With a `cache`, every input is looked up by content before it is decoded: hits are copied
+    from the cache, and the outputs of misses are stored in it once written.
+
+    Args:
+        transformer (ImageTransformer): The transformer (usually a Pipeline) to apply.
+        input_paths (Iterable[str]): The input image paths.
+        output_dir (str): The directory to write the outputs to. Created if missing, along with
+            the subdirectories of `{path}` templates.
+        template (str): The output filename template. Default is '{name}'.
+        opaque (bool): Convert the output images to an opaque format. Default is False.
+        jobs (int): Number of worker processes. Default is 1 (run in the current process).
+        draft (bool): Decode at a reduced scale ahead of a leading downscale. Default is False.
+        cache (Optional[ResultCache]): A result cache to consult and fill. Default is None.
+        format (Optional[str]): The output format, instead of the one of the output extension.
+        encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+        threads (int): Threads per stage of the staged executor. Default is 1 (no stages).
+        queue_depth (Optional[int]): Capacity of the queues between stages. Defaults to `2 * threads`.
+
+    Yields:
+        Tuple[str, Optional[str], Optional[Exception]]: The input path, the output path
+        (None on failure) and the error raised (None on success), in input order.
+
+    Raises:
+        ValueError: If two inputs map to the same output, or an output is one of the inputs.
+    """
+    targets = output_paths(input_paths, output_dir, template)
+    for directory in sorted({os.path.dirname(target) for _, target in targets} | {output_dir}):
+        os.makedirs(directory, exist_ok=True)
+    keys = [_cache_key(transformer, input_path, target, opaque, draft, format, encoder) if cache else None
+            for input_path, target in targets]
+    hits = [key is not None and cache.fetch(key, target) for key, (_, target) in zip(keys, targets)]
+
+    misses = [target for target, hit in zip(targets, hits) if not hit]
+    if jobs > 1:
+        results = parallel_process_files(transformer, misses, workers=jobs, opaque=opaque,
+                                         draft=draft, format=format, encoder=encoder)
+    elif threads > 1:
+        results = run_staged(transformer, misses, threads=threads, queue_depth=queue_depth, opaque=opaque,
+                             draft=draft, format=format, encoder=encoder)
+    else:
+        results = _process_files(transformer, misses, opaque, draft, format, encoder)
+
+    for (input_path, target), key, hit in zip(targets, keys, hits):
+        if hit:
+            yield input_path, target, None
+            continue
+        result = next(results)
+        if key is not None and result[2] is None:
+            cache.store(key, result[1])
+        yield result
+
+def _process_files(transformer: ImageTransformer, targets: Iterable[Tuple[str, str]], opaque: bool,
+                   draft: bool, format: Optional[str],
+                   encoder: Optional[Dict[str, Any]]) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+    """Process (input path, output path) pairs in the current process, one at a time."""
+    for input_path, target in targets:
+        try:
+            yield input_path, process_file(transformer, input_path, target, opaque, draft, format, encoder), None
+        except Exception as e:
+            yield input_path, None, e
+
+def _cache_key(transformer: ImageTransformer, input_path: str, target: str, opaque: bool,
+               draft: bool, format: Optional[str], encoder: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Return the cache key of one batch file, or None if it cannot be cached."""
+    try:
+        digest = path_digest(input_path)
+    except OSError:
+        # Leave the error to be reported when the file is processed
+        return None
+    return cache_key(digest, transformer, format or format_for_path(target), opaque=opaque, draft=draft,
+                     **(encoder or {}))
@@ -0,0 +1,285 @@
+import json
+import platform
+import sys
+import time
+from io import BytesIO
+from PIL import Image, __version__ as PIL_VERSION
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .core.image_transformer import ImageTransformer
+from .image_io import mode_for_format, open_image, save_image
+from .operators import concat_map, convert, crop, expand, flip, gray_scale, resize, roll, rotate, trim
+from .pipeline import pipe
+
+Size = Tuple[int, int]
+
+DEFAULT_SIZES = (256, 1024, 4096)
+ALL_SIZES = (256, 1024, 2048, 4096, 8192)
+DEFAULT_MODES = ('L', 'RGB', 'RGBA')
+DEFAULT_FORMATS = ('PNG', 'JPEG', 'WEBP', 'IURAW')
+
+# Bump when the meaning of the stored results changes
+RESULTS_VERSION = 1
+
+def _thumbnail(size: Size) -> ImageTransformer:
+    return pipe(trim(), resize(width=256, height=256, fit='contain'), expand(width=272, height=272, fillwith='#ffffff'))
+
+def _chain(size: Size) -> ImageTransformer:
+    width, height = size
+    return pipe(crop(left=8, top=8, right=width - 8, bottom=height - 8), flip('h'), gray_scale(),
+                resize(width=width // 2))
+
+def _double_canvas(image: Image.Image) -> ImageTransformer:
+    width, height = image.size
+    return pipe(expand(width=width * 2, height=height * 2, align='lt'), roll(dx=width // 2, dy=height // 2))
+
+# Benchmarked transformers by name, each built for the size of the input image
+CASES: Dict[str, Callable[[Size], ImageTransformer]] = {
+    'convert': lambda size: convert('RGBA'),
+    'crop': lambda size: crop(left=size[0] // 10, top=size[1] // 10, right=0.9, bottom=0.9),
+    'expand': lambda size: expand(width=size[0] + size[0] // 8, height=size[1] + size[1] // 8, fillwith='#336699'),
+    'flip': lambda size: flip('h'),
+    'gray_scale': lambda size: gray_scale(),
+    'resize': lambda size: resize(width=size[0] // 2),
+    'resize_fast': lambda size: resize(width=size[0] // 8, preset='fast'),
+    'roll': lambda size: roll(dx=size[0] // 3, dy=size[1] // 5),
+    'rotate': lambda size: rotate(7, resample='bilinear'),
+    'rotate_90': lambda size: rotate(90),
+    'trim': lambda size: trim(),
+    'pipeline_chain': _chain,
+    'pipeline_thumbnail': _thumbnail,
+    'pipeline_concat_map': lambda size: concat_map(_double_canvas),
+}
+
+class BenchResult:
+    """
+    The measurements of one benchmark case.
+
+    Attributes:
+        case (str): The case name: an entry of `CASES`, or 'encode'/'decode'.
+        size (int): The width and height of the input image.
+        mode (str): The mode of the input image.
+        format (Optional[str]): The encoded format, for encode and decode cases.
+        iterations (int): Number of timed runs.
+        seconds (float): Median time of a run, in seconds.
+        ops_per_sec (float): Runs per second, from the median time.
+        mb_per_sec (float): Input pixel data processed per second, in MB (10^6 bytes).
+        peak_rss (Optional[int]): Peak resident set size while running the case, in bytes.
+    """
+
+    def __init__(self, case: str, size: int, mode: str, format: Optional[str], iterations: int,
+                 seconds: float, input_bytes: int, peak_rss: Optional[int]):
+        self.case = case
+        self.size = size
+        self.mode = mode
+        self.format = format
+        self.iterations = iterations
+        self.seconds = seconds
+        self.ops_per_sec = 1 / seconds if seconds else float('inf')
+        self.mb_per_sec = input_bytes / seconds / 1e6 if seconds else float('inf')
+        self.peak_rss = peak_rss
+
+    def key(self) -> str:
+        """Return the identifier used to match results of different runs."""
+        return _key(self.case, self.size, self.mode, self.format)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the JSON-compatible form of the result."""
+        return {'case': self.case, 'size': self.size, 'mode': self.mode, 'format': self.format,
+                'iterations': self.iterations, 'seconds': self.seconds,
+                'ops_per_sec': self.ops_per_sec, 'mb_per_sec': self.mb_per_sec, 'peak_rss': self.peak_rss}
+
+    def __repr__(self) -> str:
+        return (f"BenchResult({self.key()}: {self.seconds * 1000:.2f} ms, {self.ops_per_sec:.1f} ops/s, "
+                f"{self.mb_per_sec:.1f} MB/s)")
+
+def _key(case: str, size: int, mode: str, format: Optional[str]) -> str:
+    return '/'.join(str(part) for part in (case, size, mode, format) if part)
+
+def make_image(size: int, mode: str) -> Image.Image:
+    """
+    Create a reproducible test image: noisy content surrounded by a transparent/black margin.
+
+    Args:
+        size (int): The width and height of the image.
+        mode (str): The image mode.
+
+    Returns:
+        Image.Image: The test image.
+    """
+    margin = size // 16
+    content = Image.effect_noise((size - 2 * margin, size - 2 * margin), 64)
+    content = Image.merge('RGB', (content, content.transpose(Image.FLIP_LEFT_RIGHT),
+                                  content.transpose(Image.FLIP_TOP_BOTTOM)))
+    image = Image.new('RGBA', (size, size))
+    image.paste(content, (margin, margin))
+    return image.convert(mode)
+
+def measure(run: Callable[[], Any], min_time: float = 0.2, max_iterations: int = 1000) -> Tuple[int, float]:
+    """
+    Time a callable repeatedly and return the number of runs and the median run time.
+
+    Runs continue until `min_time` seconds have been spent (at least 3 runs for stable medians,
+    at most `max_iterations`).
+
+    Args:
+        run (Callable[[], Any]): The code to time.
+        min_time (float): Minimum total time to spend, in seconds.
+        max_iterations (int): Maximum number of runs.
+
+    Returns:
+        Tuple[int, float]: The number of runs and the median time of a run, in seconds.
+    """
+    run()  # Warm up caches and lazy imports
+    times: List[float] = []
+    total = 0.0
+    while len(times) < max_iterations and (total < min_time or len(times) < 3):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    times.sort()
+    return len(times), times[len(times) // 2]
+
+def run_benchmarks(cases: Optional[Iterable[str]] = None, sizes: Iterable[int] = DEFAULT_SIZES,
+                   modes: Iterable[str] = DEFAULT_MODES, formats: Iterable[str] = DEFAULT_FORMATS,
+                   min_time: float = 0.2,
+                   progress: Optional[Callable[[BenchResult], None]] = None) -> List[BenchResult]:
+    """
+    Time operators, pipelines and codecs over a matrix of image sizes and modes.
+
+    Every case of `CASES` is applied to a decoded image. For every format, encoding the
+    image and decoding it back are timed as the 'encode' and 'decode' cases (formats which
+    cannot store a mode, e.g. JPEG with alpha, are skipped).
+
+    Args:
+        cases (Optional[Iterable[str]]): Names of `CASES` to run, plus 'encode' and 'decode'.
+                                         Defaults to all of them.
+        sizes (Iterable[int]): Widths (and heights) of the square test images.
+        modes (Iterable[str]): Modes of the test images.
+        formats (Iterable[str]): Formats for the encode and decode cases.
+        min_time (float): Minimum time spent timing each case, in seconds.
+        progress (Optional[Callable[[BenchResult], None]]): Called with each result as it is measured.
+
+    Returns:
+        List[BenchResult]: The results, in measurement order.
+
+    Raises:
+        ValueError: If a case name is unknown.
+    """
+    names = list(cases) if cases is not None else [*CASES, 'encode', 'decode']
+    unknown = [name for name in names if name not in CASES and name not in ('encode', 'decode')]
+    if unknown:
+        raise ValueError(f"Unknown benchmark case(s): {', '.join(unknown)}.")
+
+    results = []
+    for size in sizes:
+        for mode in modes:
+            image = make_image(size, mode)
+            input_bytes = len(image.tobytes())
+            jobs = [(name, None, _transform(CASES[name]((size, size)), image))
+                    for name in names if name in CASES]
+            for format in formats:
+                encoded = _encode(image, format)
+                if encoded is None:
+                    continue
+                if 'encode' in names:
+                    jobs.append(('encode', format, lambda format=format: _encode(image, format)))
+                if 'decode' in names:
+                    jobs.append(('decode', format, lambda encoded=encoded: open_image(BytesIO(encoded)).load()))
+            for name, format, run in jobs:
+                reset_peak_rss()
+                iterations, seconds = measure(run, min_time)
+                result = BenchResult(name, size, mode, format, iterations, seconds, input_bytes, peak_rss())
+                if progress:
+                    progress(result)
+                results.append(result)
+    return results
+
+def _transform(transformer: ImageTransformer, image: Image.Image) -> Callable[[], Any]:
+    def run():
+        # Force the pixels, in case the transformer returns a lazy or unchanged image
+        transformer(image).load()
+    return run
+
+def _encode(image: Image.Image, format: str) -> Optional[bytes]:
+    if mode_for_format(image, format) != image.mode:
+        # Measure the encoder on modes it writes, not save_image's conversion
+        return None
+    buffer = BytesIO()
+    try:
+        save_image(image, buffer, format=format)
+    except (OSError, KeyError, ValueError):
+        return None
+    return buffer.getvalue()
+
+def environment() -> Dict[str, Any]:
+    """Return the versions and platform the benchmarks ran on."""
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        package_version = version('image-utils-package')
+    except PackageNotFoundError:
+        package_version = '0.0.0'
+    return {'image_utils': package_version, 'pillow': PIL_VERSION, 'python': platform.python_version(),
+            'platform': platform.platform(), 'machine': platform.machine()}
+
+def dump_results(results: List[BenchResult]) -> str:
+    """
+    Serialise benchmark results, with the environment they ran in, to JSON.
+
+    Args:
+        results (List[BenchResult]): The results.
+
+    Returns:
+        str: The JSON document.
+    """
+    return json.dumps({'version': RESULTS_VERSION, 'environment': environment(),
+                       'results': [result.to_dict() for result in results]}, indent=2)
+
+def compare(results: List[BenchResult], baseline: Dict[str, Any]) -> List[Tuple[str, float, float]]:
+    """
+    Compare results with those of an earlier run.
+
+    Args:
+        results (List[BenchResult]): The new results.
+        baseline (Dict[str, Any]): A document produced by `dump_results`.
+
+    Returns:
+        List[Tuple[str, float, float]]: For every case present in both runs, its key, the
+        baseline median time and the speedup (baseline time / new time; above 1 is faster).
+    """
+    previous = {_key(entry['case'], entry['size'], entry['mode'], entry['format']): entry['seconds']
+                for entry in baseline['results']}
+    return [(result.key(), previous[result.key()], previous[result.key()] / result.seconds)
+            for result in results if result.key() in previous and result.seconds]
+
+def format_result(result: BenchResult) -> str:
+    """Return a one-line, human readable summary of a result."""
+    peak = f"{result.peak_rss / 2 ** 20:.0f} MiB" if result.peak_rss else "n/a"
+    return (f"{result.key():<36} {result.seconds * 1000:10.2f} ms {result.ops_per_sec:10.1f} ops/s "
+            f"{result.mb_per_sec:10.1f} MB/s  peak RSS {peak}")
+
+def reset_peak_rss() -> None:
+    """Reset the peak resident set size of the process, where the platform allows it (Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_rss() -> Optional[int]:
+    """Return the peak resident set size of the process in bytes, if the platform reports it."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, BinaryIO, Optional
+from PIL import __version__ as PIL_VERSION
+from .core.image_transformer import ImageTransformer
+from .spec import dumps
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+# Bump when the meaning of cached entries changes, to invalidate existing caches
+CACHE_VERSION = 1
+
+_CHUNK_SIZE = 1024 * 1024
+
+class CacheStats:
+    """
+    Hit and miss counters of a result cache.
+
+    Attributes:
+        hits (int): Number of lookups that found a cached result.
+        misses (int): Number of lookups that did not.
+        stores (int): Number of results written to the cache.
+        evictions (int): Number of entries removed to stay within the size limit.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __repr__(self) -> str:
+        return (f"CacheStats(hits={self.hits}, misses={self.misses}, "
+                f"stores={self.stores}, evictions={self.evictions})")
+
+class ResultCache:
+    """
+    A size-bounded, on-disk cache of encoded pipeline outputs, keyed by content.
+
+    Entries are stored under their key in a two-level directory layout. Reading an entry marks
+    it as recently used, and when the total size exceeds `max_size` the least recently used
+    entries are evicted. Writes are atomic, so several processes may share one cache directory.
+
+    Attributes:
+        directory (str): The cache directory. Created if missing.
+        max_size (int): Maximum total size of the cached entries, in bytes.
+        stats (CacheStats): Hit and miss counters of this instance.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.stats = CacheStats()
+        # Running total of the entry sizes, computed on the first write
+        self._total: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return the cached bytes for a key, or None on a miss.
+
+        Args:
+            key (str): A key produced by `cache_key`.
+
+        Returns:
+            Optional[bytes]: The cached encoded output.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        self._touch(path)
+        self.stats.hits += 1
+        return data
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """
+        Copy the cached entry for a key to a file.
+
+        Args:
+            key (str): A key produced by `cache_key`.
+            output_path (str): The file to write the cached output to.
+
+        Returns:
+            bool: True on a hit, False on a miss (nothing is written).
+        """
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, output_path)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return False
+        self._touch(path)
+        self.stats.hits += 1
+        return True
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store encoded output under a key.
+
+        Args:
+            key (str): A key produced by `cache_key`.
+            data (bytes): The encoded output.
+        """
+        self._write(key, lambda f: f.write(data))
+
+    def store(self, key: str, output_path: str) -> None:
+        """
+        Store the contents of an output file under a key.
+
+        Args:
+            key (str): A key produced by `cache_key`.
+            output_path (str): The file holding the encoded output.
+        """
+        with open(output_path, 'rb') as source:
+            self._write(key, lambda f: shutil.copyfileobj(source, f))
+
+    def size(self) -> int:
+        """Return the total size of the cached entries, in bytes."""
+        return sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write(self, key: str, write) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.stats.stores += 1
+        if self._total is None:
+            self._total = self.size()
+        else:
+            self._total += os.path.getsize(path)
+        if self._total > self.max_size:
+            self._evict()
+
+    def _entries(self):
+        """Yield (mtime, path, size) for every cached entry."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, path, stat.st_size
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in `max_size`."""
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats.evictions += 1
+        self._total = total
+
+def file_digest(source: BinaryIO) -> str:
+    """
+    Return the SHA-256 hex digest of a binary stream, read from its current position.
+
+    Args:
+        source (BinaryIO): The stream to hash. It is read to the end.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def path_digest(path: str) -> str:
+    """
+    Return the SHA-256 hex digest of a file's contents.
+
+    Args:
+        path (str): The file to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    with open(path, 'rb') as f:
+        return file_digest(f)
+
+def cache_key(input_digest: str, transformer: ImageTransformer, format: Optional[str],
+              **options: Any) -> Optional[str]:
+    """
+    Build the cache key of a pipeline run.
+
+    The key covers the input content, the canonical spec of the transformer (see
+    `image_utils.spec.dumps`), the output format, any encoder or processing options and the
+    Pillow version, since encoders may change between releases.
+
+    Args:
+        input_digest (str): The digest of the encoded input (see `file_digest`).
+        transformer (ImageTransformer): The transformer applied to the input.
+        format (Optional[str]): The output format.
+        **options (Any): Other settings affecting the output, e.g. `opaque=True`.
+
+    Returns:
+        Optional[str]: The hex key, or None if the transformer cannot be serialised
+        (e.g. it contains a lambda) and its results must not be cached.
+    """
+    try:
+        spec = dumps(transformer)
+    except ValueError:
+        return None
+    material = json.dumps({'version': CACHE_VERSION, 'pillow': PIL_VERSION, 'input': input_digest,
+                           'spec': spec, 'format': format, 'options': options},
+                          sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
@@ -1,15 +1,29 @@
-from importlib.metadata import version, PackageNotFoundError
-from typing import Tuple, Union
+from typing import List, Sequence, Tuple, Union
 from .decorators import common_options, image_io_wrapper
+from .decorators.common_options import OPTION_NAMES
+# Operator modules (and PIL) are only imported when a command builds its operator
 from . import operators
 import click
+import inspect
+import os
+import sys
 
-# Fetch installed image-utils-package
-try:
-    package_version = version("image-utils-package")
-except PackageNotFoundError:
-    # default
-    package_version = "0.0.0"
+PACKAGE_NAME = "image-utils-package"
+
+def show_version(ctx: click.Context, param: click.Parameter, value: bool) -> None:
+    """Print the installed version and exit. The package metadata is only read when asked for."""
+    if not value or ctx.resilient_parsing:
+        return
+    from importlib.metadata import version, PackageNotFoundError
+
+    # Fetch installed image-utils-package
+    try:
+        package_version = version(PACKAGE_NAME)
+    except PackageNotFoundError:
+        # default
+        package_version = "0.0.0"
+    click.echo(package_version)
+    ctx.exit()
 
 def parse_size(value: str) -> Tuple[int, int]:
     """Parse {w}x{h} format to (width, height)."""
@@ -39,19 +53,44 @@ def parse_boundary(value: str) -> Union[int, float]:
     return int(value)
 
 @click.group()
-@click.version_option(package_version, '-v', '--version', message='%(version)s')
+@click.option('-v', '--version', is_flag=True, expose_value=False, is_eager=True, callback=show_version,
+              help='Show the version and exit.')
 def cli():
     """A command-line tool for image processing."""
     pass
 
 @cli.command()
 @click.argument('size', callback=lambda ctx, param, value: parse_size(value))
+@click.option(
+    '--resample',
+    type=click.Choice(['nearest', 'box', 'bilinear', 'hamming', 'bicubic', 'lanczos']),
+    default=None,
+    help="Resampling filter (default: the preset's, or bicubic)."
+)
+@click.option(
+    '--reducing-gap',
+    type=click.FloatRange(min=1.0),
+    default=None,
+    help='Shrink by an integer factor first, keeping at least this many times the target size.'
+)
+@click.option(
+    '--fit',
+    type=click.Choice(['fill', 'contain', 'cover']),
+    default='fill',
+    help='How to handle the aspect ratio when both width and height are given (default: fill).'
+)
+@click.option(
+    '--preset',
+    type=click.Choice(['fast', 'balanced', 'best']),
+    default=None,
+    help='Quality/speed trade-off setting the filter and the reducing gap.'
+)
 @common_options
 @image_io_wrapper
-def resize(size, input, opaque):
+def resize(size, resample, reducing_gap, fit, preset, input, opaque):
     """Resize an image"""
 
-    return operators.resize(*size)
+    return operators.resize(*size, resample=resample, reducing_gap=reducing_gap, fit=fit, preset=preset)
 
 @cli.command()
 @click.option('-l', '--left', default="0", help='Left boundary for cropping. Use a number (pixels) or a proportion (e.g., 0.9x for 90%).')
@@ -131,27 +170,40 @@ def expand(input, size, fillwith, align, dx, dy, fillwithpos, opaque):
     )
 
 @cli.command()
-@click.argument('shift', type=int)
+@click.argument('shift', type=int, default=0)
 @click.option(
     '-d', '--direction', 
     type=click.Choice(['l', 'r', 'u', 'b']), 
     default='r', 
     help="Direction of roll ('l' for left, 'r' for right, 'u' for up, 'b' for down). Default is 'r'."
 )
+@click.option('--dx', type=int, default=0, help='Additional horizontal shift, positive to the right.')
+@click.option('--dy', type=int, default=0, help='Additional vertical shift, positive downwards.')
 @common_options
 @image_io_wrapper
-def roll(input, shift, direction, opaque):
+def roll(input, shift, direction, dx, dy, opaque):
     """Roll (shift) the image horizontally or vertically"""
 
-    return operators.roll(shift=shift, direction=direction)
+    return operators.roll(shift=shift, direction=direction, dx=dx, dy=dy)
 
 @cli.command()
+@click.option(
+    '--background',
+    default=None,
+    help="Background color to trim in HEX format, or 'auto' to use the corner color (default: transparent)."
+)
+@click.option(
+    '--tolerance',
+    type=click.IntRange(min=0),
+    default=0,
+    help='Maximum per-band difference from the background (default: 0).'
+)
 @common_options
 @image_io_wrapper
-def trim(input, opaque):
-    """Trim transparent borders from an image"""
+def trim(input, background, tolerance, opaque):
+    """Trim transparent (or background-colored) borders from an image"""
     
-    return operators.trim()
+    return operators.trim(background=background, tolerance=tolerance)
 
 @cli.command()
 @click.argument('direction', type=click.Choice(['h', 'v']))
@@ -175,16 +227,171 @@ def flip(input, direction, opaque):
     default=None, 
     help='Sample the fill color from the given coordinates.'
 )
+@click.option(
+    '--resample',
+    type=click.Choice(['nearest', 'bilinear', 'bicubic'], case_sensitive=False),
+    default='nearest',
+    show_default=True,
+    help='Resampling filter for angles that are not multiples of 90 degrees.'
+)
 @common_options
 @image_io_wrapper
-def rotate(input, angle, fillwith, fillwithpos, opaque):
+def rotate(input, angle, fillwith, fillwithpos, resample, opaque):
     """Rotate the image by a specified angle with expanded canvas"""
 
     return operators.rotate(
         angle=angle,
         fillwith=fillwith, 
-        fillwithpos=fillwithpos
+        fillwithpos=fillwithpos,
+        resample=resample
     )
 
+# Keyword separating the steps of the run command
+STEP_SEPARATOR = 'then'
+
+# Commands that cannot be used as a step of the run command
+_NOT_STEPS = ('run', 'serve', 'bench')
+
+def split_steps(tokens: Sequence[str]) -> List[List[str]]:
+    """Split command-line tokens into steps at every 'then' keyword."""
+    steps = [[]]
+    for token in tokens:
+        if token == STEP_SEPARATOR:
+            steps.append([])
+        else:
+            steps[-1].append(token)
+    if any(not step for step in steps):
+        raise click.UsageError(f"Every '{STEP_SEPARATOR}' must be followed by a command.")
+    return steps
+
+def build_step(ctx: click.Context, tokens: List[str]):
+    """
+    Parse one step of the run command with the options of its command and build its operator.
+
+    Args:
+        ctx (click.Context): The context of the run command.
+        tokens (List[str]): The command name followed by its arguments and options.
+
+    Returns:
+        ImageTransformer: The operator built by the command.
+    """
+    name, args = tokens[0].replace('_', '-'), tokens[1:]
+    command = None if name in _NOT_STEPS else cli.get_command(ctx, name)
+    if command is None:
+        raise click.UsageError(f"Unknown step '{tokens[0]}'. Steps are commands such as crop, resize or trim.")
+    with command.make_context(name, args, parent=ctx) as step_ctx:
+        given = [option for option in OPTION_NAMES
+                 if step_ctx.get_parameter_source(option) == click.core.ParameterSource.COMMANDLINE]
+        if given:
+            raise click.UsageError(f"Input and output options ({', '.join(given)}) apply to the whole run "
+                                   f"and must come before the first step.", ctx=step_ctx)
+        # Call the command's own function, bypassing the image I/O of its decorators
+        build = inspect.unwrap(command.callback)
+        params = {key: value for key, value in step_ctx.params.items()
+                  if key not in OPTION_NAMES or key in ('input', 'opaque')}
+        transformer = step_ctx.invoke(build, **params)
+    if transformer is None:
+        # The command reported the error itself
+        ctx.exit(1)
+    return transformer
+
+def load_pipeline_option(value: str):
+    """Load the transformer of a --pipeline option, given as a JSON spec or a spec file."""
+    from .spec import loads
+
+    try:
+        if os.path.isfile(value):
+            with open(value, encoding='utf-8') as f:
+                value = f.read()
+        return loads(value)
+    except (ValueError, KeyError, TypeError) as e:
+        raise click.BadParameter(f"Invalid pipeline spec: {e}", param_hint="'--pipeline'")
+
+@cli.command(context_settings={'allow_interspersed_args': False, 'ignore_unknown_options': True})
+@click.option('--pipeline', 'pipeline_spec', help='Pipeline spec as JSON, or the path of a JSON spec file. Runs before the steps.')
+@click.argument('steps', nargs=-1, type=click.UNPROCESSED)
+@common_options
+@image_io_wrapper
+def run(input, pipeline_spec, steps, opaque):
+    """Run several commands in one pass: STEP [then STEP ...]
+
+    Each STEP is a command with its arguments and options, e.g.
+    'crop -l 10 then resize 256x then expand 300x300'. The image is decoded and
+    encoded once. Options of run itself (--input, --mode, ...) go before the first step.
+    """
+    from .pipeline import pipe
+
+    ctx = click.get_current_context()
+    transformers = [load_pipeline_option(pipeline_spec)] if pipeline_spec else []
+    if steps:
+        transformers.extend(build_step(ctx, step) for step in split_steps(steps))
+    if not transformers:
+        raise click.UsageError("Give at least one step or a --pipeline spec.")
+    return pipe(*transformers)
+
+@cli.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), help='Listen on this Unix domain socket instead of standard input.')
+@click.option('-w', '--workers', type=click.IntRange(min=1), default=4, show_default=True, help='Number of worker threads.')
+@click.option('--allow-function', 'allowed_functions', multiple=True, metavar='MODULE:QUALNAME', help='Let request specs use this function, as a transformer or concat_map (repeatable). Default: none.')
+def serve(socket_path, workers, allowed_functions):
+    """Stay resident and process framed pipeline requests"""
+    from .server import PipelineServer
+
+    server = PipelineServer(workers=workers, allowed_functions=allowed_functions)
+    try:
+        if socket_path:
+            click.echo(f"Listening on {socket_path}", err=True)
+            server.serve_unix(socket_path)
+        else:
+            server.serve_stream(sys.stdin.buffer, sys.stdout.buffer)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+@cli.command()
+@click.option('-c', '--case', 'cases', multiple=True, help='Case to run (repeatable): an operator or pipeline case, encode or decode. Default: all.')
+@click.option('-s', '--size', 'sizes', type=click.IntRange(min=16, max=8192), multiple=True, help='Width and height of the square test images (repeatable), up to 8192. Default: 256, 1024 and 4096.')
+@click.option('--all-sizes', is_flag=True, help='Run every size from 256 to 8192 (256, 1024, 2048, 4096 and 8192).')
+@click.option('-m', '--mode', 'modes', type=click.Choice(['L', 'RGB', 'RGBA']), multiple=True, help='Mode of the test images (repeatable). Default: all.')
+@click.option('-f', '--format', 'formats', multiple=True, help='Format for the encode and decode cases (repeatable). Default: PNG, JPEG, WEBP and IURAW.')
+@click.option('--min-time', type=click.FloatRange(min=0), default=0.2, show_default=True, help='Minimum seconds spent timing each case.')
+@click.option('-o', '--output', type=click.Path(dir_okay=False), help='Save the results as JSON to this path.')
+@click.option('--compare', 'baseline', type=click.Path(exists=True, dir_okay=False), help='Compare with the JSON results of an earlier run.')
+@click.option('--list', 'list_cases', is_flag=True, help='List the cases and exit.')
+def bench(cases, sizes, all_sizes, modes, formats, min_time, output, baseline, list_cases):
+    """Time operators, pipelines and codecs over sizes and modes"""
+    import json
+    from . import bench as benchmarks
+
+    if list_cases:
+        click.echo('\n'.join([*benchmarks.CASES, 'encode', 'decode']))
+        return
+    if sizes and all_sizes:
+        raise click.UsageError("'--size' and '--all-sizes' cannot be combined.")
+    if all_sizes:
+        sizes = benchmarks.ALL_SIZES
+    try:
+        results = benchmarks.run_benchmarks(
+            cases=cases or None,
+            sizes=sizes or benchmarks.DEFAULT_SIZES,
+            modes=modes or benchmarks.DEFAULT_MODES,
+            formats=[name.upper() for name in formats] or benchmarks.DEFAULT_FORMATS,
+            min_time=min_time,
+            progress=lambda result: click.echo(benchmarks.format_result(result))
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--case'")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(benchmarks.dump_results(results))
+        click.echo(f"Saved results to {output}", err=True)
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            previous = json.load(f)
+        click.echo(f"\nCompared with {baseline}:")
+        for key, seconds, speedup in benchmarks.compare(results, previous):
+            click.echo(f"{key:<36} {seconds * 1000:10.2f} ms -> {seconds / speedup * 1000:10.2f} ms  x{speedup:.2f}")
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,67 @@
+from typing import Tuple, Union
+
+RGBA = Tuple[int, int, int, int]
+
+# Modes operators work in directly; other modes are promoted to RGBA first
+PRESERVED_MODES = ('L', 'LA', 'RGB', 'RGBA')
+
+def hex_to_rgba(hex_color: str) -> RGBA:
+    """
+    Convert a HEX color string to an RGBA tuple.
+
+    Args:
+        hex_color (str): A '#RRGGBB' or '#RRGGBBAA' color. Colors without alpha are opaque.
+
+    Returns:
+        RGBA: The (red, green, blue, alpha) tuple.
+    """
+    hex_color = hex_color.lstrip('#')
+    if len(hex_color) == 6:
+        hex_color += 'FF'
+    return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4, 6))
+
+def working_mode(mode: str) -> str:
+    """
+    Return the mode an operator should process an image of the given mode in.
+
+    Args:
+        mode (str): The mode of the input image.
+
+    Returns:
+        str: The mode itself if it is one of L, LA, RGB or RGBA, otherwise 'RGBA'.
+    """
+    return mode if mode in PRESERVED_MODES else 'RGBA'
+
+def fill_mode(mode: str, color: RGBA) -> str:
+    """
+    Return the smallest promotion of a mode that can represent a fill color.
+
+    Grayscale modes are promoted to color only if the color is not a shade of gray, and modes
+    without alpha gain an alpha band only if the color is not fully opaque.
+
+    Args:
+        mode (str): The mode of the image being filled.
+        color (RGBA): The fill color.
+
+    Returns:
+        str: One of 'L', 'LA', 'RGB' or 'RGBA'.
+    """
+    mode = working_mode(mode)
+    red, green, blue, alpha = color
+    color_needed = mode.startswith('RGB') or not red == green == blue
+    alpha_needed = mode.endswith('A') or alpha < 255
+    return ('RGB' if color_needed else 'L') + ('A' if alpha_needed else '')
+
+def color_for_mode(color: RGBA, mode: str) -> Union[int, Tuple[int, ...]]:
+    """
+    Express an RGBA color in the pixel format of a mode chosen with `fill_mode`.
+
+    Args:
+        color (RGBA): The color.
+        mode (str): One of 'L', 'LA', 'RGB' or 'RGBA'.
+
+    Returns:
+        Union[int, Tuple[int, ...]]: The pixel value, as accepted by `Image.new`.
+    """
+    red, green, blue, alpha = color
+    return {'L': red, 'LA': (red, alpha), 'RGB': (red, green, blue), 'RGBA': tuple(color)}[mode]
@@ -0,0 +1,14 @@
+from PIL import Image
+
+# Resampling filters by name, shared by the operators that resample
+RESAMPLE_FILTERS = {
+    'nearest': Image.Resampling.NEAREST,
+    'box': Image.Resampling.BOX,
+    'bilinear': Image.Resampling.BILINEAR,
+    'hamming': Image.Resampling.HAMMING,
+    'bicubic': Image.Resampling.BICUBIC,
+    'lanczos': Image.Resampling.LANCZOS,
+}
+
+# The filters Image.rotate and Image.transform accept
+AFFINE_FILTERS = ('nearest', 'bilinear', 'bicubic')
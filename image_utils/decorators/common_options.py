@@ -1,12 +1,25 @@
 import click
 from functools import update_wrapper
 
+# Parameter names of the options added by common_options
+OPTION_NAMES = ('input', 'opaque', 'mode', 'format', 'quality', 'compress_level', 'subsampling',
+                'webp_method', 'optimize', 'progressive', 'fast', 'draft', 'max_memory', 'cache_dir',
+                'cache_size', 'input_dir', 'input_glob', 'output_dir', 'output_template', 'jobs', 'threads',
+                'queue_depth', 'profile', 'profile_format')
+
 def common_options(func):
     """
     Decorator to add common command-line options for image processing commands.
 
     This decorator adds '--input' and '--opaque' options to specify the input image path
-    and whether to convert the output image to an opaque format.
+    and whether to convert the output image to an opaque format, the '--mode' option to set
+    the output mode, the '--format', '--quality', '--compress-level', '--subsampling',
+    '--webp-method', '--optimize', '--progressive' and '--fast' encoder options, the '--draft' option to
+    decode at a reduced scale ahead of a downscale, the '--max-memory' option for strip-based
+    processing of large images, the '--cache-dir' and '--cache-size' options for the result
+    cache, as well as the batch options '--input-dir', '--input-glob', '--output-dir',
+    '--output-template', '--jobs', '--threads' and '--queue-depth', and the '--profile' and '--profile-format' options to write
+    the time spent in decoding, each operator and encoding.
 
     Args:
         func (Callable): The function to be decorated.
@@ -15,7 +28,29 @@ def common_options(func):
         Callable: The decorated function with the added command-line options.
     """
     @click.option('-i', '--input', type=click.Path(exists=True), help='Input image path')
-    @click.option('--opaque', is_flag=True, help='Convert the output image to an opaque format (RGB)')
+    @click.option('--opaque', is_flag=True, help='Drop the alpha channel of the output image: RGBA→RGB, LA→L')
+    @click.option('--mode', type=click.Choice(['L', 'LA', 'RGB', 'RGBA']), help='Convert the output image to this mode (default: keep the mode of the input)')
+    @click.option('-f', '--format', help="Output format, e.g. 'png', 'jpeg', 'webp', 'ppm' or 'iuraw' for raw pixels (default: the input format)")
+    @click.option('--quality', type=click.IntRange(0, 100), help='JPEG/WebP/AVIF quality')
+    @click.option('--compress-level', type=click.IntRange(0, 9), help='PNG zlib compression level (0: none, 9: smallest)')
+    @click.option('--subsampling', type=click.Choice(['4:4:4', '4:2:2', '4:2:0']), help='JPEG chroma subsampling')
+    @click.option('--webp-method', type=click.IntRange(0, 6), help='WebP encoder effort (0: fastest, 6: smallest)')
+    @click.option('--optimize', is_flag=True, default=None, help='Spend extra encoding time on smaller PNG/JPEG/GIF files')
+    @click.option('--progressive', is_flag=True, default=None, help='Write a progressive JPEG')
+    @click.option('--fast', is_flag=True, default=None, help='Favour encoding speed over file size (e.g. PNG compression level 1)')
+    @click.option('--draft', is_flag=True, help='Decode at a reduced scale when the command starts with a large downscale (faster; the pixels may differ slightly, not the size)')
+    @click.option('--max-memory', type=click.IntRange(min=1), help='Process the image in strips using about this many MiB of pixel memory, and report the peak')
+    @click.option('--cache-dir', type=click.Path(file_okay=False), help='Reuse results cached in this directory, keyed by input content and command')
+    @click.option('--cache-size', type=click.IntRange(min=1), default=1024, show_default=True, help='Maximum size of the result cache in MiB; least recently used entries are evicted')
+    @click.option('--input-dir', type=click.Path(exists=True, file_okay=False), help='Process every image in a directory (batch mode)')
+    @click.option('--input-glob', help="Process every file matching a glob pattern, e.g. 'shots/**/*.jpg' (batch mode)")
+    @click.option('--output-dir', type=click.Path(file_okay=False), help='Directory to write batch outputs to')
+    @click.option('--output-template', default='{name}', show_default=True, help='Output filename template. Fields: {name}, {stem}, {ext}, {index}, {path}')
+    @click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, show_default=True, help='Number of worker processes in batch mode')
+    @click.option('--threads', type=click.IntRange(min=1), default=1, show_default=True, help='Use this many threads: for a single image, render horizontal bands in parallel; in batch mode, overlap reading, decoding, transforming, encoding and writing with this many threads per stage')
+    @click.option('--queue-depth', type=click.IntRange(min=1), help="Capacity of the queues between the stages of '--threads' (default: twice the threads)")
+    @click.option('--profile', type=click.Path(dir_okay=False), help='Write the time spent decoding, in each operator and encoding to this file')
+    @click.option('--profile-format', type=click.Choice(['json', 'chrome']), default='json', show_default=True, help="Format of '--profile': span list, or Chrome trace events for chrome://tracing and Perfetto")
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
     return update_wrapper(wrapper, func)
@@ -1,10 +1,17 @@
-from ..pipeline import pipe
 from functools import wraps
-from PIL import Image
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
+import click
 import sys
 
+# The image modules (and PIL) are imported when a command runs, not when the CLI is built,
+# and tkinter only when the file picker is actually needed.
+
+_BATCH_OPTIONS = ('input_dir', 'input_glob', 'output_dir', 'output_template', 'jobs', 'threads', 'queue_depth')
+
+# Encoder options, by option name and PIL save argument
+_ENCODER_OPTIONS = {'quality': 'quality', 'compress_level': 'compress_level', 'subsampling': 'subsampling',
+                    'webp_method': 'method', 'optimize': 'optimize', 'progressive': 'progressive',
+                    'fast': 'fast'}
+
 def image_io_wrapper(command_func):
     """
     Decorator to handle image input and output for CLI commands.
@@ -13,6 +20,25 @@ def image_io_wrapper(command_func):
     or a file dialog, processes it using the decorated command function, and
     saves the output to standard output.
 
+    In batch mode ('--input-dir' or '--input-glob'), the pipeline built by the command
+    function is reused for every matched file and the results are written to '--output-dir'.
+
+    The output is encoded in the input format unless '--format' is given, with the encoder
+    settings of '--quality', '--compress-level', '--fast' and the like.
+
+    With '--cache-dir', the encoded output is looked up by input content, command and options
+    before the input is decoded, and stored after a miss.
+
+    Animated and multi-page inputs (GIF, APNG, WebP, TIFF) are processed frame by frame and
+    written with all their frames when the output format can hold them (see
+    `image_utils.frames`); otherwise only their first frame is processed.
+
+    With '--threads' on a single image, the bands of the image are rendered in parallel
+    (see `tiling.run_in_bands`).
+
+    With '--profile', the decode, every operator and the encode are timed and written to the
+    given file (see `image_utils.profiling`), even if the command fails.
+
     Args:
         command_func (Callable): The command function to be decorated.
 
@@ -21,23 +47,297 @@ def image_io_wrapper(command_func):
     """
     @wraps(command_func)
     def wrapper(*args, **kwargs):
-        # Get the input path and opaque flag from the keyword arguments
-        input_path = kwargs.get('input')
-        opaque = kwargs.get('opaque', False)
-        # Fetch the input image based on the input path
-        image = _fetch_image(input_path=input_path)
-        # Execute the command function with the provided arguments
-        pipeline = pipe(command_func(*args, **kwargs))
-        # Process the image
-        output_image = pipeline(image)
-        # Convert the image to an opaque format if needed
-        if opaque and output_image.mode in ('RGBA', 'LA'):
-            output_image = output_image.convert('RGB')
-        # Save the output to standard output
-        output_image.save(sys.stdout.buffer, format=image.format)
+        profile_path = kwargs.pop('profile', None)
+        profile_format = kwargs.pop('profile_format', 'json')
+        if not profile_path:
+            return _process(command_func, args, kwargs)
+        from ..profiling import profile
+
+        with profile() as profiler:
+            try:
+                return _process(command_func, args, kwargs)
+            finally:
+                profiler.save(profile_path, profile_format)
     return wrapper
 
-def _fetch_image(input_path: str) -> Image.Image:
+def _process(command_func, args, kwargs):
+    """
+    Build the command's pipeline and run it on the input image(s) selected by the options.
+
+    Args:
+        command_func (Callable): The command function building the transformer.
+        args (tuple): Positional arguments for the command function.
+        kwargs (dict): Keyword arguments for the command function, including the common options.
+    """
+    from ..image_io import format_for_name, reduce_for
+    from ..pipeline import pipe
+
+    # Separate the batch options from the command arguments
+    batch_options = {name: kwargs.pop(name, None) for name in _BATCH_OPTIONS}
+    # Flags that are not set count as not given, so they do not force a re-encode; zero values
+    # such as '--compress-level 0' are real settings
+    encoder = {param: kwargs.pop(name, None) for name, param in _ENCODER_OPTIONS.items()}
+    encoder = {param: value for param, value in encoder.items() if value is not None and value is not False}
+    format = kwargs.pop('format', None)
+    if format:
+        try:
+            format = format_for_name(format)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--format'")
+    draft = kwargs.pop('draft', False)
+    mode = kwargs.pop('mode', None)
+    max_memory = kwargs.pop('max_memory', None)
+    cache_dir = kwargs.pop('cache_dir', None)
+    cache_size = kwargs.pop('cache_size', 1024)
+    # Strip-based results may differ slightly from whole-image ones, so they are not cached
+    cache = None
+    if cache_dir and not max_memory:
+        from ..cache import ResultCache
+        cache = ResultCache(cache_dir, cache_size * 1024 * 1024)
+    if batch_options['input_dir'] or batch_options['input_glob']:
+        return _run_batch(command_func, args, kwargs, draft=draft, mode=mode, cache=cache,
+                          format=format, encoder=encoder, **batch_options)
+    # Get the input path and opaque flag from the keyword arguments
+    input_path = kwargs.get('input')
+    opaque = kwargs.get('opaque', False)
+    if cache is not None:
+        return _run_cached(command_func, args, kwargs, input_path, opaque, draft, mode, cache,
+                           format, encoder)
+    # Fetch the input image based on the input path
+    image = _fetch_image(input_path=input_path)
+    # Execute the command function with the provided arguments
+    pipeline = pipe(command_func(*args, **kwargs), mode=mode)
+    if _write_frames(image, pipeline, opaque, sys.stdout.buffer, format, encoder):
+        return
+    source, pipeline = reduce_for(image, pipeline) if draft else (image, pipeline)
+    if max_memory:
+        from ..tiling import supports_strips
+        if supports_strips(pipeline):
+            return _run_in_strips(pipeline, source, format or image.format, opaque, max_memory, encoder)
+        click.echo("Note: this command cannot run in strips; processing the whole image.", err=True)
+    with _phase('decode', format=image.format) as span:
+        if span:
+            # Decode up front, so the time is not counted against the first operator
+            source.load()
+            span.set_output(source)
+    threads = batch_options['threads'] or 1
+    if threads > 1:
+        from ..tiling import run_in_bands
+        output_image = run_in_bands(pipeline, source, workers=threads)
+    else:
+        output_image = pipeline(source)
+    _write_output(image, output_image, opaque, sys.stdout.buffer, format, encoder)
+
+def _write_output(image, output_image, opaque, fp, format=None, encoder=None):
+    """
+    Write the processed image to a binary stream, in the input format by default.
+
+    The input is copied as-is if nothing changed and no encoder setting asks for a re-encode,
+    otherwise the output image is encoded.
+
+    Args:
+        image (Image.Image): The input image.
+        output_image (Image.Image): The processed image.
+        opaque (bool): Convert the output image to an opaque format.
+        fp (BinaryIO): The stream to write to.
+        format (Optional[str]): The output format, or None for the input format.
+        encoder (Optional[dict]): Encoder settings (see `image_io.encoder_params`).
+    """
+    from ..image_io import copy_encoded, is_passthrough, reencodes, save_image
+
+    format = format or image.format
+    with _phase('encode', output_image, format=format):
+        if not (not reencodes(encoder) and is_passthrough(image, output_image, format, opaque)
+                and copy_encoded(image, fp)):
+            save_image(output_image, fp, format=format, opaque=opaque, encoder=encoder)
+
+def _write_frames(image, pipeline, opaque, fp, format=None, encoder=None):
+    """
+    Process every frame of an animated or multi-page image and write them all to a binary stream.
+
+    Args:
+        image (Image.Image): The input image.
+        pipeline (Pipeline): The pipeline to apply to each frame.
+        opaque (bool): Convert the output frames to an opaque format.
+        fp (BinaryIO): The stream to write to.
+        format (Optional[str]): The output format, or None for the input format.
+        encoder (Optional[dict]): Encoder settings (see `image_io.encoder_params`).
+
+    Returns:
+        bool: True if the frames were written, False if the image has a single frame or the
+        output format cannot hold several.
+    """
+    from ..frames import is_animated, save_animation, saves_frames
+
+    format = format or image.format
+    if not (is_animated(image) and saves_frames(format)):
+        return False
+    # Frames are decoded, transformed and encoded in one go, so they share a single phase
+    with _phase('frames', image, format=format, frames=image.n_frames):
+        save_animation(pipeline, image, fp, format=format, opaque=opaque, encoder=encoder)
+    return True
+
+def _phase(name, image=None, **args):
+    """
+    Time a decode or encode phase when profiling.
+
+    Returns:
+        ContextManager[Optional[Span]]: A span of the active profiler, or a context yielding None.
+    """
+    from contextlib import nullcontext
+    from ..profiling import active_profiler
+
+    profiler = active_profiler()
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(name, name, image, **args)
+
+def _run_cached(command_func, args, kwargs, input_path, opaque, draft, mode, cache, format, encoder):
+    """
+    Process a single image through the result cache and write it to standard output.
+
+    Args:
+        command_func (Callable): The command function building the transformer.
+        args (tuple): Positional arguments for the command function.
+        kwargs (dict): Keyword arguments for the command function.
+        input_path (Optional[str]): The path to the input image.
+        opaque (bool): Convert the output image to an opaque format.
+        draft (bool): Decode at a reduced scale ahead of a leading downscale.
+        mode (Optional[str]): The output mode, or None to keep the mode.
+        cache (ResultCache): The result cache.
+        format (Optional[str]): The output format, or None for the input format.
+        encoder (dict): Encoder settings (see `image_io.encoder_params`).
+    """
+    from io import BytesIO
+    from ..cache import cache_key, file_digest, path_digest
+    from ..image_io import open_image, reduce_for
+    from ..pipeline import pipe
+
+    pipeline = pipe(command_func(*args, **kwargs), mode=mode)
+    if input_path:
+        source, digest = input_path, path_digest(input_path)
+    elif not sys.stdin.isatty():
+        source = BytesIO(sys.stdin.buffer.read())
+        digest = file_digest(source)
+        source.seek(0)
+    else:
+        source = _fetch_image(input_path=None).filename
+        digest = path_digest(source)
+    key = cache_key(digest, pipeline, format, opaque=opaque, draft=draft, **encoder)
+    data = cache.get(key) if key else None
+    if data is None:
+        image = open_image(source)
+        buffer = BytesIO()
+        if not _write_frames(image, pipeline, opaque, buffer, format, encoder):
+            source, steps = reduce_for(image, pipeline) if draft else (image, pipeline)
+            _write_output(image, steps(source), opaque, buffer, format, encoder)
+        data = buffer.getvalue()
+        if key:
+            cache.put(key, data)
+    sys.stdout.buffer.write(data)
+    _report_cache(cache)
+
+def _report_cache(cache):
+    """Print the hit and miss counts of the result cache to standard error."""
+    stats = cache.stats
+    click.echo(f"Cache: {stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions", err=True)
+
+def _run_in_strips(pipeline, image, format, opaque, max_memory, encoder):
+    """
+    Process the image strip by strip and write it to standard output, reporting memory use.
+
+    PNG output is streamed without assembling the whole image; other formats are assembled
+    in memory before being saved.
+
+    Args:
+        pipeline (Pipeline): The pipeline to run.
+        image (Image.Image): The input image.
+        format (str): The output format.
+        opaque (bool): Convert the output image to an opaque format.
+        max_memory (int): Pixel memory budget per strip, in MiB.
+        encoder (dict): Encoder settings (see `image_io.encoder_params`).
+    """
+    from ..image_io import encoder_params, save_image
+    from ..tiling import DEFAULT_COMPRESS_LEVEL, run_in_strips
+
+    budget = max_memory * 1024 * 1024
+    if format == 'PNG':
+        compress_level = encoder_params(format, encoder).get('compress_level', DEFAULT_COMPRESS_LEVEL)
+        _, stats = run_in_strips(pipeline, image, fp=sys.stdout.buffer, max_memory=budget,
+                                 opaque=opaque, compress_level=compress_level)
+    else:
+        output_image, stats = run_in_strips(pipeline, image, max_memory=budget)
+        save_image(output_image, sys.stdout.buffer, format=format, opaque=opaque, encoder=encoder)
+    peak_rss = f"{stats.peak_rss / 2 ** 20:.1f} MiB" if stats.peak_rss else "n/a"
+    click.echo(f"Processed {stats.strips} strips of {stats.strip_height} rows; "
+               f"peak strip memory {stats.peak_strip_bytes / 2 ** 20:.1f} MiB, "
+               f"peak RSS {peak_rss}", err=True)
+
+def _run_batch(command_func, args, kwargs, input_dir, input_glob, output_dir, output_template, jobs,
+               threads, queue_depth, draft, mode, cache, format, encoder):
+    """
+    Run the command over every input file of a batch, in-process or in a worker pool.
+
+    Args:
+        command_func (Callable): The command function building the transformer.
+        args (tuple): Positional arguments for the command function.
+        kwargs (dict): Keyword arguments for the command function.
+        input_dir (Optional[str]): Directory of input images.
+        input_glob (Optional[str]): Glob pattern of input images.
+        output_dir (Optional[str]): Directory to write outputs to.
+        output_template (str): Output filename template.
+        jobs (int): Number of worker processes.
+        threads (int): Threads per stage of the staged executor, when `jobs` is 1.
+        queue_depth (Optional[int]): Capacity of the queues between stages.
+        draft (bool): Decode at a reduced scale ahead of a leading downscale.
+        mode (Optional[str]): The output mode, or None to keep the mode.
+        cache (Optional[ResultCache]): The result cache, if enabled.
+        format (Optional[str]): The output format, or None to follow the output template.
+        encoder (dict): Encoder settings (see `image_io.encoder_params`).
+    """
+    from ..batch import DEFAULT_OUTPUT_TEMPLATE, collect_inputs, output_paths, run_batch
+    from ..image_io import extension_for_format
+    from ..pipeline import pipe
+
+    if not output_dir:
+        raise click.UsageError("'--output-dir' is required with '--input-dir' or '--input-glob'.")
+    input_paths = collect_inputs(input_dir=input_dir, input_glob=input_glob)
+    if not input_paths:
+        click.echo("No input files matched. Exiting.", err=True)
+        sys.exit(1)
+    transformer = command_func(*args, **kwargs)
+    if transformer is None:
+        return
+    if format and output_template == DEFAULT_OUTPUT_TEMPLATE:
+        # Name the outputs after the format they are written in
+        output_template = '{stem}' + extension_for_format(format)
+    try:
+        output_paths(input_paths, output_dir, output_template)
+    except ValueError as e:
+        raise click.UsageError(f"{e} Use an '--output-template' with '{{index}}' (e.g. '{{stem}}_{{index}}{{ext}}') "
+                               f"or '{{path}}' to keep the relative path of the inputs, or another '--output-dir'.")
+    # Build the pipeline once and reuse it for every file
+    pipeline = pipe(transformer, mode=mode)
+    failures = 0
+    for input_path, _, error in run_batch(pipeline, input_paths, output_dir,
+                                          template=output_template,
+                                          opaque=kwargs.get('opaque', False),
+                                          jobs=jobs,
+                                          threads=threads or 1,
+                                          queue_depth=queue_depth,
+                                          draft=draft,
+                                          cache=cache,
+                                          format=format,
+                                          encoder=encoder):
+        if error is not None:
+            failures += 1
+            click.echo(f"Error: {input_path}: {error}", err=True)
+    if cache is not None:
+        _report_cache(cache)
+    if failures:
+        sys.exit(1)
+
+def _fetch_image(input_path: str) -> 'Image.Image':
     """
     Fetch the input image from the specified path, standard input, or a file dialog.
 
@@ -47,17 +347,21 @@ def _fetch_image(input_path: str) -> Image.Image:
     Returns:
         Image.Image: The loaded image.
     """
+    from ..image_io import open_image
+
     if input_path:
         # Load the image from the specified file path
-        return Image.open(input_path)
+        return open_image(input_path)
     if not sys.stdin.isatty():
         # Load the image from standard input if provided
-        return Image.open(sys.stdin.buffer)
+        return open_image(sys.stdin.buffer)
     # Open a file dialog to select the image file
+    from tkinter import Tk
+    from tkinter.filedialog import askopenfilename
     Tk().withdraw()
     input_path = askopenfilename(title="Select an image to process")
     if not input_path:
         # Exit if no input file is provided
         print("No input file provided. Exiting.")
         sys.exit(1)
-    return Image.open(input_path)
+    return open_image(input_path)
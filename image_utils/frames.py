@@ -0,0 +1,178 @@
+from PIL import Image, ImageSequence
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .core.image_transformer import ImageTransformer
+from .image_io import encoder_params, format_for_path
+from .operators.crop_operator import CropOperator
+from .operators.trim_operator import TrimOperator
+from .optimizer import flatten
+
+# Formats whose frames are timed, by the name of PIL's save_all writer
+_ANIMATION_FORMATS = ('GIF', 'PNG', 'WEBP')
+
+Box = Tuple[int, int, int, int]
+
+def is_animated(image: Image.Image) -> bool:
+    """
+    Tell whether an image has more than one frame (an animation or a multi-page file).
+
+    Args:
+        image (Image.Image): An image returned by `open_image`.
+
+    Returns:
+        bool: True if the image has several frames.
+    """
+    return getattr(image, 'n_frames', 1) > 1
+
+def saves_frames(format: Optional[str]) -> bool:
+    """
+    Tell whether PIL can write several frames in a format.
+
+    Args:
+        format (Optional[str]): The output format.
+
+    Returns:
+        bool: True for animated (GIF, APNG, WebP) and multi-page (TIFF, PDF) formats.
+    """
+    Image.init()
+    return format is not None and format.upper() in Image.SAVE_ALL
+
+def resolve_frames(transformer: ImageTransformer, image: Image.Image) -> ImageTransformer:
+    """
+    Adapt a transformer so that it gives every frame of an image the same geometry.
+
+    Trimming each frame on its own would give frames of different sizes, so every trim is
+    replaced by a crop to the union of its boxes over all the frames. The boxes are found in
+    a first pass over the frames, decoding one frame at a time. Transformers without a trim
+    are returned as they are.
+
+    Args:
+        transformer (ImageTransformer): The transformer (usually a Pipeline) to apply.
+        image (Image.Image): The multi-frame image it is going to be applied to.
+
+    Returns:
+        ImageTransformer: A transformer to apply to every frame.
+    """
+    from .pipeline import Pipeline
+
+    operators = flatten(transformer, expand_fused=True)
+    if not any(isinstance(operator, TrimOperator) for operator in operators):
+        return transformer
+    resolved: List[ImageTransformer] = []
+    for operator in operators:
+        if isinstance(operator, TrimOperator):
+            box = _union_bbox(Pipeline(list(resolved)), operator, image)
+            if box is not None:
+                # Frames that are blank throughout keep the 1x1 result of the trim
+                operator = CropOperator(*box)
+        resolved.append(operator)
+    return Pipeline(resolved)
+
+def _union_bbox(prefix: ImageTransformer, trim: TrimOperator, image: Image.Image) -> Optional[Box]:
+    """Return the union of the trim boxes of all frames after `prefix`, or None if all are blank."""
+    union: Optional[Box] = None
+    for frame in ImageSequence.Iterator(image):
+        box = trim.bbox(prefix(frame))
+        if box is None:
+            continue
+        if union is None:
+            union = box
+        else:
+            union = (min(union[0], box[0]), min(union[1], box[1]),
+                     max(union[2], box[2]), max(union[3], box[3]))
+    image.seek(0)
+    return union
+
+def iter_frames(transformer: ImageTransformer, image: Image.Image) -> Iterator[Image.Image]:
+    """
+    Apply a transformer to every frame of an image, one frame at a time.
+
+    Frames are decoded lazily with `ImageSequence`, so only the current input frame is held in
+    memory. Trims are resolved across frames first (see `resolve_frames`), and the duration of
+    each input frame is kept in the `info` of its output. Single-frame images yield one frame.
+
+    Args:
+        transformer (ImageTransformer): The transformer (usually a Pipeline) to apply.
+        image (Image.Image): The image to process, as returned by `open_image`.
+
+    Yields:
+        Image.Image: The transformed frames, in order.
+    """
+    transformer = resolve_frames(transformer, image)
+    try:
+        for frame in ImageSequence.Iterator(image):
+            # Some decoders (e.g. WebP) only fill in the frame timing once it is loaded
+            frame.load()
+            duration = frame.info.get('duration')
+            result = transformer(frame)
+            if result is frame:
+                # The next seek reuses the frame's pixels
+                result = frame.copy()
+            if duration is not None:
+                result.info['duration'] = duration
+            yield result
+    finally:
+        image.seek(0)
+
+def save_frames(frames: Iterable[Image.Image], fp: Union[str, BinaryIO], format: Optional[str] = None,
+                opaque: bool = False, encoder: Optional[Dict[str, Any]] = None,
+                loop: Optional[int] = None) -> None:
+    """
+    Save frames as one animated or multi-page image.
+
+    The frame durations are taken from the `info` of each frame. PIL's animation writers
+    compare every frame with the previous ones and take their frames as a list, so the frames
+    are collected before they are written.
+
+    Args:
+        frames (Iterable[Image.Image]): The frames to save, at least one.
+        fp (Union[str, BinaryIO]): The output path or binary stream.
+        format (Optional[str]): The output format. If omitted, it is inferred from the path.
+        opaque (bool): Drop the alpha channel of every frame before saving. Default is False.
+        encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+        loop (Optional[int]): Number of times an animation repeats (0 for forever), if known.
+
+    Raises:
+        ValueError: If there are no frames.
+    """
+    if format is None and isinstance(fp, str):
+        format = format_for_path(fp)
+    frames = list(frames)
+    if not frames:
+        raise ValueError("Cannot save an image without frames.")
+    if len({frame.mode for frame in frames}) > 1:
+        # GIF decodes its first frame as 'P' and the others as 'RGB(A)', which the APNG writer
+        # cannot mix, so the frames are brought to one mode
+        alpha = any(frame.mode in ('RGBA', 'LA', 'PA') or 'transparency' in frame.info for frame in frames)
+        mode = 'RGBA' if alpha else 'RGB'
+        frames = [frame if frame.mode == mode else frame.convert(mode) for frame in frames]
+    frames = [frame.convert(frame.mode[:-1]) if opaque and frame.mode in ('RGBA', 'LA') else frame
+              for frame in frames]
+    params = encoder_params(format, encoder)
+    if format in _ANIMATION_FORMATS:
+        # The WebP writer does not read the durations from the frames
+        params.setdefault('duration', [frame.info.get('duration', 0) for frame in frames])
+        if loop is not None:
+            params.setdefault('loop', loop)
+    frames[0].save(fp, format=format, save_all=True, append_images=frames[1:], **params)
+
+def save_animation(transformer: ImageTransformer, image: Image.Image, fp: Union[str, BinaryIO],
+                   format: Optional[str] = None, opaque: bool = False,
+                   encoder: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Apply a transformer to every frame of an image and save the result with all its frames.
+
+    The input frames are decoded one at a time (see `iter_frames`), and the loop count of an
+    animation is kept.
+
+    Args:
+        transformer (ImageTransformer): The transformer (usually a Pipeline) to apply.
+        image (Image.Image): The image to process, as returned by `open_image`.
+        fp (Union[str, BinaryIO]): The output path or binary stream.
+        format (Optional[str]): The output format. Defaults to the one of the path, then the input.
+        opaque (bool): Drop the alpha channel of every frame before saving. Default is False.
+        encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+    """
+    if format is None:
+        format = format_for_path(fp, image.format) if isinstance(fp, str) else image.format
+    save_frames(iter_frames(transformer, image), fp, format=format, opaque=opaque, encoder=encoder,
+                loop=image.info.get('loop'))
@@ -0,0 +1,294 @@
+from PIL import Image
+import os
+import shutil
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+from .core.image_transformer import ImageTransformer
+# Registers the uncompressed IU-RAW format with PIL
+from . import raw_format
+
+# Encoder settings of the 'fast' preset by format, trading file size for encoding speed.
+# Explicit settings take precedence.
+FAST_ENCODER_OPTIONS = {
+    'PNG': {'compress_level': 1},
+    'WEBP': {'method': 0},
+    'AVIF': {'speed': 10},
+}
+
+# Modes written by the encoders of formats that do not convert other modes themselves
+_ENCODER_MODES = {
+    'JPEG': ('1', 'L', 'RGB', 'CMYK'),
+    'PPM': ('1', 'L', 'I', 'RGB'),
+    'BMP': ('1', 'L', 'P', 'RGB', 'RGBA'),
+    'PNG': ('1', 'L', 'LA', 'I', 'I;16', 'P', 'RGB', 'RGBA'),
+    raw_format.FORMAT: tuple(mode for mode in Image.MODES if mode not in ('P', 'PA')),
+}
+
+def open_image(source: Union[str, BinaryIO]) -> Image.Image:
+    """
+    Open an image from a file path or a binary file object.
+
+    Args:
+        source (Union[str, BinaryIO]): The path or binary stream to read from.
+
+    Returns:
+        Image.Image: The opened image.
+    """
+    return Image.open(source)
+
+def reduce_for(image: Image.Image, transformer: ImageTransformer,
+               reducing_gap: float = 2.0) -> Tuple[Image.Image, ImageTransformer]:
+    """
+    Decode or shrink the image ahead of a large downscale at the start of the transformer.
+
+    If the transformer begins (after size-preserving flips and gray scale conversions) with a
+    resize that shrinks the image by more than `reducing_gap`, JPEG images are decoded at a
+    reduced DCT scale with `Image.draft`, and other images are shrunk with `Image.reduce`,
+    keeping at least `reducing_gap` times the target size for the final resample. This mirrors
+    what `Image.thumbnail` does and changes the output pixels slightly.
+
+    The output size is not changed: a resize whose size depends on the input (one side given,
+    or the 'contain' fit) is replaced by one to the exact size computed from the original image.
+
+    Args:
+        image (Image.Image): The opened image. Must not be loaded yet for draft decoding.
+        transformer (ImageTransformer): The transformer about to be applied.
+        reducing_gap (float): Minimum ratio kept between the reduced and the target size.
+
+    Returns:
+        Tuple[Image.Image, ImageTransformer]: The image to process (possibly the same object)
+        and the transformer to apply to it (possibly the same object).
+    """
+    size = image.size
+    target = _leading_resize_target(transformer, size)
+    if target is None:
+        return image, transformer
+    width, height = size
+    factor = min(width / (target[0] * reducing_gap), height / (target[1] * reducing_gap))
+    if factor < 2:
+        return image, transformer
+    if image.format == 'JPEG':
+        # Let the decoder pick the largest DCT scale that keeps the requested size
+        image.draft(image.mode, (int(target[0] * reducing_gap), int(target[1] * reducing_gap)))
+        if image.size == size:
+            return image, transformer
+    else:
+        image = image.reduce(int(factor))
+    return image, _pin_leading_resize(transformer, size)
+
+def _pin_leading_resize(transformer: ImageTransformer, size: Tuple[int, int]) -> ImageTransformer:
+    """Replace the leading resize by one to the output size it gives for an input of `size`."""
+    from .operators.resize_operator import ResizeOperator
+    from .optimizer import flatten
+    from .pipeline import Pipeline
+
+    operators = flatten(transformer, expand_fused=True)
+    for index, operator in enumerate(operators):
+        if isinstance(operator, ResizeOperator):
+            if operator.width and operator.height and operator.fit != 'contain':
+                # 'fill' and 'cover' give the requested size whatever the input size
+                return transformer
+            width, height = operator.target_size(size)
+            operators[index] = ResizeOperator(width, height, resample=operator.resample,
+                                              reducing_gap=operator.reducing_gap)
+            return Pipeline(operators)
+    return transformer
+
+def _leading_resize_target(transformer: ImageTransformer,
+                           size: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    """Return the target size of the first resize if only size-preserving operators precede it."""
+    from .operators.flip_operator import FlipOperator
+    from .operators.gray_scale_operator import GrayScaleOperator
+    from .operators.resize_operator import ResizeOperator
+    from .optimizer import flatten
+
+    for operator in flatten(transformer, expand_fused=True):
+        if isinstance(operator, ResizeOperator):
+            width, height = operator.target_size(size)
+            box = operator.source_box(size)
+            if box:
+                # Only a region is kept: the whole image is scaled to a larger size
+                left, top, right, bottom = box
+                width, height = int(width * size[0] / (right - left)), int(height * size[1] / (bottom - top))
+            return (width, height) if width and height else None
+        if not isinstance(operator, (FlipOperator, GrayScaleOperator)):
+            return None
+    return None
+
+def is_passthrough(image: Image.Image, output_image: Image.Image, format: Optional[str],
+                   opaque: bool = False) -> bool:
+    """
+    Tell whether an output can be written by copying the encoded bytes of the input.
+
+    Args:
+        image (Image.Image): The input image.
+        output_image (Image.Image): The image returned by the transformer.
+        format (Optional[str]): The output format.
+        opaque (bool): Whether the output is to be converted to an opaque format.
+
+    Returns:
+        bool: True if the transformer returned the input untouched and no conversion is needed.
+    """
+    return (output_image is image and format == image.format
+            and not (opaque and image.mode in ('RGBA', 'LA')))
+
+def copy_encoded(image: Image.Image, fp: BinaryIO) -> bool:
+    """
+    Write the original encoded bytes of an unmodified image, without decoding or re-encoding it.
+
+    Args:
+        image (Image.Image): An image returned by `open_image`.
+        fp (BinaryIO): The binary stream to write to.
+
+    Returns:
+        bool: True if the bytes were copied, False if the source is not available.
+    """
+    if getattr(image, 'filename', None):
+        with open(image.filename, 'rb') as source:
+            shutil.copyfileobj(source, fp)
+        return True
+    source = getattr(image, 'fp', None)
+    if source is not None and source.seekable():
+        source.seek(0)
+        shutil.copyfileobj(source, fp)
+        return True
+    return False
+
+def save_image(image: Image.Image, fp: Union[str, BinaryIO], format: Optional[str] = None,
+               opaque: bool = False, encoder: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Save a processed image, optionally converting it to an opaque format first.
+
+    Images in a mode the encoder of the format cannot write (e.g. 'RGBA' or 'P' as JPEG) are
+    converted to the closest mode it can (see `mode_for_format`).
+
+    Args:
+        image (Image.Image): The image to save.
+        fp (Union[str, BinaryIO]): The output path or binary stream.
+        format (Optional[str]): The output format. If omitted, it is inferred from the path.
+        opaque (bool): Drop the alpha channel (RGBA to RGB, LA to L) before saving. Default is False.
+        encoder (Optional[Dict[str, Any]]): Encoder settings (see `encoder_params`). Default is None.
+    """
+    # Convert the image to an opaque format if needed
+    if opaque and image.mode in ('RGBA', 'LA'):
+        image = image.convert(image.mode[:-1])
+    if format is None and isinstance(fp, str):
+        format = format_for_path(fp)
+    mode = mode_for_format(image, format)
+    if mode != image.mode:
+        image = image.convert(mode)
+    image.save(fp, format=format, **encoder_params(format, encoder))
+
+def mode_for_format(image: Image.Image, format: Optional[str]) -> str:
+    """
+    Return the mode to save an image in, for formats that can only write some modes.
+
+    Palettes are expanded to 'RGB' or 'RGBA', then an alpha channel the format cannot store is
+    dropped ('RGBA' to 'RGB', 'LA' to 'L'). Other modes fall back to 'L' or 'RGB'.
+
+    Args:
+        image (Image.Image): The image to save.
+        format (Optional[str]): The output format.
+
+    Returns:
+        str: The mode of the image if the format can write it, otherwise the mode to convert to.
+    """
+    accepted = _ENCODER_MODES.get(format)
+    mode = image.mode
+    if accepted is None or mode in accepted:
+        return mode
+    if mode in ('P', 'PA'):
+        mode = 'RGBA' if mode == 'PA' or image.has_transparency_data else 'RGB'
+        if mode in accepted:
+            return mode
+    if mode in ('RGBA', 'LA') and mode[:-1] in accepted:
+        return mode[:-1]
+    return 'L' if Image.getmodebands(mode) == 1 else 'RGB'
+
+def encoder_params(format: Optional[str], encoder: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Resolve encoder settings into the keyword arguments of `Image.save` for a format.
+
+    The settings use PIL's own names (`quality`, `compress_level`, `subsampling`, `method`,
+    `optimize`, `progressive`, ...), which encoders of other formats ignore. `fast=True` adds
+    the settings of `FAST_ENCODER_OPTIONS` for the format, and None values are dropped.
+
+    Args:
+        format (Optional[str]): The output format.
+        encoder (Optional[Dict[str, Any]]): The encoder settings.
+
+    Returns:
+        Dict[str, Any]: The keyword arguments for `Image.save`.
+    """
+    encoder = {key: value for key, value in (encoder or {}).items() if value is not None}
+    params = dict(FAST_ENCODER_OPTIONS.get(format, {})) if encoder.pop('fast', False) else {}
+    params.update(encoder)
+    return params
+
+def reencodes(encoder: Optional[Dict[str, Any]]) -> bool:
+    """
+    Tell whether encoder settings ask for the output to be re-encoded.
+
+    Explicit settings rule out copying the input bytes of an unchanged image, while the
+    'fast' preset alone does not (copying is faster still).
+
+    Args:
+        encoder (Optional[Dict[str, Any]]): The encoder settings.
+
+    Returns:
+        bool: True if any setting other than `fast` is given.
+    """
+    return any(value is not None for key, value in (encoder or {}).items() if key != 'fast')
+
+def format_for_name(name: str) -> str:
+    """
+    Resolve an output format given by name or by extension, e.g. 'png', 'jpg' or 'iuraw'.
+
+    Args:
+        name (str): The format name or extension, in any case.
+
+    Returns:
+        str: The PIL format name.
+
+    Raises:
+        ValueError: If PIL cannot save in that format.
+    """
+    Image.init()
+    format = name.upper()
+    if format not in Image.SAVE:
+        format = Image.registered_extensions().get('.' + name.lower().lstrip('.'))
+    if format not in Image.SAVE:
+        raise ValueError(f"Unknown output format '{name}'.")
+    return format
+
+def extension_for_format(format: str) -> str:
+    """
+    Return the usual file extension of a PIL format.
+
+    Args:
+        format (str): The format name, e.g. 'JPEG'.
+
+    Returns:
+        str: The extension including the dot, e.g. '.jpg'.
+
+    Raises:
+        ValueError: If no extension is registered for the format.
+    """
+    extensions = [ext for ext, name in Image.registered_extensions().items() if name == format]
+    if not extensions:
+        raise ValueError(f"No file extension is registered for format '{format}'.")
+    # Prefer the extension spelled like the format, e.g. '.png' over '.apng'
+    return min(extensions, key=lambda ext: (ext[1:].upper() != format, len(ext), ext))
+
+def format_for_path(path: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Look up the PIL format registered for the extension of the given path.
+
+    Args:
+        path (str): The file path.
+        default (Optional[str]): The format to use if the extension is unknown.
+
+    Returns:
+        Optional[str]: The registered format name, or the default.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    return Image.registered_extensions().get(extension, default)
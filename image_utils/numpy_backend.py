@@ -0,0 +1,340 @@
+from PIL import Image, ImageColor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+from .core.image_transformer import ImageTransformer
+from .operators.crop_operator import CropOperator
+from .operators.expand_operator import ExpandOperator
+from .operators.flip_operator import FlipOperator
+from .operators.gray_scale_operator import GrayScaleOperator
+from .operators.image_operator import ImageOperator
+from .operators.roll_operator import RollOperator
+from .operators.trim_operator import TrimOperator
+from .core.color import color_for_mode
+from .optimizer import flatten
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+# Image modes the kernels work on, by number of channels
+MODES = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}
+
+# Fixed-point ITU-R 601-2 luma weights, as used by PIL's convert('L')
+_LUMA_WEIGHTS = (19595, 38470, 7471)
+
+def available() -> bool:
+    """Return True if NumPy is installed and the backend can be used."""
+    return np is not None
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("The NumPy backend requires numpy; install it with "
+                          "`pip install image-utils-package[numpy]`.")
+
+def run_stack(transformer: ImageTransformer, images: Sequence[Image.Image]) -> List[Image.Image]:
+    """
+    Apply a transformer to many images by running it on stacked NumPy arrays.
+
+    Images of the same size and mode are stacked into one `(N, H, W, C)` uint8 array, and
+    crop, flip, roll, expand, gray scale and trim run as single array operations on the whole
+    stack. Other transformers fall back to running image by image, after which the results are
+    stacked again. The output is pixel-identical to calling the transformer on each image.
+
+    Args:
+        transformer (ImageTransformer): The transformer to apply.
+        images (Sequence[Image.Image]): The input images, in any mix of sizes and modes.
+
+    Returns:
+        List[Image.Image]: The transformed images, in input order.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+    _require_numpy()
+    return _run_images(flatten(transformer, expand_fused=True), list(images))
+
+def run_array(transformer: ImageTransformer, array: Any) -> 'np.ndarray':
+    """
+    Apply a transformer to a single image given as an array, avoiding copies where possible.
+
+    The input can be any `(H, W)` or `(H, W, C)` uint8 array-like (a NumPy array, an OpenCV
+    frame, a buffer exporting `__array_interface__`). Crops and flips return strided views of
+    the input, trim returns a view of its bounding box, and roll, expand and gray scale write
+    one new buffer. Other transformers convert to an `Image` and back, which copies the pixels.
+
+    Args:
+        transformer (ImageTransformer): The transformer to apply.
+        array (Any): The input pixels; C selects the mode (L, LA, RGB or RGBA).
+
+    Returns:
+        np.ndarray: The output pixels, `(H, W)` for single-channel results and
+        `(H, W, C)` otherwise. May be a view of the input.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+        ValueError: If the array is not uint8 or has an unsupported shape.
+    """
+    _require_numpy()
+    source = np.asarray(array)
+    if source.dtype != np.uint8:
+        raise ValueError(f"Only uint8 arrays are supported, not {source.dtype}.")
+    if source.ndim == 2:
+        source = source[..., np.newaxis]
+    if source.ndim != 3 or source.shape[-1] not in MODES:
+        raise ValueError(f"Expected an (H, W) or (H, W, C) array with 1 to 4 channels, not {source.shape}.")
+
+    stack = source[np.newaxis]
+    for operator in flatten(transformer, expand_fused=True):
+        if isinstance(operator, TrimOperator):
+            box = _bboxes(stack, operator)[0]
+            if box is None:
+                stack = to_array([operator(to_images(stack)[0])])
+            else:
+                left, top, right, bottom = box
+                stack = stack[:, top:bottom, left:right, :]
+            continue
+        kernel = _KERNELS.get(type(operator))
+        result = kernel(stack, operator) if kernel else None
+        if result is None:
+            image = to_images(stack)[0]
+            output = operator(image)
+            # Operators return their input unchanged when there is nothing to do
+            result = stack if output is image else to_array([output])
+        stack = result
+    return stack[0, ..., 0] if stack.shape[-1] == 1 else stack[0]
+
+def is_array(obj: Any) -> bool:
+    """Return True if `obj` is an array-like image rather than a PIL image."""
+    if isinstance(obj, Image.Image):
+        return False
+    return (isinstance(obj, memoryview) or hasattr(obj, '__array_interface__')
+            or hasattr(obj, '__array_struct__'))
+
+def to_array(images: Sequence[Image.Image]) -> 'np.ndarray':
+    """
+    Stack images of the same size and mode into an `(N, H, W, C)` uint8 array.
+
+    Args:
+        images (Sequence[Image.Image]): Images in one of the modes L, LA, RGB or RGBA.
+
+    Returns:
+        np.ndarray: The stacked pixels.
+
+    Raises:
+        ValueError: If the images differ in size or mode, or use an unsupported mode.
+    """
+    _require_numpy()
+    if len({(image.size, image.mode) for image in images}) > 1:
+        raise ValueError("Only images of the same size and mode can be stacked.")
+    if images and images[0].mode not in MODES.values():
+        raise ValueError(f"Mode '{images[0].mode}' is not supported by the NumPy backend.")
+    if not images:
+        return np.empty((0, 0, 0, 1), dtype=np.uint8)
+    width, height = images[0].size
+    array = np.empty((len(images), height, width, len(images[0].getbands())), dtype=np.uint8)
+    for index, image in enumerate(images):
+        # Copy the raw pixels straight into the stack, without an intermediate array per image
+        array[index].reshape(-1)[:] = np.frombuffer(image.tobytes(), dtype=np.uint8)
+    return array
+
+def to_images(array: 'np.ndarray') -> List[Image.Image]:
+    """
+    Convert an `(N, H, W, C)` uint8 array back into images.
+
+    Args:
+        array (np.ndarray): The stacked pixels; C selects the mode (L, LA, RGB or RGBA).
+
+    Returns:
+        List[Image.Image]: One image per entry of the stack.
+    """
+    _require_numpy()
+    count, height, width, channels = array.shape
+    mode = MODES[channels]
+    array = _contiguous(array)
+    # Each image wraps its slice of the stack instead of copying it
+    return [Image.frombuffer(mode, (width, height), a, 'raw', mode, 0, 1) for a in array]
+
+def _run_images(operators: List[ImageTransformer], images: List[Image.Image]) -> List[Image.Image]:
+    """Group images by size and mode and run each group as one stack."""
+    if not operators or not images:
+        return images
+    groups: Dict[Tuple[Tuple[int, int], str], List[int]] = {}
+    for index, image in enumerate(images):
+        groups.setdefault((image.size, image.mode), []).append(index)
+
+    results: List[Optional[Image.Image]] = [None] * len(images)
+    for (_, mode), indices in groups.items():
+        group = [images[i] for i in indices]
+        if mode in MODES.values():
+            outputs = _run_array(operators, to_array(group))
+        else:
+            outputs = _run_images(operators[1:], [operators[0](image) for image in group])
+        for index, output in zip(indices, outputs):
+            results[index] = output
+    return results
+
+def _run_array(operators: List[ImageTransformer], array: 'np.ndarray') -> List[Image.Image]:
+    """Run the operators on a stack, falling back to per-image execution where needed."""
+    for position, operator in enumerate(operators):
+        rest = operators[position + 1:]
+        if isinstance(operator, TrimOperator):
+            return _trim(operator, rest, array)
+        kernel = _KERNELS.get(type(operator))
+        result = kernel(array, operator) if kernel else None
+        if result is None:
+            return _run_images(rest, [operator(image) for image in to_images(array)])
+        array = result
+    return to_images(array)
+
+def _pixels(array: 'np.ndarray') -> 'np.ndarray':
+    """View 2- and 4-channel stacks as one 16/32-bit word per pixel, so copies move whole pixels."""
+    channels = array.shape[-1]
+    if channels in (2, 4) and array.strides[-1] == 1:
+        return array.view('<u2' if channels == 2 else '<u4')
+    return array
+
+def _contiguous(array: 'np.ndarray') -> 'np.ndarray':
+    """Return a C-contiguous copy of a (possibly flipped or cropped) stack, or the stack itself."""
+    if array.flags.c_contiguous:
+        return array
+    return np.ascontiguousarray(_pixels(array)).view(np.uint8)
+
+def _promote(array: 'np.ndarray', channels: int, out: Optional['np.ndarray'] = None) -> 'np.ndarray':
+    """
+    Convert a stack to a mode with at least as many bands, the way PIL's convert() does.
+
+    L becomes LA, RGB or RGBA, LA and RGB become RGBA. Gray is replicated into R, G and B,
+    and missing alpha is opaque. The result is written into `out` if given.
+    """
+    source = array.shape[-1]
+    if out is None:
+        if source == channels:
+            return array
+        out = np.empty(array.shape[:-1] + (channels,), dtype=np.uint8)
+    if source == channels:
+        _pixels(out)[...] = _pixels(array)
+    elif channels == 4:
+        # Build each RGBA pixel as one little-endian 32-bit word: R | G << 8 | B << 16 | A << 24
+        words = [array[..., i].astype('<u4') for i in range(source)]
+        if source == 3:
+            packed = words[0] | (words[1] << 8) | (words[2] << 16) | 0xFF000000
+        else:
+            alpha = (words[1] << 24) if source == 2 else 0xFF000000
+            packed = words[0] * 0x010101 | alpha
+        _pixels(out)[...] = packed[..., np.newaxis]
+    elif channels == 3:
+        out[...] = array[..., :1]
+    else:
+        out[..., 0] = array[..., 0]
+        out[..., 1] = 255
+    return out
+
+def _crop(array: 'np.ndarray', operator: CropOperator) -> 'np.ndarray':
+    height, width = array.shape[-3:-1]
+    left, top, right, bottom = operator.box((width, height))
+    return array[..., top:bottom, left:right, :]
+
+def _flip(array: 'np.ndarray', operator: FlipOperator) -> 'np.ndarray':
+    if operator.direction == 'h':
+        return array[..., :, ::-1, :]
+    return array[..., ::-1, :, :]
+
+def _roll(array: 'np.ndarray', operator: RollOperator) -> 'np.ndarray':
+    height, width = array.shape[-3:-1]
+    dx, dy = operator.offset((width, height))
+    if not dx and not dy:
+        return array
+    return np.roll(_pixels(array), (dy, dx), axis=(-3, -2)).view(np.uint8)
+
+def _expand(array: 'np.ndarray', operator: ExpandOperator) -> 'np.ndarray':
+    height, width = array.shape[-3:-1]
+    (target_width, target_height), (x, y) = operator.layout((width, height))
+    mode = operator.canvas_mode(MODES[array.shape[-1]])
+    channels = len(mode)
+    if (target_width, target_height) == (width, height) and array.shape[-1] == channels:
+        return array
+
+    position = operator.fill_position((width, height))
+    if position is None:
+        fill = np.array(color_for_mode(operator.fill_color(), mode), dtype=np.uint8)
+    else:
+        # Sampled fill colors differ per image, and always fit the mode of the image
+        fill = array[..., position[1]:position[1] + 1, position[0]:position[0] + 1, :]
+
+    canvas = np.empty(array.shape[:-3] + (target_height, target_width, channels), dtype=np.uint8)
+    # Fill only the borders, then convert the images straight into the canvas
+    canvas[..., :y, :, :] = fill
+    canvas[..., y + height:, :, :] = fill
+    canvas[..., y:y + height, :x, :] = fill
+    canvas[..., y:y + height, x + width:, :] = fill
+    _promote(array, channels, out=canvas[..., y:y + height, x:x + width, :])
+    return canvas
+
+def _gray_scale(array: 'np.ndarray', operator: GrayScaleOperator) -> 'np.ndarray':
+    channels = array.shape[-1]
+    if channels <= 2:
+        return array
+    # One weighted sum over the whole stack, accumulated in place
+    luma = array[..., 0] * np.dtype('<u4').type(_LUMA_WEIGHTS[0])
+    luma += array[..., 1] * np.dtype('<u4').type(_LUMA_WEIGHTS[1])
+    luma += array[..., 2] * np.dtype('<u4').type(_LUMA_WEIGHTS[2])
+    luma += 0x8000
+    luma >>= 16
+    if channels == 3:
+        return luma.astype(np.uint8)[..., np.newaxis]
+    # Keep the alpha channel: LA
+    return np.stack([luma.astype(np.uint8), array[..., 3]], axis=-1)
+
+def _bboxes(array: 'np.ndarray', operator: TrimOperator) -> List[Optional[Tuple[int, int, int, int]]]:
+    """Return the bounding box of every image in a stack, or None for blank images."""
+    if operator.background == 'auto':
+        # The background depends on each image's corners
+        return [operator.bbox(image) for image in to_images(array)]
+    channels = array.shape[-1]
+    tolerance = operator.tolerance
+    if operator.background is not None:
+        background = ImageColor.getcolor(operator.background, MODES[channels])
+        difference = np.abs(array.astype(np.int16) - np.asarray(background, dtype=np.int16))
+        mask = (difference > tolerance).any(axis=-1)
+    elif channels in (2, 4):
+        # Like Image.getbbox(): alpha decides when present, otherwise any non-zero band
+        mask = array[..., -1] > tolerance
+    else:
+        mask = (array > tolerance).any(axis=-1)
+    rows, columns = mask.any(axis=2), mask.any(axis=1)
+
+    boxes = []
+    for index in range(len(array)):
+        row, column = np.flatnonzero(rows[index]), np.flatnonzero(columns[index])
+        boxes.append((int(column[0]), int(row[0]), int(column[-1]) + 1, int(row[-1]) + 1)
+                     if len(row) else None)
+    return boxes
+
+def _trim(operator: TrimOperator, operators: List[ImageTransformer],
+          array: 'np.ndarray') -> List[Image.Image]:
+    """Trim every image of a stack, then continue with images sharing the same bounding box."""
+    boxes: Dict[Optional[Tuple[int, int, int, int]], List[int]] = {}
+    for index, box in enumerate(_bboxes(array, operator)):
+        boxes.setdefault(box, []).append(index)
+
+    results: List[Optional[Image.Image]] = [None] * len(array)
+    for box, indices in boxes.items():
+        if box is None:
+            # Blank images: let the operator produce its placeholder
+            outputs = _run_images(operators, [operator(image) for image in to_images(array[indices])])
+        else:
+            left, top, right, bottom = box
+            stack = array if len(indices) == len(array) else array[indices]
+            outputs = _run_array(operators, stack[:, top:bottom, left:right, :])
+        for index, output in zip(indices, outputs):
+            results[index] = output
+    return results
+
+# Array kernels by operator type; a kernel returning None defers to the operator itself
+_KERNELS: Dict[Type[ImageOperator], Callable] = {
+    CropOperator: _crop,
+    ExpandOperator: _expand,
+    FlipOperator: _flip,
+    GrayScaleOperator: _gray_scale,
+    RollOperator: _roll,
+}
@@ -1,14 +1,37 @@
-from .trim_operator import trim
-from .resize_operator import resize
-from .gray_scale_operator import gray_scale
-from .expand_operator import expand
-from .roll_operator import roll
-from .crop_operator import crop
-from .flip_operator import flip
-from .rotate_operator import rotate
-from .concat_map_operator import concat_map
+import importlib
+
+# Operator factories by name, with the module defining them. The modules (and PIL) are only
+# imported on first access, so importing this package, e.g. for the CLI, stays cheap.
+_FACTORIES = {
+    'trim': 'trim_operator',
+    'resize': 'resize_operator',
+    'gray_scale': 'gray_scale_operator',
+    'expand': 'expand_operator',
+    'roll': 'roll_operator',
+    'crop': 'crop_operator',
+    'flip': 'flip_operator',
+    'rotate': 'rotate_operator',
+    'concat_map': 'concat_map_operator',
+    'convert': 'convert_operator',
+}
 
 __all__ = [
     'trim', 'resize', 'gray_scale', 'expand', 'roll', 'crop', 
-    'flip', 'rotate', 'concat_map'
+    'flip', 'rotate', 'concat_map', 'convert'
 ]
+
+def __getattr__(name):
+    if name not in _FACTORIES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    factory = getattr(importlib.import_module(f'.{_FACTORIES[name]}', __name__), name)
+    # Cache it, so later lookups are plain attribute accesses
+    globals()[name] = factory
+    return factory
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+def load_all() -> None:
+    """Import every operator module, registering all operators for spec lookups."""
+    for name in _FACTORIES:
+        __getattr__(name)
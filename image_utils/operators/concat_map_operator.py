@@ -1,6 +1,8 @@
 from PIL import Image
-from typing import Callable
+from typing import Any, Callable, Dict, Union
 from ..core.image_transformer import ImageTransformer
+from ..profiling import active_profiler, call
+from ..spec import function_ref, resolve_ref
 from .image_operator import ImageOperator
 
 class ConcatMapOperator(ImageOperator):
@@ -12,16 +14,23 @@ class ConcatMapOperator(ImageOperator):
 
     Example:
         concat_map(lambda img: resize(width=256) if img.width > img.height else resize(height=256))
+
+    Note:
+        To pickle the operator (e.g. for `Pipeline.map`) or convert it to a spec, the mapping
+        function must be a module-level function rather than a lambda or closure.
     """
+    spec_name = 'concat_map'
 
-    def __init__(self, fn: Callable[[Image.Image], ImageTransformer]):
+    def __init__(self, fn: Union[Callable[[Image.Image], ImageTransformer], str]):
         """
         Initialize with a mapping function.
 
         Args:
-            fn (Callable): A function that takes an image and returns an ImageTransformer.
+            fn (Union[Callable, str]): A function that takes an image and returns an ImageTransformer,
+                                       or its 'module:qualname' import path.
         """
-        self.fn = fn
+        self.fn = resolve_ref(fn) if isinstance(fn, str) else fn
+        self._freeze()
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """
@@ -34,23 +43,40 @@ class ConcatMapOperator(ImageOperator):
             Image.Image: The result of applying the dynamically selected transformer.
         """
         transformer = self.fn(image)
+        profiler = active_profiler()
+        if profiler is not None:
+            # Show the dynamically chosen transformer as a span nested in this one
+            return call(profiler, transformer, image)
         return transformer(image)
 
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the ConcatMapOperator."""
+        return {'fn': self.fn}
+
+    def to_spec(self) -> Dict[str, Any]:
+        """Return the serialisable spec, referencing the mapping function by import path."""
+        return {'op': self.spec_name, 'fn': function_ref(self.fn)}
+
     def __repr__(self) -> str:
         """
         Return a string representation of the operator.
 
         Returns:
-            str: A simple descriptor.
+            str: The operator with the import path of its mapping function, or '<dynamic>'
+                 for lambdas and closures.
         """
-        return "ConcatMapOperator(<dynamic>)"
+        try:
+            return f"ConcatMapOperator(fn='{function_ref(self.fn)}')"
+        except ValueError:
+            return "ConcatMapOperator(<dynamic>)"
 
-def concat_map(fn: Callable[[Image.Image], ImageTransformer]) -> ConcatMapOperator:
+def concat_map(fn: Union[Callable[[Image.Image], ImageTransformer], str]) -> ConcatMapOperator:
     """
     Factory function for creating a ConcatMapOperator.
 
     Args:
-        fn (Callable): A function that returns an ImageTransformer based on input image.
+        fn (Union[Callable, str]): A function that returns an ImageTransformer based on input image,
+                                   or its 'module:qualname' import path.
 
     Returns:
         ConcatMapOperator: The constructed operator.
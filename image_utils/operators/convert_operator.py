@@ -0,0 +1,36 @@
+from PIL import Image
+from typing import Any, Dict
+from .image_operator import ImageOperator
+
+class ConvertOperator(ImageOperator):
+    """
+    An image processing operator to convert an image to a given mode.
+
+    Attributes:
+        mode (str): The target PIL mode, e.g. 'L', 'RGB' or 'RGBA'.
+
+    Methods:
+        __call__(image: Image.Image) -> Image.Image:
+            Convert the image and return the processed image.
+    """
+    spec_name = 'convert'
+
+    def __init__(self, mode: str):
+        if mode not in Image.MODES:
+            raise ValueError(f"Unknown image mode '{mode}'.")
+        self.mode = mode
+        self._freeze()
+
+    def __call__(self, image: Image.Image) -> Image.Image:
+        """Convert the image to the target mode, returning it unchanged if it already has it."""
+        if image.mode == self.mode:
+            return image
+        return image.convert(self.mode)
+
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the ConvertOperator."""
+        return {'mode': self.mode}
+
+def convert(mode: str) -> ConvertOperator:
+    """Create a ConvertOperator instance with the specified target mode."""
+    return ConvertOperator(mode)
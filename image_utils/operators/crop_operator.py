@@ -1,5 +1,5 @@
 from PIL import Image
-from typing import Union
+from typing import Any, Dict, Tuple, Union
 from .image_operator import ImageOperator
 
 class CropOperator(ImageOperator):
@@ -24,12 +24,15 @@ class CropOperator(ImageOperator):
         __call__(image: Image.Image) -> Image.Image:
             Crop the input image to the specified boundaries and return the processed image.
     """
+    spec_name = 'crop'
+
     def __init__(self, left: Union[int, float] = 0, top: Union[int, float] = 0,
                  right: Union[int, float] = 1.0, bottom: Union[int, float] = 1.0):
         self.left = left
         self.top = top
         self.right = right
         self.bottom = bottom
+        self._freeze()
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """
@@ -39,9 +42,27 @@ class CropOperator(ImageOperator):
             image (Image.Image): The input image to be processed.
 
         Returns:
-            Image.Image: The cropped image.
+            Image.Image: The cropped image, or the input image itself if the box covers it entirely.
+        """
+        box = self.box(image.size)
+        if box == (0, 0) + image.size:
+            # Nothing to crop; avoid decoding the pixels at all
+            return image
+        # Crop to the specified rectangle
+        cropped_image = image.crop(box)
+        return cropped_image
+
+    def box(self, size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """
+        Resolve the boundaries to a pixel box for an image of the given size.
+
+        Args:
+            size (Tuple[int, int]): The (width, height) of the input image.
+
+        Returns:
+            Tuple[int, int, int, int]: The (left, top, right, bottom) box, clamped to the image.
         """
-        width, height = image.size
+        width, height = size
 
         # Convert float boundaries to pixel values if necessary
         left = int(self.left * width) if isinstance(self.left, float) else self.left
@@ -54,10 +75,11 @@ class CropOperator(ImageOperator):
         top = max(0, min(top, height))
         right = max(left, min(right, width))
         bottom = max(top, min(bottom, height))
+        return left, top, right, bottom
 
-        # Crop to the specified rectangle
-        cropped_image = image.crop((left, top, right, bottom))
-        return cropped_image
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the CropOperator."""
+        return {'left': self.left, 'top': self.top, 'right': self.right, 'bottom': self.bottom}
 
     def __repr__(self) -> str:
         """
@@ -1,11 +1,15 @@
 from PIL import Image
-from typing import Optional, Tuple, Union
+from typing import Any, Dict, Optional, Tuple, Union
+from ..core.color import color_for_mode, fill_mode, hex_to_rgba, working_mode
 from .image_operator import ImageOperator
 
 class ExpandOperator(ImageOperator):
     """
     An image processing operator to expand the image canvas while keeping the original image intact.
 
+    The canvas keeps the mode of the image (L, LA, RGB or RGBA), and is only promoted when the
+    fill color needs it: a colored fill turns grayscale into RGB, a translucent fill adds alpha.
+
     Attributes:
         width (Optional[int]): Target width of the expanded image. Default is None.
         height (Optional[int]): Target height of the expanded image. Default is None.
@@ -19,6 +23,7 @@ class ExpandOperator(ImageOperator):
         __call__(image: Image.Image) -> Image.Image:
             Expand the canvas and return the processed image.
     """
+    spec_name = 'expand'
 
     def __init__(self, 
                  width: Optional[int] = None, 
@@ -33,11 +38,57 @@ class ExpandOperator(ImageOperator):
         self.align = align
         self.dx = dx
         self.dy = dy
-        self.fillwithpos = fillwithpos
+        self.fillwithpos = tuple(fillwithpos) if fillwithpos else None
+        self._freeze()
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """Expand the canvas size and position the original image."""
-        original_width, original_height = image.size
+        (target_width, target_height), position = self.layout(image.size)
+        mode = self.canvas_mode(image.mode)
+
+        if (target_width, target_height) == image.size and image.mode == mode:
+            # The image would cover the whole canvas; avoid decoding the pixels at all
+            return image
+
+        if image.mode != mode:
+            image = image.convert(mode)
+        # Determine the fill color
+        pos = self.fill_position(image.size)
+        fill_color = image.getpixel(pos) if pos else color_for_mode(self.fill_color(), mode)
+
+        expanded_image = Image.new(mode, (target_width, target_height), fill_color)
+        expanded_image.paste(image, position)
+        return expanded_image
+
+    def canvas_mode(self, mode: str) -> str:
+        """
+        Return the mode of the expanded canvas for an image of the given mode.
+
+        Args:
+            mode (str): The mode of the original image.
+
+        Returns:
+            str: The input mode, promoted only as far as the HEX fill color requires.
+        """
+        if self.fillwithpos:
+            # The fill is sampled from the image, so it always fits its mode
+            return working_mode(mode)
+        return fill_mode(mode, self.fill_color())
+
+    def layout(self, size: Tuple[int, int]) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """
+        Compute the canvas size and the position of the original image on it.
+
+        Args:
+            size (Tuple[int, int]): The (width, height) of the original image.
+
+        Returns:
+            Tuple[Tuple[int, int], Tuple[int, int]]: The canvas (width, height) and paste (x, y).
+
+        Raises:
+            ValueError: If the target dimensions are smaller than the original image.
+        """
+        original_width, original_height = size
 
         target_width = self.width or original_width
         target_height = self.height or original_height
@@ -45,22 +96,36 @@ class ExpandOperator(ImageOperator):
         if target_width < original_width or target_height < original_height:
             raise ValueError("Target dimensions cannot be smaller than the original image.")
 
-        # Determine the fill color
-        if self.fillwithpos:
-            pos = self._adjust_position(self.fillwithpos, original_width, original_height)
-            fill_color = image.getpixel(pos)
-        else:
-            fill_color = self._hex_to_rgba(self.fillwith)
-
-        expanded_image = Image.new("RGBA", (target_width, target_height), fill_color)
         paste_x, paste_y = self._calculate_position(
             original_width, original_height, target_width, target_height
         )
         paste_x = max(0, min(paste_x + self.dx, target_width - original_width))
         paste_y = max(0, min(paste_y + self.dy, target_height - original_height))
+        return (target_width, target_height), (paste_x, paste_y)
 
-        expanded_image.paste(image, (paste_x, paste_y))
-        return expanded_image
+    def fill_position(self, size: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """
+        Return the pixel to sample the fill color from, if the color is sampled.
+
+        Args:
+            size (Tuple[int, int]): The (width, height) of the original image.
+
+        Returns:
+            Optional[Tuple[int, int]]: The (x, y) position, or None if a HEX fill color is used.
+        """
+        if not self.fillwithpos:
+            return None
+        return self._adjust_position(self.fillwithpos, *size)
+
+    def fill_color(self) -> Tuple[int, int, int, int]:
+        """Return the HEX fill color as an RGBA tuple."""
+        return hex_to_rgba(self.fillwith)
+
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the ExpandOperator."""
+        return {'width': self.width, 'height': self.height, 'fillwith': self.fillwith,
+                'align': self.align, 'dx': self.dx, 'dy': self.dy,
+                'fillwithpos': list(self.fillwithpos) if self.fillwithpos else None}
 
     def _adjust_position(self, pos: Tuple[int, int], width: int, height: int) -> Tuple[int, int]:
         """Adjust position for negative indexing."""
@@ -69,13 +134,6 @@ class ExpandOperator(ImageOperator):
         y = y if y >= 0 else height + y
         return max(0, min(x, width - 1)), max(0, min(y, height - 1))
 
-    def _hex_to_rgba(self, hex_color: str) -> Tuple[int, int, int, int]:
-        """Convert a HEX color string to an RGBA tuple."""
-        hex_color = hex_color.lstrip('#')
-        if len(hex_color) == 6:
-            hex_color += 'FF'
-        return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4, 6))
-
     def _calculate_position(self, ow: int, oh: int, ew: int, eh: int) -> Tuple[int, int]:
         """Calculate paste position based on alignment."""
         align_map = {
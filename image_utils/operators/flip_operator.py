@@ -1,4 +1,5 @@
 from PIL import Image
+from typing import Any, Dict
 from .image_operator import ImageOperator
 
 class FlipOperator(ImageOperator):
@@ -12,11 +13,13 @@ class FlipOperator(ImageOperator):
         __call__(image: Image.Image) -> Image.Image:
             Flip the image and return the processed image.
     """
+    spec_name = 'flip'
 
     def __init__(self, direction: str):
         self.direction = direction.lower()
         if self.direction not in ('h', 'v'):
             raise ValueError("Direction must be 'h' for horizontal or 'v' for vertical.")
+        self._freeze()
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """Flip the image in the specified direction."""
@@ -25,6 +28,10 @@ class FlipOperator(ImageOperator):
         elif self.direction == 'v':
             return image.transpose(Image.FLIP_TOP_BOTTOM)
 
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the FlipOperator."""
+        return {'direction': self.direction}
+
     def __repr__(self) -> str:
         """Return a string representation of the FlipOperator."""
         return f"FlipOperator(direction='{self.direction}')"
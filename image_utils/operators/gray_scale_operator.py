@@ -5,10 +5,18 @@ class GrayScaleOperator(ImageOperator):
     """
     An image processing operator to convert an image to grayscale.
 
+    The result is single-band 'L', or 'LA' if the image has an alpha channel, so grayscale
+    images take one byte per pixel.
+
     Methods:
         __call__(image: Image.Image) -> Image.Image:
             Convert the input image to grayscale and return the processed image.
     """
+    spec_name = 'gray_scale'
+
+    def __init__(self):
+        self._freeze()
+
     def __call__(self, image: Image.Image) -> Image.Image:
         """
         Convert the input image to grayscale.
@@ -19,7 +27,10 @@ class GrayScaleOperator(ImageOperator):
         Returns:
             Image.Image: The grayscale image.
         """
-        return image.convert('L').convert('RGBA')
+        mode = 'LA' if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info else 'L'
+        if image.mode == mode:
+            return image
+        return image.convert(mode)
 
     def __repr__(self) -> str:
         """
@@ -1,6 +1,11 @@
+import functools
 from PIL import Image
+from typing import Any, Callable, Dict
 from ..core.image_transformer import ImageTransformer
 
+# Registry of operator classes by spec name, filled in by ImageOperator subclasses
+OPERATORS: Dict[str, type] = {}
+
 class ImageOperator(ImageTransformer):
     """
     A base class for image processing operators.
@@ -9,10 +14,32 @@ class ImageOperator(ImageTransformer):
     Subclasses should implement the __call__ method to perform their specific
     image processing tasks.
 
+    Built-in operators are immutable value objects: their settings are fixed at construction
+    time and anything computed from an image stays local to the call, so one instance can be
+    reused across images, threads and processes. Subclasses that declare a `spec_name` are
+    registered for the serialisable spec form (see `image_utils.spec`).
+
+    Operators also accept array-like images (NumPy arrays, buffers exposing
+    `__array_interface__`) and return a NumPy array, which is a view of the input whenever the
+    operation allows it (see `image_utils.numpy_backend.run_array`).
+
     Methods:
         __call__(image: Image.Image) -> Image.Image:
             Process the input image and return the processed image.
+        params() -> Dict[str, Any]:
+            Return the constructor arguments of the operator.
+        to_spec() -> Dict[str, Any]:
+            Return the serialisable spec of the operator.
     """
+    spec_name: str = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get('spec_name'):
+            OPERATORS[cls.spec_name] = cls
+        if '__call__' in cls.__dict__:
+            cls.__call__ = _accept_arrays(cls.__dict__['__call__'])
+
     def __call__(self, image: Image.Image) -> Image.Image:
         """
         Process the input image.
@@ -28,6 +55,46 @@ class ImageOperator(ImageTransformer):
         """
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def params(self) -> Dict[str, Any]:
+        """
+        Return the constructor arguments of the operator.
+
+        Returns:
+            Dict[str, Any]: The keyword arguments recreating an equal operator.
+        """
+        return {}
+
+    def to_spec(self) -> Dict[str, Any]:
+        """
+        Return the serialisable spec of the operator.
+
+        Returns:
+            Dict[str, Any]: A JSON-compatible dict with the operator name under 'op'.
+
+        Raises:
+            ValueError: If the operator does not declare a `spec_name`.
+        """
+        if not self.spec_name:
+            raise ValueError(f"{self.__class__.__name__} does not declare a spec_name.")
+        return {'op': self.spec_name, **self.params()}
+
+    def _freeze(self) -> None:
+        """Prevent further attribute assignment. Called at the end of __init__."""
+        self._frozen = True
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if self.__dict__.get('_frozen', False):
+            raise AttributeError(f"{self.__class__.__name__} is immutable; create a new operator instead.")
+        super().__setattr__(name, value)
+
+    def __eq__(self, other: object) -> bool:
+        if type(self) is not type(other):
+            return NotImplemented
+        return self.params() == other.params()
+
+    def __hash__(self) -> int:
+        return hash((type(self), repr(sorted(self.params().items()))))
+
     def __repr__(self) -> str:
         """
         Return a string representation of the operator.
@@ -35,4 +102,18 @@ class ImageOperator(ImageTransformer):
         Returns:
             str: A string representation of the operator.
         """
-        return f"{self.__class__.__name__}()"
+        params = ', '.join(f"{key}={value!r}" for key, value in self.params().items())
+        return f"{self.__class__.__name__}({params})"
+
+def _accept_arrays(call: Callable) -> Callable:
+    """Wrap an operator's __call__ so array-like inputs are routed to the NumPy backend."""
+
+    @functools.wraps(call)
+    def __call__(self, image):
+        if not isinstance(image, Image.Image):
+            from ..numpy_backend import is_array, run_array
+            if is_array(image):
+                return run_array(self, image)
+        return call(self, image)
+
+    return __call__
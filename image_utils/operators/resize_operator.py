@@ -1,55 +1,159 @@
 from PIL import Image
+from ..core.resample import RESAMPLE_FILTERS
 from .image_operator import ImageOperator
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
+
+# Named quality/speed trade-offs, from the cheapest to the most accurate.
+# A reducing gap first shrinks the image by an integer factor with Image.reduce, keeping at
+# least that many times the target size for the final filter pass.
+PRESETS = {
+    'fast': {'resample': 'bilinear', 'reducing_gap': 2.0},
+    'balanced': {'resample': 'bicubic', 'reducing_gap': 3.0},
+    'best': {'resample': 'lanczos', 'reducing_gap': None},
+}
+
+FIT_MODES = ('fill', 'contain', 'cover')
 
 class ResizeOperator(ImageOperator):
     """
     An image operator that resizes the image to the specified width and height.
     If only one dimension is provided, the other is scaled proportionally.
+
+    When both dimensions are given, `fit` decides how the aspect ratio is handled: 'fill'
+    stretches the image to exactly width x height, 'contain' scales it to fit inside that box
+    (like `Image.thumbnail`, but also enlarging), and 'cover' scales it to cover the box and
+    crops the overflow around the center. The crop of 'cover' is part of the same resampling
+    pass, so only the pixels that are kept are resampled.
+
+    The resampling filter and reducing gap default to those of `preset`, or to a plain bicubic
+    resize without a reducing gap when no preset is given. Explicit values override the preset.
     """
+    spec_name = 'resize'
 
-    def __init__(self, width: Optional[int] = None, height: Optional[int] = None):
+    def __init__(self, width: Optional[int] = None, height: Optional[int] = None,
+                 resample: Optional[str] = None, reducing_gap: Optional[float] = None,
+                 fit: str = 'fill', preset: Optional[str] = None):
         if width is None and height is None:
             raise ValueError("At least one of width or height must be specified.")
+        if preset is not None and preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{preset}', expected one of {', '.join(PRESETS)}.")
+        if resample is not None and resample not in RESAMPLE_FILTERS:
+            raise ValueError(f"Unknown resampling filter '{resample}', "
+                             f"expected one of {', '.join(RESAMPLE_FILTERS)}.")
+        if reducing_gap is not None and reducing_gap < 1.0:
+            raise ValueError("The reducing gap must be at least 1.0.")
+        if fit not in FIT_MODES:
+            raise ValueError(f"Unknown fit '{fit}', expected one of {', '.join(FIT_MODES)}.")
 
+        defaults = PRESETS.get(preset, {'resample': 'bicubic', 'reducing_gap': None})
         self.width = width
         self.height = height
+        self.resample = resample or defaults['resample']
+        self.reducing_gap = reducing_gap if reducing_gap is not None else defaults['reducing_gap']
+        self.fit = fit
+        self.preset = preset
+        self._freeze()
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """
         Resizes the given image to the specified dimensions.
-        
+
         Parameters:
         image (Image.Image): The image to resize.
-        
+
         Returns:
-        Image.Image: The resized image.
+        Image.Image: The resized image, or the input image itself if the size is unchanged.
         """
-        img_width, img_height = image.size
-        if self.width and not self.height:
-            self.height = int((self.width / img_width) * img_height)
-        elif self.height and not self.width:
-            self.width = int((self.height / img_height) * img_width)
-        return image.resize((self.width, self.height))
+        size = self.target_size(image.size)
+        box = self.source_box(image.size)
+        if size == image.size and box is None:
+            # Nothing to resample; avoid decoding the pixels at all
+            return image
+        return self.resize_to(image, size, box)
 
-    def __repr__(self) -> str:
+    def resize_to(self, image: Image.Image, size: Tuple[int, int],
+                  box: Optional[Tuple[float, float, float, float]] = None) -> Image.Image:
         """
-        Return a string representation of the ResizeOperator.
+        Resample a region of an image to a given size with the filter settings of the operator.
+
+        Parameters:
+        image (Image.Image): The image to resample.
+        size (Tuple[int, int]): The output (width, height).
+        box (Optional[Tuple[float, float, float, float]]): The source region, or None for the whole image.
 
         Returns:
-            str: A string representation of the ResizeOperator.
+        Image.Image: The resampled image.
+        """
+        return image.resize(size, RESAMPLE_FILTERS[self.resample], box=box,
+                            reducing_gap=self.reducing_gap)
+
+    def target_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
         """
-        return f"ResizeOperator(width='{self.width}, height='{self.height}')"
+        Compute the output size for an image of the given size.
 
-def resize(width: Optional[int] = None, height: Optional[int] = None) -> ResizeOperator:
+        Parameters:
+        size (Tuple[int, int]): The (width, height) of the input image.
+
+        Returns:
+        Tuple[int, int]: The (width, height) of the resized image.
+        """
+        img_width, img_height = size
+        width, height = self.width, self.height
+        if width and not height:
+            height = int((width / img_width) * img_height)
+        elif height and not width:
+            width = int((height / img_height) * img_width)
+        elif self.fit == 'contain':
+            scale = min(width / img_width, height / img_height)
+            width, height = max(1, round(img_width * scale)), max(1, round(img_height * scale))
+        return width, height
+
+    def source_box(self, size: Tuple[int, int]) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Compute the region of the input that is resampled, for the 'cover' fit.
+
+        Parameters:
+        size (Tuple[int, int]): The (width, height) of the input image.
+
+        Returns:
+        Optional[Tuple[float, float, float, float]]: The centered (left, top, right, bottom)
+        region with the aspect ratio of the output, or None if the whole image is resampled.
+        """
+        if self.fit != 'cover' or not (self.width and self.height):
+            return None
+        img_width, img_height = size
+        # Keep the full extent of the limiting side exact, so the box never leaves the image
+        if self.width * img_height >= self.height * img_width:
+            box_width, box_height = img_width, self.height * img_width / self.width
+        else:
+            box_width, box_height = self.width * img_height / self.height, img_height
+        if (box_width, box_height) == (img_width, img_height):
+            return None
+        left, top = (img_width - box_width) / 2, (img_height - box_height) / 2
+        return left, top, left + box_width, top + box_height
+
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the ResizeOperator."""
+        return {'width': self.width, 'height': self.height, 'resample': self.resample,
+                'reducing_gap': self.reducing_gap, 'fit': self.fit, 'preset': self.preset}
+
+def resize(width: Optional[int] = None, height: Optional[int] = None,
+           resample: Optional[str] = None, reducing_gap: Optional[float] = None,
+           fit: str = 'fill', preset: Optional[str] = None) -> ResizeOperator:
     """
     Creates a ResizeOperator with the specified width and height.
-    
+
     Parameters:
     width (Optional[int]): The width to resize to. Can be None.
     height (Optional[int]): The height to resize to. Can be None.
-    
+    resample (Optional[str]): Resampling filter, one of 'nearest', 'box', 'bilinear', 'hamming',
+                              'bicubic' or 'lanczos'. Defaults to the preset's, or 'bicubic'.
+    reducing_gap (Optional[float]): Shrink by an integer factor first, keeping at least this
+                                    many times the target size. Defaults to the preset's, or None.
+    fit (str): 'fill', 'contain' or 'cover', when both dimensions are given. Default is 'fill'.
+    preset (Optional[str]): 'fast', 'balanced' or 'best'. Default is None.
+
     Returns:
     ResizeOperator: The ResizeOperator initialized with the specified dimensions.
     """
-    return ResizeOperator(width, height)
+    return ResizeOperator(width, height, resample, reducing_gap, fit, preset)
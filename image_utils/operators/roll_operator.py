@@ -1,57 +1,72 @@
-from PIL import Image
-from typing import Optional
+from PIL import Image, ImageChops
+from typing import Any, Dict, Tuple
 from .image_operator import ImageOperator
 
 class RollOperator(ImageOperator):
     """
     An image processing operator to roll the image in a specified direction.
 
+    The content wraps around to the opposite edge. Shifts are taken modulo the image size,
+    the image mode is preserved, and an effective shift of zero returns the input unchanged.
+
     Attributes:
-        shift (int): Number of pixels to shift.
+        shift (int): Number of pixels to shift in `direction`. Default is 0.
         direction (str): Direction to roll the image ('l' for left, 'r' for right, 'u' for up, 'b' for bottom).
+        dx (int): Additional horizontal shift, positive to the right. Default is 0.
+        dy (int): Additional vertical shift, positive downwards. Default is 0.
 
     Methods:
         __call__(image: Image.Image) -> Image.Image:
             Roll the image and return the processed image.
     """
+    spec_name = 'roll'
 
-    def __init__(self, shift: int, direction: str = 'r'):
+    def __init__(self, shift: int = 0, direction: str = 'r', dx: int = 0, dy: int = 0):
         self.shift = shift
         self.direction = direction.lower()
         if self.direction not in ('l', 'r', 'u', 'b'):
             raise ValueError("Direction must be one of 'l', 'r', 'u', 'b'.")
+        self.dx = dx
+        self.dy = dy
+        self._freeze()
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """Roll the image in the specified direction by the given shift amount."""
-        original_width, original_height = image.size
-        rolled_image = Image.new("RGBA", (original_width, original_height))
-
-        if self.direction == 'r':  # Roll right
-            left_part = image.crop((0, 0, original_width - self.shift, original_height))
-            right_part = image.crop((original_width - self.shift, 0, original_width, original_height))
-            rolled_image.paste(right_part, (0, 0))
-            rolled_image.paste(left_part, (self.shift, 0))
-        
-        elif self.direction == 'l':  # Roll left
-            left_part = image.crop((0, 0, self.shift, original_height))
-            right_part = image.crop((self.shift, 0, original_width, original_height))
-            rolled_image.paste(right_part, (0, 0))
-            rolled_image.paste(left_part, (original_width - self.shift, 0))
-        
-        elif self.direction == 'u':  # Roll up
-            top_part = image.crop((0, 0, original_width, self.shift))
-            bottom_part = image.crop((0, self.shift, original_width, original_height))
-            rolled_image.paste(bottom_part, (0, 0))
-            rolled_image.paste(top_part, (0, original_height - self.shift))
-        
-        elif self.direction == 'b':  # Roll down
-            top_part = image.crop((0, 0, original_width, original_height - self.shift))
-            bottom_part = image.crop((0, original_height - self.shift, original_width, original_height))
-            rolled_image.paste(bottom_part, (0, 0))
-            rolled_image.paste(top_part, (0, self.shift))
-
-        return rolled_image
-
-def roll(shift: int, direction: str = 'r') -> RollOperator:
+        dx, dy = self.offset(image.size)
+        if not dx and not dy:
+            return image
+        # A single wrap-around blit in C, in the mode of the input
+        return ImageChops.offset(image, dx, dy)
+
+    def shifts(self) -> Tuple[int, int]:
+        """
+        Return the total (dx, dy) shift, before normalisation.
+
+        Returns:
+            Tuple[int, int]: The horizontal (rightwards) and vertical (downwards) shift.
+        """
+        direction_shift = {'r': (self.shift, 0), 'l': (-self.shift, 0),
+                           'b': (0, self.shift), 'u': (0, -self.shift)}[self.direction]
+        return direction_shift[0] + self.dx, direction_shift[1] + self.dy
+
+    def offset(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Return the shift normalised to the image size.
+
+        Args:
+            size (Tuple[int, int]): The (width, height) of the image.
+
+        Returns:
+            Tuple[int, int]: The (dx, dy) shift, each in the range [0, size).
+        """
+        dx, dy = self.shifts()
+        width, height = size
+        return (dx % width if width else 0), (dy % height if height else 0)
+
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the RollOperator."""
+        return {'shift': self.shift, 'direction': self.direction, 'dx': self.dx, 'dy': self.dy}
+
+def roll(shift: int = 0, direction: str = 'r', dx: int = 0, dy: int = 0) -> RollOperator:
     """Create a RollOperator instance with the specified shift and direction."""
-    return RollOperator(shift, direction)
+    return RollOperator(shift, direction, dx, dy)
@@ -1,56 +1,80 @@
 from PIL import Image
-import math
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
+from ..core.color import color_for_mode, fill_mode, hex_to_rgba, working_mode
+from ..core.resample import AFFINE_FILTERS, RESAMPLE_FILTERS
 from .image_operator import ImageOperator
 
+# Lossless transpositions for exact multiples of 90 degrees (counterclockwise)
+_TRANSPOSE = {90: Image.Transpose.ROTATE_90, 180: Image.Transpose.ROTATE_180, 270: Image.Transpose.ROTATE_270}
+
 class RotateOperator(ImageOperator):
     """
     An image processing operator to rotate the image with canvas expansion and fill.
 
+    The rotation is done in a single resampling pass onto an expanded canvas, with the fill
+    color applied to the area outside the rotated image. Exact multiples of 90 degrees use a
+    lossless transpose instead. The canvas keeps the mode of the image, and is only promoted
+    when the HEX fill color needs it (e.g. a transparent fill on an RGB image).
+
     Attributes:
         angle (float): Angle to rotate the image, in degrees.
         fillwith (str): Fill color in HEX format (default: transparent).
         fillwithpos (Optional[Tuple[int, int]]): Sample the fill color from the original image.
+        resample (str): Resampling filter, one of 'nearest', 'bilinear' or 'bicubic'.
+                        Default is 'nearest'.
 
     Methods:
         __call__(image: Image.Image) -> Image.Image:
             Rotate the image and expand the canvas as needed, returning the processed image.
     """
+    spec_name = 'rotate'
 
     def __init__(self, 
                  angle: float, 
                  fillwith: str = "#00000000", 
-                 fillwithpos: Optional[Tuple[int, int]] = None):
+                 fillwithpos: Optional[Tuple[int, int]] = None,
+                 resample: str = 'nearest'):
         self.angle = angle
         self.fillwith = fillwith
-        self.fillwithpos = fillwithpos
+        self.fillwithpos = tuple(fillwithpos) if fillwithpos else None
+        self.resample = resample.lower()
+        if self.resample not in AFFINE_FILTERS:
+            raise ValueError(f"Resample must be one of {', '.join(AFFINE_FILTERS)}.")
+        self._freeze()
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """Rotate the image with expanded canvas."""
-        original_width, original_height = image.size
+        angle = self.angle % 360
+        if angle in (0,) + tuple(_TRANSPOSE):
+            # No corners to fill
+            mode = working_mode(image.mode)
+        elif self.fillwithpos:
+            mode = working_mode(image.mode)
+        else:
+            mode = fill_mode(image.mode, hex_to_rgba(self.fillwith))
+        if image.mode != mode:
+            image = image.convert(mode)
 
-        # Calculate expanded canvas size to fit the rotated image
-        angle_rad = math.radians(self.angle)
-        expanded_width = int(abs(original_width * math.cos(angle_rad)) + abs(original_height * math.sin(angle_rad)))
-        expanded_height = int(abs(original_height * math.cos(angle_rad)) + abs(original_width * math.sin(angle_rad)))
+        if angle == 0:
+            return image
+        if angle in _TRANSPOSE:
+            return image.transpose(_TRANSPOSE[angle])
 
         # Determine the fill color
         if self.fillwithpos:
-            pos = self._adjust_position(self.fillwithpos, original_width, original_height)
+            pos = self._adjust_position(self.fillwithpos, *image.size)
             fill_color = image.getpixel(pos)
         else:
-            fill_color = self._hex_to_rgba(self.fillwith)
+            fill_color = color_for_mode(hex_to_rgba(self.fillwith), mode)
 
-        # Create the expanded canvas and paste the rotated image
-        expanded_image = Image.new("RGBA", (expanded_width, expanded_height), fill_color)
-        rotated_image = image.rotate(self.angle, expand=True)
+        return image.rotate(self.angle, resample=RESAMPLE_FILTERS[self.resample], expand=True,
+                            fillcolor=fill_color)
 
-        # Center the rotated image on the expanded canvas
-        paste_x = (expanded_width - rotated_image.width) // 2
-        paste_y = (expanded_height - rotated_image.height) // 2
-
-        expanded_image.paste(rotated_image, (paste_x, paste_y), rotated_image)
-        return expanded_image
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the RotateOperator."""
+        return {'angle': self.angle, 'fillwith': self.fillwith,
+                'fillwithpos': list(self.fillwithpos) if self.fillwithpos else None,
+                'resample': self.resample}
 
     def _adjust_position(self, pos: Tuple[int, int], width: int, height: int) -> Tuple[int, int]:
         """Adjust position for negative indexing."""
@@ -59,15 +83,9 @@ class RotateOperator(ImageOperator):
         y = y if y >= 0 else height + y
         return max(0, min(x, width - 1)), max(0, min(y, height - 1))
 
-    def _hex_to_rgba(self, hex_color: str) -> Tuple[int, int, int, int]:
-        """Convert a HEX color string to an RGBA tuple."""
-        hex_color = hex_color.lstrip('#')
-        if len(hex_color) == 6:
-            hex_color += 'FF'
-        return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4, 6))
-
 def rotate(angle: float,
            fillwith: str = "#00000000", 
-           fillwithpos: Optional[Tuple[int, int]] = None) -> RotateOperator:
+           fillwithpos: Optional[Tuple[int, int]] = None,
+           resample: str = 'nearest') -> RotateOperator:
     """Create a RotateOperator instance with the specified settings."""
-    return RotateOperator(angle, fillwith, fillwithpos)
+    return RotateOperator(angle, fillwith, fillwithpos, resample)
@@ -1,15 +1,45 @@
-from PIL import Image
+from collections import Counter
+from functools import reduce
+from PIL import Image, ImageChops, ImageColor
+from typing import Any, Dict, Optional, Tuple, Union
 from .image_operator import ImageOperator
-from .crop_operator import crop
+
+Box = Tuple[int, int, int, int]
+
+# Height (or width) of the first band scanned from each edge; it doubles after every empty band
+_FIRST_BAND = 8
 
 class TrimOperator(ImageOperator):
     """
     An image processing operator to trim an image to its bounding box, removing any transparent borders.
 
+    By default, transparent pixels (or, for images without alpha, pixels with all bands zero)
+    are trimmed. With `background`, pixels of that color are trimmed instead, and `tolerance`
+    allows each band to differ from the background by up to that amount, e.g. for the
+    near-white margins of scanned documents.
+
+    With a background or a tolerance, the bounding box is found by scanning bands inward from
+    each edge and stopping at the first band holding content, so only the margins (and one band
+    per edge) are compared against the background.
+
+    Attributes:
+        background (Optional[str]): Background color in HEX format, 'auto' to use the most
+                                    common corner color, or None for transparent/zero pixels.
+        tolerance (int): Maximum per-band difference from the background. Default is 0.
+
     Methods:
         __call__(image: Image.Image) -> Image.Image:
             Trim the input image to its bounding box and return the processed image.
     """
+    spec_name = 'trim'
+
+    def __init__(self, background: Optional[str] = None, tolerance: int = 0):
+        self.background = background
+        self.tolerance = tolerance
+        if tolerance < 0:
+            raise ValueError("Tolerance cannot be negative.")
+        self._freeze()
+
     def __call__(self, image: Image.Image) -> Image.Image:
         """
         Trim the input image to its bounding box.
@@ -20,29 +50,118 @@ class TrimOperator(ImageOperator):
         Returns:
             Image.Image: The trimmed image.
         """
-        bbox = image.getbbox()
+        bbox = self.bbox(image)
         if bbox:
-            left, top, right, bottom = bbox
-            operator = crop(left, top, right, bottom)
-            return operator(image)
+            if bbox == (0, 0) + image.size:
+                return image
+            return image.crop(bbox)
         else:
             # Return a minimal 1x1 image if bounding box is not found (e.g., fully transparent image)
-            return Image.new("RGBA", (1, 1), (0, 0, 0, 0))
+            return Image.new(image.mode, (1, 1))
+
+    def bbox(self, image: Image.Image) -> Optional[Box]:
+        """
+        Find the bounding box of the content of an image.
+
+        Args:
+            image (Image.Image): The image to scan.
+
+        Returns:
+            Optional[Box]: The (left, top, right, bottom) box, or None if the image is blank.
+        """
+        if self.background is None and self.tolerance == 0:
+            # Pillow's own scan already stops at the content edges
+            return image.getbbox()
+        if image.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        background = self.background_color(image)
+        width, height = image.size
 
-    def __repr__(self) -> str:
+        top = self._scan(image, background, (0, height), lambda y0, y1: (0, y0, width, y1), 1)
+        if top is None:
+            return None
+        bottom = self._scan(image, background, (height, top), lambda y0, y1: (0, y0, width, y1), 3)
+        left = self._scan(image, background, (0, width), lambda x0, x1: (x0, top, x1, bottom), 0)
+        right = self._scan(image, background, (width, left), lambda x0, x1: (x0, top, x1, bottom), 2)
+        return left, top, right, bottom
+
+    def background_color(self, image: Image.Image) -> Optional[Union[int, Tuple[int, ...]]]:
+        """
+        Return the background pixel value in the mode of the image.
+
+        Args:
+            image (Image.Image): The image to be trimmed.
+
+        Returns:
+            Optional[Union[int, Tuple[int, ...]]]: The background value, or None when trimming
+            transparent/zero pixels.
+        """
+        if self.background is None:
+            return None
+        if self.background == 'auto':
+            width, height = image.size
+            corners = [image.getpixel(xy) for xy in
+                       ((0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1))]
+            # The most common corner color, preferring the top-left one on ties
+            return Counter(corners).most_common(1)[0][0]
+        return ImageColor.getcolor(self.background, image.mode)
+
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the TrimOperator."""
+        return {'background': self.background, 'tolerance': self.tolerance}
+
+    def _scan(self, image: Image.Image, background, span: Tuple[int, int], box, side: int) -> Optional[int]:
         """
-        Return a string representation of the TrimOperator.
+        Scan bands of growing size from one edge and return the first content coordinate.
+
+        Args:
+            image (Image.Image): The image to scan.
+            background: The background value, or None for transparent/zero pixels.
+            span (Tuple[int, int]): The start (the edge) and the end of the scan.
+            box (Callable[[int, int], Box]): Builds the crop box of a band from its extent.
+            side (int): Index in the band bbox of the edge facing the scan start.
 
         Returns:
-            str: A string representation of the TrimOperator.
+            Optional[int]: The coordinate of the content edge, or None if there is no content.
         """
-        return "TrimOperator()"
+        start, end = span
+        step = 1 if end > start else -1
+        size = _FIRST_BAND
+        position = start
+        while position != end:
+            limit = position + step * size
+            limit = min(limit, end) if step > 0 else max(limit, end)
+            low, high = sorted((position, limit))
+            band_bbox = self._content_bbox(image.crop(box(low, high)), background)
+            if band_bbox:
+                return low + band_bbox[side]
+            position = limit
+            size *= 2
+        return None
 
-def trim() -> TrimOperator:
+    def _content_bbox(self, band: Image.Image, background) -> Optional[Box]:
+        """Return the bounding box of the pixels of a band that are not background."""
+        if background is None:
+            # Transparent (or zero) up to the tolerance
+            difference = band.getchannel('A') if band.mode.endswith('A') else band
+        else:
+            difference = ImageChops.difference(band, Image.new(band.mode, band.size, background))
+        if len(difference.getbands()) > 1:
+            difference = reduce(ImageChops.lighter, difference.split())
+        if self.tolerance:
+            difference = difference.point(lambda value: 255 if value > self.tolerance else 0)
+        return difference.getbbox()
+
+def trim(background: Optional[str] = None, tolerance: int = 0) -> TrimOperator:
     """
     Create a TrimOperator instance.
 
+    Args:
+        background (Optional[str]): Background color in HEX format, 'auto' to detect it from the
+                                    corners, or None to trim transparent pixels. Default is None.
+        tolerance (int): Maximum per-band difference from the background. Default is 0.
+
     Returns:
         TrimOperator: An instance of TrimOperator.
     """
-    return TrimOperator()
+    return TrimOperator(background, tolerance)
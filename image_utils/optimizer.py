@@ -0,0 +1,260 @@
+from PIL import Image
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from .core.image_transformer import ImageTransformer
+from .operators.crop_operator import CropOperator
+from .operators.flip_operator import FlipOperator
+from .operators.image_operator import ImageOperator
+from .operators.resize_operator import ResizeOperator
+from .operators.roll_operator import RollOperator
+from .operators.trim_operator import TrimOperator
+
+# Operators whose geometry can be planned from the image size alone (trim needs a bbox scan)
+GEOMETRY_OPERATORS = (CropOperator, FlipOperator, ResizeOperator, RollOperator, TrimOperator)
+
+Box = Tuple[int, int, int, int]
+
+class FusedGeometryOperator(ImageOperator):
+    """
+    An image operator that runs a chain of geometry operators as a minimal sequence of PIL calls.
+
+    The chain is planned against the actual image size at call time: consecutive crops (including
+    the crop performed by trim) are merged into one box, crops following a flip are moved in
+    front of it, flips in both directions become one transpose, double flips cancel, consecutive
+    rolls are merged into one shift and resizes to the current size are skipped. All of these
+    rewrites are pixel-identical to running the operators one by one.
+
+    With `fuse_resize` enabled, crops following a resize are also folded into a single
+    `Image.resize(size, box=...)` call, so only the pixels that survive the crop are resampled.
+    Because PIL rounds the filter weights differently in that case, the result may differ from
+    the unfused chain by a few intensity levels.
+
+    Attributes:
+        operators (Tuple[ImageOperator, ...]): The geometry operators, in application order.
+        fuse_resize (bool): Fold crops into the preceding resize. Default is False.
+    """
+    spec_name = 'fused_geometry'
+
+    def __init__(self, operators: Sequence[Union[ImageOperator, Dict[str, Any]]],
+                 fuse_resize: bool = False):
+        from .spec import from_spec
+        self.operators = tuple(from_spec(op) if isinstance(op, dict) else op for op in operators)
+        self.fuse_resize = fuse_resize
+        self._freeze()
+
+    def __call__(self, image: Image.Image) -> Image.Image:
+        """
+        Apply the fused geometry chain to the image.
+
+        Args:
+            image (Image.Image): The input image.
+
+        Returns:
+            Image.Image: The transformed image.
+        """
+        plan = _GeometryPlan(image, self.fuse_resize)
+        for operator in self.operators:
+            plan.apply(operator)
+        return plan.flush()
+
+    def params(self) -> Dict[str, Any]:
+        """Return the constructor arguments of the FusedGeometryOperator."""
+        return {'operators': list(self.operators), 'fuse_resize': self.fuse_resize}
+
+    def to_spec(self) -> Dict[str, Any]:
+        """Return the serialisable spec, including the specs of the fused operators."""
+        return {'op': self.spec_name, 'operators': [op.to_spec() for op in self.operators],
+                'fuse_resize': self.fuse_resize}
+
+class _GeometryPlan:
+    """
+    Pending geometry in canonical order: crop box, then flips, then resize, applied on flush.
+
+    Rolls are kept separately as a pending (dx, dy) shift, since they do not commute with crops.
+    """
+
+    def __init__(self, image: Image.Image, fuse_resize: bool):
+        self.image = image
+        self.fuse_resize = fuse_resize
+        self._reset()
+
+    def _reset(self) -> None:
+        self.box: Optional[Box] = None
+        self.flip_h = False
+        self.flip_v = False
+        # Pending resize as (operator, size, box in the cropped and flipped image)
+        self.resize: Optional[Tuple[ResizeOperator, Tuple[int, int], Tuple[float, float, float, float]]] = None
+        self.roll: Optional[Tuple[int, int]] = None
+
+    def size(self) -> Tuple[int, int]:
+        """Return the size of the image as it would be after a flush."""
+        if self.resize:
+            return self.resize[1]
+        if self.box:
+            left, top, right, bottom = self.box
+            return right - left, bottom - top
+        return self.image.size
+
+    def apply(self, operator: ImageOperator) -> None:
+        """Add an operator to the plan, flushing pending work when it cannot be merged."""
+        if isinstance(operator, RollOperator):
+            self._apply_roll(operator)
+            return
+        self._flush_roll()
+        if isinstance(operator, CropOperator):
+            self._apply_crop(operator.box(self.size()))
+        elif isinstance(operator, FlipOperator):
+            if self.resize:
+                self.flush()
+            if operator.direction == 'h':
+                self.flip_h = not self.flip_h
+            else:
+                self.flip_v = not self.flip_v
+        elif isinstance(operator, ResizeOperator):
+            self._apply_resize(operator)
+        elif isinstance(operator, TrimOperator):
+            image = self.flush()
+            bbox = operator.bbox(image)
+            if bbox:
+                self.box = bbox
+            else:
+                self.image = operator(image)
+        else:
+            self.image = operator(self.flush())
+
+    def _apply_crop(self, box: Box) -> None:
+        left, top, right, bottom = box
+        if self.resize:
+            operator, (width, height), (x0, y0, x1, y1) = self.resize
+            if right - left and bottom - top:
+                # Fold the crop into the resize box
+                sx, sy = (x1 - x0) / width, (y1 - y0) / height
+                self.resize = (operator, (right - left, bottom - top),
+                               (x0 + left * sx, y0 + top * sy, x0 + right * sx, y0 + bottom * sy))
+                return
+            self.flush()
+        width, height = self.size()
+        # Map the box back through the pending flips
+        if self.flip_h:
+            left, right = width - right, width - left
+        if self.flip_v:
+            top, bottom = height - bottom, height - top
+        offset_x, offset_y = self.box[:2] if self.box else (0, 0)
+        self.box = (offset_x + left, offset_y + top, offset_x + right, offset_y + bottom)
+
+    def _apply_resize(self, operator: ResizeOperator) -> None:
+        if self.resize:
+            self.flush()
+        width, height = self.size()
+        target = operator.target_size((width, height))
+        box = operator.source_box((width, height))
+        if target == (width, height) and box is None:
+            return
+        if self.fuse_resize:
+            self.resize = (operator, target, box or (0, 0, width, height))
+        else:
+            self.image = operator(self.flush())
+
+    def _apply_roll(self, operator: RollOperator) -> None:
+        dx, dy = self.roll or (0, 0)
+        shift_x, shift_y = operator.shifts()
+        self.roll = (dx + shift_x, dy + shift_y)
+
+    def _flush_roll(self) -> None:
+        if self.roll is None:
+            return
+        dx, dy = self.roll
+        self.roll = None
+        self.image = RollOperator(dx=dx, dy=dy)(self.flush())
+
+    def flush(self) -> Image.Image:
+        """Apply the pending geometry and return the resulting image."""
+        if self.roll is not None:
+            self._flush_roll()
+        image = self.image
+        if self.box and self.box != (0, 0) + image.size:
+            image = image.crop(self.box)
+        if self.flip_h and self.flip_v:
+            image = image.transpose(Image.ROTATE_180)
+        elif self.flip_h:
+            image = image.transpose(Image.FLIP_LEFT_RIGHT)
+        elif self.flip_v:
+            image = image.transpose(Image.FLIP_TOP_BOTTOM)
+        if self.resize:
+            operator, size, box = self.resize
+            image = operator.resize_to(image, size, box)
+        self.image = image
+        self._reset()
+        return image
+
+def optimize(transformer: ImageTransformer, fuse_resize: bool = False) -> ImageTransformer:
+    """
+    Rewrite a transformer into an equivalent one that touches fewer pixels.
+
+    Nested pipelines are flattened, adjacent identical flips cancel out and every run of
+    consecutive geometry operators (crop, flip, resize, roll, trim) is replaced by a
+    `FusedGeometryOperator`. Other operators are kept as they are.
+
+    Args:
+        transformer (ImageTransformer): A pipeline or a single transformer.
+        fuse_resize (bool): Also fold crops into preceding resizes (not pixel-identical).
+
+    Returns:
+        ImageTransformer: The optimized pipeline.
+    """
+    from .pipeline import Pipeline
+
+    optimized: List[ImageTransformer] = []
+    run: List[ImageOperator] = []
+
+    def flush_run():
+        if len(run) > 1:
+            optimized.append(FusedGeometryOperator(run, fuse_resize=fuse_resize))
+        else:
+            optimized.extend(run)
+        run.clear()
+
+    for operator in _cancel_flips(flatten(transformer)):
+        if isinstance(operator, GEOMETRY_OPERATORS):
+            run.append(operator)
+        else:
+            flush_run()
+            optimized.append(operator)
+    flush_run()
+    return Pipeline(optimized)
+
+def flatten(transformer: ImageTransformer, expand_fused: bool = False) -> List[ImageTransformer]:
+    """
+    Expand nested pipelines into a flat list of transformers.
+
+    A pipeline with an explicit output mode contributes a trailing `ConvertOperator`.
+
+    Args:
+        transformer (ImageTransformer): A pipeline or a single transformer.
+        expand_fused (bool): Also expand fused geometry operators into their operators.
+
+    Returns:
+        List[ImageTransformer]: The transformers in application order.
+    """
+    from .pipeline import Pipeline
+
+    if isinstance(transformer, Pipeline):
+        flat = [t for inner in transformer.transformers for t in flatten(inner, expand_fused)]
+        if transformer.mode:
+            from .operators.convert_operator import ConvertOperator
+            flat.append(ConvertOperator(transformer.mode))
+        return flat
+    if expand_fused and isinstance(transformer, FusedGeometryOperator):
+        return list(transformer.operators)
+    return [transformer]
+
+def _cancel_flips(transformers: List[ImageTransformer]) -> List[ImageTransformer]:
+    """Drop pairs of adjacent flips in the same direction."""
+    result: List[ImageTransformer] = []
+    for transformer in transformers:
+        if (isinstance(transformer, FlipOperator) and result
+                and isinstance(result[-1], FlipOperator)
+                and result[-1].direction == transformer.direction):
+            result.pop()
+        else:
+            result.append(transformer)
+    return result
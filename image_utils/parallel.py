@@ -0,0 +1,137 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from io import BytesIO
+from itertools import islice
+from PIL import Image
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .core.image_transformer import ImageTransformer
+from .image_io import open_image, save_image
+
+Source = Union[str, Image.Image]
+
+# The transformer shipped to each worker process once, by the pool initializer
+_worker_transformer: Optional[ImageTransformer] = None
+
+def _init_worker(transformer: ImageTransformer) -> None:
+    """Store the transformer in the worker process."""
+    global _worker_transformer
+    _worker_transformer = transformer
+
+def _transform_source(source: Source, format: Optional[str] = None) -> Union[Image.Image, bytes]:
+    """
+    Decode (if needed), transform and optionally encode a single source inside a worker.
+
+    Args:
+        source (Source): An image path or an image.
+        format (Optional[str]): If given, encode the result to bytes in this format.
+
+    Returns:
+        Union[Image.Image, bytes]: The transformed image, or its encoded bytes.
+    """
+    image = open_image(source) if isinstance(source, str) else source
+    result = _worker_transformer(image)
+    if format is None:
+        # Make sure the pixels travel back with the image
+        result.load()
+        return result
+    buffer = BytesIO()
+    save_image(result, buffer, format=format)
+    return buffer.getvalue()
+
+def _transform_chunk(sources: List[Source], format: Optional[str] = None) -> List[Union[Image.Image, bytes]]:
+    """Transform a chunk of sources inside a worker (see `_transform_source`)."""
+    return [_transform_source(source, format) for source in sources]
+
+def _process_file(input_path: str, output_path: str, opaque: bool, draft: bool, format: Optional[str],
+                  encoder: Optional[Dict[str, Any]]) -> Tuple[str, Optional[str], Optional[Exception]]:
+    """Process one batch file inside a worker, reporting failures instead of raising."""
+    from .batch import process_file
+    try:
+        return input_path, process_file(_worker_transformer, input_path, output_path, opaque, draft,
+                                        format, encoder), None
+    except Exception as e:
+        return input_path, None, e
+
+def parallel_map(transformer: ImageTransformer, sources: Iterable[Source],
+                 workers: Optional[int] = None, chunksize: int = 1, ordered: bool = True,
+                 format: Optional[str] = None) -> Iterator[Union[Image.Image, bytes]]:
+    """
+    Apply a transformer to many sources in a pool of worker processes.
+
+    The transformer is pickled once per worker rather than once per image, so it (and every
+    operator it contains) must be picklable. Sources are pulled lazily, keeping at most twice
+    as many chunks in flight as there are workers, so a long or endless iterable of sources is
+    never read ahead (nor its results held) beyond that window. Leaving the loop early cancels
+    the chunks that have not started.
+
+    Args:
+        transformer (ImageTransformer): The transformer to apply.
+        sources (Iterable[Source]): Image paths (decoded in the workers) or images.
+        workers (Optional[int]): Number of worker processes. Defaults to the CPU count.
+        chunksize (int): Number of sources sent to a worker at a time.
+        ordered (bool): Yield results in input order, or as soon as their chunk completes.
+        format (Optional[str]): If given, results are encoded to bytes in the workers.
+
+    Yields:
+        Union[Image.Image, bytes]: The transformed images, or their encoded bytes.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+    iterator = iter(sources)
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(transformer,)) as executor:
+        try:
+            while True:
+                while len(pending) < max_pending:
+                    chunk = list(islice(iterator, chunksize))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_transform_chunk, chunk, format))
+                if not pending:
+                    return
+                if ordered:
+                    yield from pending.popleft().result()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                    for future in done:
+                        yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+def parallel_process_files(transformer: ImageTransformer, jobs: Iterable[Tuple[str, str]],
+                           workers: Optional[int] = None, opaque: bool = False,
+                           draft: bool = False, chunksize: int = 1, format: Optional[str] = None,
+                           encoder: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+    """
+    Process (input path, output path) pairs in a pool of worker processes.
+
+    Args:
+        transformer (ImageTransformer): The transformer to apply.
+        jobs (Iterable[Tuple[str, str]]): The input and output path of each file.
+        workers (Optional[int]): Number of worker processes. Defaults to the CPU count.
+        opaque (bool): Convert the output images to an opaque format. Default is False.
+        draft (bool): Decode at a reduced scale ahead of a leading downscale. Default is False.
+        chunksize (int): Number of files sent to a worker at a time.
+        format (Optional[str]): The output format, instead of the one of the output extension.
+        encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+
+    Yields:
+        Tuple[str, Optional[str], Optional[Exception]]: The input path, the output path
+        (None on failure) and the error raised (None on success), in input order.
+    """
+    jobs = list(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(transformer,)) as executor:
+        yield from executor.map(_process_file,
+                                [input_path for input_path, _ in jobs],
+                                [output_path for _, output_path in jobs],
+                                [opaque] * len(jobs),
+                                [draft] * len(jobs),
+                                [format] * len(jobs),
+                                [encoder] * len(jobs),
+                                chunksize=chunksize)
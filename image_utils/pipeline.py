@@ -1,6 +1,11 @@
 from PIL import Image
-from typing import List, Union
+from typing import (Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple, TYPE_CHECKING, Union)
 from .core.image_transformer import ImageTransformer
+from .profiling import Profiler, Span, active_profiler
+
+if TYPE_CHECKING:
+    from .aio import AsyncRunner
 
 class Pipeline(ImageTransformer):
     """
@@ -9,38 +14,111 @@ class Pipeline(ImageTransformer):
     This class allows chaining multiple image transformers (either operators or other pipelines)
     and applying them in order via a single callable interface.
 
+    Operators keep the mode of their input where they can (a grayscale image stays 'L'
+    throughout), so by default the output mode follows the input. Set `mode` to convert the
+    final result to an explicit mode instead.
+
     Attributes:
         transformers (List[ImageTransformer]): A list of image transformers.
+        mode (Optional[str]): The mode of the output images, or None to keep the mode produced
+                              by the transformers.
 
     Methods:
         add(*transformers: ImageTransformer) -> 'Pipeline':
             Add additional transformers to the pipeline.
+        to_spec() -> Dict[str, Any]:
+            Return the serialisable spec of the pipeline.
+        optimize(fuse_resize: bool = False) -> 'Pipeline':
+            Return an equivalent pipeline with geometry operators fused.
+        run_stack(images: Sequence[Image.Image]) -> List[Image.Image]:
+            Apply the pipeline to many images at once with the NumPy backend.
+        run_bands(image: Image.Image, workers: Optional[int] = None) -> Image.Image:
+            Apply the pipeline to one large image, rendering bands of it in parallel.
+        profile(image: Image.Image, callback=None) -> Tuple[Image.Image, Profiler]:
+            Apply the pipeline and time every transformer.
+        arun(source, format: Optional[str] = None) -> Union[Image.Image, bytes]:
+            Apply the pipeline from asyncio code, on a bounded thread pool.
+        amap(sources, ordered: bool = True, format: Optional[str] = None) -> AsyncIterator:
+            Apply the pipeline to many sources from asyncio code.
     """
 
-    def __init__(self, transformers: List[ImageTransformer] = None):
+    def __init__(self, transformers: List[ImageTransformer] = None, mode: Optional[str] = None):
         """
         Initialize the Pipeline with an optional list of transformers.
 
         Args:
             transformers (List[ImageTransformer], optional): A list of callable image transformers. Defaults to empty.
+            mode (Optional[str]): Convert the output to this mode. Defaults to None (keep the mode).
         """
         self.transformers = transformers if transformers is not None else []
+        self.mode = mode
 
     def __call__(self, image: Image.Image) -> Image.Image:
         """
         Apply the pipeline of transformations to the input image.
 
+        Array-like inputs (NumPy arrays, buffers exposing `__array_interface__`) are processed
+        as arrays and returned as a NumPy array, a view of the input where the operators allow
+        it (see `image_utils.numpy_backend.run_array`).
+
         Args:
             image (Image.Image): The input image to be transformed.
 
         Returns:
             Image.Image: The transformed image.
         """
+        if not isinstance(image, Image.Image):
+            from .numpy_backend import is_array, run_array
+            if is_array(image):
+                return run_array(self, image)
+        profiler = active_profiler()
+        if profiler is not None:
+            return self._run_profiled(image, profiler)
         result = image
         for transformer in self.transformers:
             result = transformer(result)
+        if self.mode and result.mode != self.mode:
+            result = result.convert(self.mode)
+        return result
+
+    def _run_profiled(self, image: Image.Image, profiler: Profiler) -> Image.Image:
+        """Apply the pipeline inside a span, with a nested span per transformer."""
+        from .profiling import call
+
+        with profiler.span('Pipeline', 'pipeline', image, transformers=len(self.transformers)) as span:
+            result = image
+            for transformer in self.transformers:
+                result = call(profiler, transformer, result)
+            if self.mode and result.mode != self.mode:
+                with profiler.span('convert', 'transform', result, mode=self.mode) as convert_span:
+                    result = result.convert(self.mode)
+                    convert_span.set_output(result)
+            span.set_output(result)
         return result
 
+    def profile(self, image: Image.Image,
+                callback: Optional[Callable[[Span], None]] = None) -> Tuple[Image.Image, Profiler]:
+        """
+        Apply the pipeline to an image, timing every transformer.
+
+        Each transformer gets a span with its wall and CPU time, input and output size and
+        mode, and the pixel memory it allocated; nested pipelines and the transformers chosen
+        by `concat_map` appear as nested spans. To profile code that runs pipelines
+        indirectly, use `image_utils.profiling.profile` instead.
+
+        Args:
+            image (Image.Image): The input image.
+            callback (Optional[Callable[[Span], None]]): Called with each span as it finishes.
+
+        Returns:
+            Tuple[Image.Image, Profiler]: The transformed image and the profiler holding the spans.
+        """
+        from .profiling import profile
+
+        with profile(callback) as profiler:
+            result = self(image)
+        return result, profiler
+
     def add(self, *transformers: ImageTransformer) -> 'Pipeline':
         """
         Add additional transformers to the pipeline.
@@ -54,24 +132,204 @@ class Pipeline(ImageTransformer):
         self.transformers.extend(transformers)
         return self
 
+    def optimize(self, fuse_resize: bool = False) -> 'Pipeline':
+        """
+        Return an equivalent pipeline that materialises fewer intermediate images.
+
+        Runs of crop, flip, resize, roll and trim operators are planned against the image size
+        and executed as a minimal sequence of PIL calls (see `image_utils.optimizer`). The
+        result is pixel-identical unless `fuse_resize` is enabled.
+
+        Args:
+            fuse_resize (bool): Also fold crops into a preceding resize via `Image.resize(box=...)`,
+                                which may change pixel values by a few levels. Default is False.
+
+        Returns:
+            Pipeline: A new, optimized pipeline. This pipeline is left unchanged.
+        """
+        from .optimizer import optimize
+        return optimize(self, fuse_resize=fuse_resize)
+
+    def to_spec(self) -> Dict[str, Any]:
+        """
+        Return the serialisable spec of the pipeline.
+
+        The spec can be stored as JSON and turned back into an equal pipeline with
+        `image_utils.spec.from_spec`.
+
+        Returns:
+            Dict[str, Any]: A JSON-compatible dict describing every transformer.
+        """
+        from .spec import to_spec
+        spec = {'op': 'pipe', 'transformers': [to_spec(t) for t in self.transformers]}
+        if self.mode:
+            spec['mode'] = self.mode
+        return spec
+
+    def map(self, sources: Iterable[Union[str, Image.Image]], workers: Optional[int] = None,
+            chunksize: int = 1, ordered: bool = True,
+            format: Optional[str] = None) -> Iterator[Union[Image.Image, bytes]]:
+        """
+        Apply the pipeline to many images in parallel worker processes.
+
+        Paths are decoded inside the workers, and the results can be encoded there as well,
+        so only file names and encoded bytes cross process boundaries.
+
+        Args:
+            sources (Iterable[Union[str, Image.Image]]): Image paths or images.
+            workers (Optional[int]): Number of worker processes. Defaults to the CPU count.
+            chunksize (int): Number of sources sent to a worker at a time. Default is 1.
+            ordered (bool): Yield results in input order (True) or as completed (False).
+            format (Optional[str]): If given, yield the results encoded in this format.
+
+        Returns:
+            Iterator[Union[Image.Image, bytes]]: The transformed images, or their encoded bytes.
+        """
+        from .parallel import parallel_map
+        return parallel_map(self, sources, workers=workers, chunksize=chunksize,
+                            ordered=ordered, format=format)
+
+    async def arun(self, source: Any, format: Optional[str] = None, opaque: bool = False,
+                   encoder: Optional[Dict[str, Any]] = None, runner: Optional['AsyncRunner'] = None
+                   ) -> Union[Image.Image, bytes]:
+        """
+        Apply the pipeline without blocking the event loop.
+
+        The input bytes are read asynchronously, and decoding, the transformers and encoding
+        run on the thread pool of `runner`, which also limits how many requests are admitted
+        at a time. Cancelling the call stops the work before the next transformer.
+
+        Example:
+            data = await pipeline.arun(await request.read(), format='WEBP')
+
+        Args:
+            source (Any): An image path, encoded image bytes, an image, or an async reader
+                          with an awaitable `read()` (e.g. aiohttp's `StreamReader`).
+            format (Optional[str]): If given, return the result encoded in this format.
+            opaque (bool): Convert the encoded output to an opaque format. Default is False.
+            encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+            runner (Optional[AsyncRunner]): The runner to use. Defaults to a shared runner
+                                            with 4 threads (see `image_utils.aio`).
+
+        Returns:
+            Union[Image.Image, bytes]: The transformed image, or its encoded bytes.
+        """
+        from .aio import default_runner
+        runner = runner or default_runner()
+        return await runner.run(self, source, format=format, opaque=opaque, encoder=encoder)
+
+    def amap(self, sources: Union[Iterable[Any], AsyncIterable[Any]], ordered: bool = True,
+             format: Optional[str] = None, opaque: bool = False, encoder: Optional[Dict[str, Any]] = None,
+             runner: Optional['AsyncRunner'] = None) -> AsyncIterator[Union[Image.Image, bytes]]:
+        """
+        Apply the pipeline to many sources from asyncio code, as an async iterator.
+
+        Sources (a plain or async iterable) are pulled lazily and at most `runner.max_pending`
+        are in flight at a time. Closing the iterator early (e.g. leaving an `async for` loop
+        wrapped in `contextlib.aclosing`) cancels the requests still in flight.
+
+        Args:
+            sources (Union[Iterable[Any], AsyncIterable[Any]]): Sources, as accepted by `arun`.
+            ordered (bool): Yield results in input order (True) or as completed (False).
+            format (Optional[str]): If given, yield the results encoded in this format.
+            opaque (bool): Convert the encoded outputs to an opaque format. Default is False.
+            encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+            runner (Optional[AsyncRunner]): The runner to use. Defaults to the shared runner.
+
+        Returns:
+            AsyncIterator[Union[Image.Image, bytes]]: The transformed images, or their encoded bytes.
+        """
+        from .aio import default_runner
+        runner = runner or default_runner()
+        return runner.map(self, sources, ordered=ordered, format=format, opaque=opaque, encoder=encoder)
+
+    def run_stack(self, images: Sequence[Image.Image]) -> List[Image.Image]:
+        """
+        Apply the pipeline to many images at once using stacked NumPy arrays.
+
+        Images sharing a size and mode are processed as one `(N, H, W, C)` array; crop, flip,
+        roll, expand, gray scale and trim run as array operations on the whole stack, other
+        transformers run image by image (see `image_utils.numpy_backend`). Requires numpy.
+
+        Args:
+            images (Sequence[Image.Image]): The input images.
+
+        Returns:
+            List[Image.Image]: The transformed images, in input order.
+        """
+        from .numpy_backend import run_stack
+        return run_stack(self, images)
+
+    def run_bands(self, image: Image.Image, workers: Optional[int] = None,
+                  bands: Optional[int] = None) -> Image.Image:
+        """
+        Apply the pipeline to one image, splitting it into horizontal bands processed in parallel.
+
+        Crop, flip, roll, expand, gray scale, convert and resize run band by band on a thread
+        pool and are stitched into a preallocated output; other operators run on the whole
+        image in between (see `image_utils.tiling.run_in_bands`). Useful for very large
+        single images, where running many images in parallel does not help. Resized pixels
+        may differ by a level or two at band edges.
+
+        Args:
+            image (Image.Image): The input image.
+            workers (Optional[int]): Number of threads. Defaults to the CPU count.
+            bands (Optional[int]): Number of bands. Defaults to `workers`.
+
+        Returns:
+            Image.Image: The transformed image.
+        """
+        from .tiling import run_in_bands
+        return run_in_bands(self, image, workers=workers, bands=bands)
+
+    def run_frames(self, image: Image.Image) -> Iterator[Image.Image]:
+        """
+        Apply the pipeline to every frame of an animated or multi-page image, lazily.
+
+        Frames are decoded one at a time, trims are resolved to one box for all frames so the
+        frames keep a common size, and frame durations are carried over (see
+        `image_utils.frames.iter_frames`). Save the result with `image_utils.frames.save_frames`.
+
+        Args:
+            image (Image.Image): The opened image.
+
+        Returns:
+            Iterator[Image.Image]: The transformed frames, in order.
+        """
+        from .frames import iter_frames
+        return iter_frames(self, image)
+
     def __repr__(self) -> str:
         """
         Return a string representation of the pipeline.
 
         Returns:
-            str: A multiline string showing each transformer in the pipeline.
+            str: A multiline string showing each transformer in the pipeline. Plain functions
+                 are shown by import path, so equal pipelines have equal representations.
         """
-        transformers_repr = ',\n  '.join(repr(t) for t in self.transformers)
-        return f"Pipeline(\n  {transformers_repr}\n)"
+        transformers_repr = ',\n  '.join(_transformer_repr(t) for t in self.transformers)
+        mode_repr = f",\n  mode={self.mode!r}" if self.mode else ""
+        return f"Pipeline(\n  {transformers_repr}{mode_repr}\n)"
+
+def _transformer_repr(transformer: ImageTransformer) -> str:
+    """Return the repr of a transformer, using the import path for plain functions."""
+    if hasattr(transformer, 'to_spec') or not callable(transformer):
+        return repr(transformer)
+    from .spec import function_ref
+    try:
+        return function_ref(transformer)
+    except ValueError:
+        return repr(transformer)
 
-def pipe(*transformers: ImageTransformer) -> Pipeline:
+def pipe(*transformers: ImageTransformer, mode: Optional[str] = None) -> Pipeline:
     """
     Create a Pipeline instance from a list of image transformers.
 
     Args:
         *transformers (ImageTransformer): One or more callable image transformers.
+        mode (Optional[str]): Convert the output to this mode. Defaults to None (keep the mode).
 
     Returns:
         Pipeline: A new Pipeline instance.
     """
-    return Pipeline(list(transformers))
+    return Pipeline(list(transformers), mode=mode)
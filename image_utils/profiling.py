@@ -0,0 +1,239 @@
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from PIL import Image, ImageMode
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .core.image_transformer import ImageTransformer
+
+PROFILE_FORMATS = ('json', 'chrome')
+
+# The profiler collecting spans in the current context, and the innermost open span
+_profiler: ContextVar[Optional['Profiler']] = ContextVar('image_utils_profiler', default=None)
+_parent: ContextVar[Optional[int]] = ContextVar('image_utils_span', default=None)
+
+class Span:
+    """
+    One timed step: a transformer call, a nested pipeline, or the decode or encode of an image.
+
+    Attributes:
+        id (int): Identifier of the span, unique within its profiler.
+        parent (Optional[int]): Identifier of the enclosing span, or None at the top level.
+        name (str): What ran, e.g. 'ResizeOperator', 'Pipeline' or 'decode'.
+        category (str): 'transform', 'pipeline', 'decode' or 'encode'.
+        start (float): Start time in seconds, relative to the start of the profiler.
+        wall (float): Elapsed wall time in seconds.
+        cpu (float): CPU time of the calling thread in seconds.
+        thread (int): Identifier of the thread that ran the span.
+        input (Optional[Tuple[Tuple[int, int], str]]): Size and mode of the input image.
+        output (Optional[Tuple[Tuple[int, int], str]]): Size and mode of the output image.
+        bytes_allocated (int): Pixel memory of the output image if it is a new image, else 0.
+        args (Dict[str, Any]): Extra details, e.g. the operator parameters or the output format.
+    """
+
+    def __init__(self, id: int, parent: Optional[int], name: str, category: str, start: float,
+                 input: Optional[Image.Image] = None, args: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.parent = parent
+        self.name = name
+        self.category = category
+        self.start = start
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.thread = threading.get_ident()
+        self.input = _describe(input)
+        self.output: Optional[Tuple[Tuple[int, int], str]] = None
+        self.bytes_allocated = 0
+        self.args = args or {}
+        self._input_image = input
+
+    def set_output(self, image: Any) -> None:
+        """Record the image produced by the span."""
+        self.output = _describe(image)
+        if isinstance(image, Image.Image) and image is not self._input_image:
+            self.bytes_allocated = image_bytes(image)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the JSON-compatible form of the span."""
+        return {'id': self.id, 'parent': self.parent, 'name': self.name, 'category': self.category,
+                'start': self.start, 'wall': self.wall, 'cpu': self.cpu, 'thread': self.thread,
+                'input': _size_mode(self.input), 'output': _size_mode(self.output),
+                'bytes_allocated': self.bytes_allocated, 'args': self.args}
+
+    def __repr__(self) -> str:
+        return f"Span({self.name}, {self.category}, {self.wall * 1000:.3f} ms)"
+
+class Profiler:
+    """
+    Collects the spans recorded while it is active (see `profile`).
+
+    Pipelines record a span per transformer, nested pipelines and the transformers chosen by
+    `concat_map` appear as child spans, and the CLI adds the decode and encode of the image.
+    The profiler is held in a context variable, so spans are collected from the code running
+    in the profiled context. Threads started elsewhere do not see it, except the band and stage
+    threads of `run_in_bands` and `run_staged`, which run in a copy of the caller's context.
+
+    Attributes:
+        spans (List[Span]): The finished spans, in completion order.
+        callback (Optional[Callable[[Span], None]]): Called with each span as it finishes.
+    """
+
+    def __init__(self, callback: Optional[Callable[[Span], None]] = None):
+        self.spans: List[Span] = []
+        self.callback = callback
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+
+    @contextmanager
+    def span(self, name: str, category: str, input: Optional[Image.Image] = None,
+             **args: Any) -> Iterator[Span]:
+        """
+        Time the enclosed block as a span, nested in the current span.
+
+        Args:
+            name (str): What runs in the block.
+            category (str): The kind of work ('transform', 'pipeline', 'decode' or 'encode').
+            input (Optional[Image.Image]): The input image, if any.
+            **args (Any): Extra details stored with the span.
+
+        Yields:
+            Span: The open span; call `set_output` with the resulting image.
+        """
+        span = Span(next(self._ids), _parent.get(), name, category, 0.0, input, args)
+        token = _parent.set(span.id)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        span.start = start - self._origin
+        try:
+            yield span
+        finally:
+            span.cpu = time.thread_time() - cpu_start
+            span.wall = time.perf_counter() - start
+            _parent.reset(token)
+            self.spans.append(span)
+            if self.callback:
+                self.callback(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the spans as a JSON-compatible document, in start order."""
+        return {'spans': [span.to_dict() for span in sorted(self.spans, key=lambda span: span.start)]}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Return the spans in the Chrome trace event format, for chrome://tracing or Perfetto.
+
+        Returns:
+            Dict[str, Any]: A trace with one complete ('X') event per span.
+        """
+        pid = os.getpid()
+        events = []
+        for span in sorted(self.spans, key=lambda span: span.start):
+            args = {'cpu_ms': span.cpu * 1000, 'bytes_allocated': span.bytes_allocated, **span.args}
+            if span.input:
+                args['input'] = _size_mode(span.input)
+            if span.output:
+                args['output'] = _size_mode(span.output)
+            events.append({'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': pid,
+                           'tid': span.thread, 'ts': span.start * 1e6, 'dur': span.wall * 1e6,
+                           'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path: str, format: str = 'json') -> None:
+        """
+        Write the spans to a file.
+
+        Args:
+            path (str): The output path.
+            format (str): 'json' for `to_dict`, or 'chrome' for `to_chrome_trace`. Default is 'json'.
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        if format not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format '{format}', expected one of {', '.join(PROFILE_FORMATS)}.")
+        document = self.to_chrome_trace() if format == 'chrome' else self.to_dict()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=1, default=str)
+
+@contextmanager
+def profile(callback: Optional[Callable[[Span], None]] = None) -> Iterator[Profiler]:
+    """
+    Profile every pipeline run in the enclosed block.
+
+    Example:
+        with profile() as profiler:
+            pipeline(image)
+        profiler.save('profile.json', format='chrome')
+
+    Args:
+        callback (Optional[Callable[[Span], None]]): Called with each span as it finishes.
+
+    Yields:
+        Profiler: The profiler collecting the spans.
+    """
+    profiler = Profiler(callback)
+    token = _profiler.set(profiler)
+    parent_token = _parent.set(None)
+    try:
+        yield profiler
+    finally:
+        _parent.reset(parent_token)
+        _profiler.reset(token)
+
+def active_profiler() -> Optional[Profiler]:
+    """Return the profiler of the current context, or None when not profiling."""
+    return _profiler.get()
+
+def call(profiler: Profiler, transformer: ImageTransformer, image: Image.Image) -> Image.Image:
+    """
+    Apply a transformer inside a span named after it.
+
+    Pipelines are called directly, as they record their own span.
+
+    Args:
+        profiler (Profiler): The active profiler.
+        transformer (ImageTransformer): The transformer to apply.
+        image (Image.Image): The input image.
+
+    Returns:
+        Image.Image: The transformed image.
+    """
+    from .pipeline import Pipeline
+
+    if isinstance(transformer, Pipeline):
+        return transformer(image)
+    with profiler.span(transformer_name(transformer), 'transform', image, **_params(transformer)) as span:
+        result = transformer(image)
+        span.set_output(result)
+    return result
+
+def transformer_name(transformer: ImageTransformer) -> str:
+    """Return the class name of an operator, or the qualified name of a function."""
+    if hasattr(transformer, 'params') or not hasattr(transformer, '__qualname__'):
+        return type(transformer).__name__
+    return transformer.__qualname__
+
+def image_bytes(image: Image.Image) -> int:
+    """Return the size of the pixel data of an image, in bytes."""
+    mode = ImageMode.getmode(image.mode)
+    return image.width * image.height * len(mode.bands) * int(mode.typestr[-1])
+
+def _params(transformer: ImageTransformer) -> Dict[str, Any]:
+    params = getattr(transformer, 'params', None)
+    if params is None:
+        return {}
+    return {key: value if isinstance(value, (int, float, str, bool, type(None))) else repr(value)
+            for key, value in params().items()}
+
+def _describe(image: Any) -> Optional[Tuple[Tuple[int, int], str]]:
+    if isinstance(image, Image.Image):
+        return image.size, image.mode
+    return None
+
+def _size_mode(description: Optional[Tuple[Tuple[int, int], str]]) -> Optional[Dict[str, Any]]:
+    if description is None:
+        return None
+    (width, height), mode = description
+    return {'width': width, 'height': height, 'mode': mode}
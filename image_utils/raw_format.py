@@ -0,0 +1,43 @@
+from PIL import Image, ImageFile
+from typing import BinaryIO
+
+# Uncompressed pixels behind a one-line text header, for piping images between processes
+# without paying for compression: b"IURAW <mode> <width> <height>\n" then the raw rows.
+FORMAT = 'IURAW'
+EXTENSION = '.iuraw'
+MAGIC = b'IURAW '
+
+# The header line is short; anything longer is not an IU-RAW file
+_MAX_HEADER = 64
+
+def _accept(prefix: bytes) -> bool:
+    return prefix[:len(MAGIC)] == MAGIC
+
+class RawImageFile(ImageFile.ImageFile):
+    """An image stored as IU-RAW: a text header with the mode and size, then uncompressed rows."""
+    format = FORMAT
+    format_description = 'image-utils raw pixels'
+
+    def _open(self) -> None:
+        header = self.fp.readline(_MAX_HEADER)
+        try:
+            magic, mode, width, height = header.split()
+            size = (int(width), int(height))
+        except ValueError:
+            raise SyntaxError("Not an IU-RAW file.")
+        if magic + b' ' != MAGIC or mode.decode('ascii') not in Image.MODES:
+            raise SyntaxError("Not an IU-RAW file.")
+        self._mode = mode.decode('ascii')
+        self._size = size
+        self.tile = [('raw', (0, 0) + size, len(header), (self.mode, 0, 1))]
+
+def _save(image: Image.Image, fp: BinaryIO, filename: str) -> None:
+    if image.mode in ('P', 'PA') or image.mode not in Image.MODES:
+        # Palettes would be lost, and the header only names the base modes
+        raise OSError(f"cannot write mode {image.mode} as {FORMAT}")
+    fp.write(MAGIC + f"{image.mode} {image.width} {image.height}\n".encode('ascii'))
+    ImageFile._save(image, fp, [('raw', (0, 0) + image.size, 0, (image.mode, 0, 1))])
+
+Image.register_open(FORMAT, RawImageFile, _accept)
+Image.register_save(FORMAT, _save)
+Image.register_extension(FORMAT, EXTENSION)
@@ -0,0 +1,298 @@
+import json
+import os
+import queue
+import socket
+import stat
+import struct
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterable, Optional, Tuple, Union
+from .core.image_transformer import ImageTransformer
+from .frames import is_animated, save_animation, saves_frames
+from .image_io import (copy_encoded, format_for_name, is_passthrough, open_image, reduce_for, reencodes,
+                       save_image)
+from .pipeline import Pipeline, pipe
+from .spec import from_spec, function_refs, to_spec
+
+DEFAULT_WORKERS = 4
+
+# Frames larger than this are rejected, so a corrupt length cannot exhaust memory
+MAX_FRAME_SIZE = 512 * 1024 * 1024
+
+_LENGTH = struct.Struct('>I')
+
+class ServerError(Exception):
+    """An error reported by the server for a single request."""
+
+def write_frame(fp: BinaryIO, payload: bytes) -> None:
+    """
+    Write one length-prefixed frame (a 4-byte big-endian length, then the payload).
+
+    Args:
+        fp (BinaryIO): The stream to write to.
+        payload (bytes): The frame payload.
+    """
+    fp.write(_LENGTH.pack(len(payload)))
+    fp.write(payload)
+
+def read_frame(fp: BinaryIO) -> Optional[bytes]:
+    """
+    Read one length-prefixed frame.
+
+    Args:
+        fp (BinaryIO): The stream to read from.
+
+    Returns:
+        Optional[bytes]: The frame payload, or None at the end of the stream.
+
+    Raises:
+        ValueError: If the stream ends inside a frame or the frame is too large.
+    """
+    prefix = _read_exactly(fp, _LENGTH.size)
+    if not prefix:
+        return None
+    if len(prefix) < _LENGTH.size:
+        raise ValueError("Truncated frame header.")
+    (length,) = _LENGTH.unpack(prefix)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds the limit of {MAX_FRAME_SIZE} bytes.")
+    payload = _read_exactly(fp, length)
+    if len(payload) < length:
+        raise ValueError("Truncated frame payload.")
+    return payload
+
+def _read_exactly(fp: BinaryIO, size: int) -> bytes:
+    """Read up to `size` bytes, stopping early only at the end of the stream."""
+    chunks = []
+    while size:
+        chunk = fp.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+@lru_cache(maxsize=64)
+def _load_pipeline(spec: str, mode: Optional[str]) -> Pipeline:
+    """Build (once) the pipeline of a canonical JSON spec."""
+    return pipe(from_spec(json.loads(spec)), mode=mode)
+
+class PipelineServer:
+    """
+    A resident worker serving pipeline requests over a framed byte-stream protocol.
+
+    Each request is two frames: a JSON header and the encoded input image. The header holds
+    the pipeline `spec` (see `image_utils.spec`) and optionally the output `format`, `mode`,
+    `opaque` and `draft` settings of the CLI and the `encoder` settings of `save_image`.
+    Animated and multi-page inputs are processed frame by frame when the output format can
+    hold several frames (see `image_utils.frames`).
+    Each response is also two frames: a JSON header, either `{"ok": true, "format": ...}` or
+    `{"ok": false, "error": ...}`, and the encoded output (empty on errors). Responses are
+    sent in request order.
+
+    Requests are processed by a fixed pool of threads shared by all connections, and each
+    connection keeps at most twice that many requests in flight, so a fast client cannot queue
+    unbounded work. Pipelines are built once per distinct spec and reused.
+
+    Specs come from the clients, and rebuilding a 'function' transformer or a `concat_map`
+    imports its module and calls it with the image. Such refs are therefore rejected unless
+    they are listed in `allowed_functions`; clients can otherwise only use the operators.
+
+    Attributes:
+        workers (int): Number of worker threads.
+        allowed_functions (FrozenSet[str]): The 'module:qualname' refs specs may use.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, allowed_functions: Iterable[str] = ()):
+        self.workers = workers
+        self.allowed_functions = frozenset(allowed_functions)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-utils')
+
+    def handle(self, header: Dict[str, Any], data: bytes) -> Tuple[Dict[str, Any], bytes]:
+        """
+        Process a single request.
+
+        Args:
+            header (Dict[str, Any]): The request header.
+            data (bytes): The encoded input image.
+
+        Returns:
+            Tuple[Dict[str, Any], bytes]: The response header and the encoded output.
+        """
+        try:
+            refs = [ref for ref in function_refs(header['spec']) if ref not in self.allowed_functions]
+            if refs:
+                raise PermissionError(f"Function '{refs[0]}' is not allowed by the server.")
+            spec = json.dumps(header['spec'], sort_keys=True, separators=(',', ':'))
+            pipeline = _load_pipeline(spec, header.get('mode'))
+            image = open_image(BytesIO(data))
+            format = format_for_name(header['format']) if header.get('format') else image.format
+            opaque = bool(header.get('opaque'))
+            encoder = header.get('encoder')
+            buffer = BytesIO()
+            if is_animated(image) and saves_frames(format):
+                save_animation(pipeline, image, buffer, format=format, opaque=opaque, encoder=encoder)
+                return {'ok': True, 'format': format}, buffer.getvalue()
+            source, steps = reduce_for(image, pipeline) if header.get('draft') else (image, pipeline)
+            output_image = steps(source)
+            if not (not reencodes(encoder) and is_passthrough(image, output_image, format, opaque)
+                    and copy_encoded(image, buffer)):
+                save_image(output_image, buffer, format=format, opaque=opaque, encoder=encoder)
+        except Exception as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}, b''
+        return {'ok': True, 'format': format}, buffer.getvalue()
+
+    def serve_stream(self, reader: BinaryIO, writer: BinaryIO) -> None:
+        """
+        Serve requests read from a stream until it ends, e.g. standard input and output.
+
+        Args:
+            reader (BinaryIO): The stream of request frames.
+            writer (BinaryIO): The stream to write the response frames to.
+        """
+        # Futures of the requests in flight, in order; a full queue blocks the reader
+        pending: 'queue.Queue[Optional[Future]]' = queue.Queue(maxsize=2 * self.workers)
+        writer_thread = threading.Thread(target=self._write_responses, args=(pending, writer), daemon=True)
+        writer_thread.start()
+        try:
+            while True:
+                try:
+                    header = read_frame(reader)
+                    if header is None:
+                        break
+                    data = read_frame(reader)
+                    if data is None:
+                        raise ValueError("Missing image frame.")
+                except ValueError as e:
+                    # The stream cannot be resynchronised: report and stop
+                    pending.put(_done(({'ok': False, 'error': f"ValueError: {e}"}, b'')))
+                    break
+                pending.put(self._executor.submit(self._handle_frame, header, data))
+        finally:
+            pending.put(None)
+            writer_thread.join()
+
+    def serve_unix(self, path: str) -> None:
+        """
+        Listen on a Unix domain socket and serve every connection until interrupted.
+
+        A stale socket file left at `path` is replaced; the socket file is removed on exit.
+
+        Args:
+            path (str): The socket path.
+        """
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(path)
+            try:
+                server.listen()
+                while True:
+                    connection, _ = server.accept()
+                    threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+            finally:
+                os.unlink(path)
+
+    def close(self) -> None:
+        """Stop the worker threads once the pending requests are done."""
+        self._executor.shutdown()
+
+    def _serve_connection(self, connection: socket.socket) -> None:
+        with connection, connection.makefile('rb') as reader, connection.makefile('wb') as writer:
+            try:
+                self.serve_stream(reader, writer)
+            except OSError:
+                # The client went away
+                pass
+
+    def _handle_frame(self, header: bytes, data: bytes) -> Tuple[Dict[str, Any], bytes]:
+        try:
+            request = json.loads(header)
+        except ValueError as e:
+            return {'ok': False, 'error': f"Invalid request header: {e}"}, b''
+        return self.handle(request, data)
+
+    def _write_responses(self, pending: 'queue.Queue[Optional[Future]]', writer: BinaryIO) -> None:
+        while True:
+            future = pending.get()
+            if future is None:
+                return
+            header, payload = future.result()
+            try:
+                write_frame(writer, json.dumps(header).encode('utf-8'))
+                write_frame(writer, payload)
+                writer.flush()
+            except OSError:
+                # Keep draining so the reader is never blocked on a full queue
+                continue
+
+def _done(result: Tuple[Dict[str, Any], bytes]) -> Future:
+    """Return a future already holding a result."""
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+class Client:
+    """
+    A client of a `PipelineServer` listening on a Unix domain socket.
+
+    Attributes:
+        path (str): The socket path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self._reader = self._socket.makefile('rb')
+        self._writer = self._socket.makefile('wb')
+
+    def process(self, transformer: Union[ImageTransformer, Dict[str, Any]], data: bytes,
+                format: Optional[str] = None, mode: Optional[str] = None,
+                opaque: bool = False, draft: bool = False,
+                encoder: Optional[Dict[str, Any]] = None) -> bytes:
+        """
+        Send an encoded image to the server and return the encoded result.
+
+        Args:
+            transformer (Union[ImageTransformer, Dict[str, Any]]): The transformer or its spec.
+            data (bytes): The encoded input image.
+            format (Optional[str]): The output format. Defaults to the input format.
+            mode (Optional[str]): The output mode, or None to keep the mode.
+            opaque (bool): Convert the output image to an opaque format. Default is False.
+            draft (bool): Decode at a reduced scale ahead of a leading downscale. Default is False.
+            encoder (Optional[Dict[str, Any]]): Encoder settings, e.g. {'fast': True}.
+
+        Returns:
+            bytes: The encoded output image.
+
+        Raises:
+            ServerError: If the server could not process the request.
+        """
+        spec = transformer if isinstance(transformer, dict) else to_spec(transformer)
+        header = {'spec': spec, 'format': format, 'mode': mode, 'opaque': opaque, 'draft': draft,
+                  'encoder': encoder}
+        write_frame(self._writer, json.dumps(header).encode('utf-8'))
+        write_frame(self._writer, data)
+        self._writer.flush()
+        response, payload = read_frame(self._reader), read_frame(self._reader)
+        if response is None or payload is None:
+            raise ServerError("The server closed the connection.")
+        response = json.loads(response)
+        if not response['ok']:
+            raise ServerError(response['error'])
+        return payload
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._writer.close()
+        self._reader.close()
+        self._socket.close()
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
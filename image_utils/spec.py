@@ -0,0 +1,142 @@
+import importlib
+import json
+from typing import Any, Callable, Dict, List
+from .core.image_transformer import ImageTransformer
+
+def to_spec(transformer: ImageTransformer) -> Dict[str, Any]:
+    """
+    Convert a transformer into its serialisable spec.
+
+    Operators and pipelines provide their own `to_spec`. Module-level functions are
+    referenced by their import path.
+
+    Args:
+        transformer (ImageTransformer): An operator, a pipeline or a module-level function.
+
+    Returns:
+        Dict[str, Any]: A JSON-compatible dict describing the transformer.
+
+    Raises:
+        ValueError: If the transformer cannot be described (e.g. a lambda).
+    """
+    if hasattr(transformer, 'to_spec'):
+        return transformer.to_spec()
+    return {'op': 'function', 'ref': function_ref(transformer)}
+
+def from_spec(spec: Dict[str, Any]) -> ImageTransformer:
+    """
+    Rebuild a transformer from its spec.
+
+    Args:
+        spec (Dict[str, Any]): A dict produced by `to_spec`.
+
+    Returns:
+        ImageTransformer: The rebuilt transformer.
+
+    Raises:
+        ValueError: If the spec names an unknown operator.
+    """
+    from .operators.image_operator import OPERATORS
+    from .pipeline import Pipeline
+
+    params = dict(spec)
+    name = params.pop('op')
+    if name == 'pipe':
+        return Pipeline([from_spec(s) for s in params['transformers']], mode=params.get('mode'))
+    if name == 'function':
+        return resolve_ref(params['ref'])
+    if name not in OPERATORS:
+        # Operator modules are imported lazily; register all of them before giving up
+        from .operators import load_all
+        load_all()
+        importlib.import_module('.optimizer', __package__)
+    if name not in OPERATORS:
+        raise ValueError(f"Unknown operator '{name}' in spec.")
+    return OPERATORS[name](**params)
+
+def dumps(transformer: ImageTransformer) -> str:
+    """
+    Serialise a transformer to a canonical JSON string.
+
+    Equal transformers always produce the same string, so the result can be used as a key.
+
+    Args:
+        transformer (ImageTransformer): The transformer to serialise.
+
+    Returns:
+        str: The JSON spec with sorted keys and no insignificant whitespace.
+    """
+    return json.dumps(to_spec(transformer), sort_keys=True, separators=(',', ':'))
+
+def loads(data: str) -> ImageTransformer:
+    """
+    Rebuild a transformer from a JSON spec string.
+
+    Args:
+        data (str): A string produced by `dumps` (or any JSON spec).
+
+    Returns:
+        ImageTransformer: The rebuilt transformer.
+    """
+    return from_spec(json.loads(data))
+
+def function_ref(fn: Callable) -> str:
+    """
+    Return the 'module:qualname' import path of a module-level function.
+
+    Args:
+        fn (Callable): The function to reference.
+
+    Returns:
+        str: The import path.
+
+    Raises:
+        ValueError: If the function is a lambda or a nested function.
+    """
+    qualname = getattr(fn, '__qualname__', None)
+    module = getattr(fn, '__module__', None)
+    if not qualname or not module or '<' in qualname:
+        raise ValueError(f"{fn!r} cannot be serialised; use a module-level function instead.")
+    return f"{module}:{qualname}"
+
+def function_refs(spec: Any) -> List[str]:
+    """
+    List the import paths a spec would import when it is rebuilt.
+
+    These are the refs of 'function' transformers and the `fn` of `concat_map` operators,
+    at any depth (in pipelines and fused operators alike).
+
+    Args:
+        spec (Any): A spec, as produced by `to_spec` or received from elsewhere.
+
+    Returns:
+        List[str]: The referenced 'module:qualname' paths, in spec order.
+    """
+    refs: List[str] = []
+    if isinstance(spec, dict):
+        if spec.get('op') == 'function':
+            refs.append(spec.get('ref'))
+        elif spec.get('op') == 'concat_map' and isinstance(spec.get('fn'), str):
+            refs.append(spec['fn'])
+        for value in spec.values():
+            refs.extend(function_refs(value))
+    elif isinstance(spec, list):
+        for value in spec:
+            refs.extend(function_refs(value))
+    return refs
+
+def resolve_ref(ref: str) -> Callable:
+    """
+    Import the object referenced by a 'module:qualname' path.
+
+    Args:
+        ref (str): The import path.
+
+    Returns:
+        Callable: The referenced object.
+    """
+    module_name, _, qualname = ref.partition(':')
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
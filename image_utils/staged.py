@@ -0,0 +1,217 @@
+import contextvars
+import queue
+import threading
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .core.image_transformer import ImageTransformer
+from .frames import is_animated, iter_frames, save_frames, saves_frames
+from .image_io import format_for_path, is_passthrough, open_image, reduce_for, reencodes, save_image
+
+DEFAULT_IO_THREADS = 2
+
+# Marks the end of the input on a stage queue
+_DONE = object()
+
+# How often blocked threads check whether the run was abandoned, in seconds
+_POLL_INTERVAL = 0.1
+
+Result = Tuple[str, Optional[str], Optional[Exception]]
+
+class _Item:
+    """A file travelling through the stages, with the value produced by the last stage."""
+    __slots__ = ('index', 'input_path', 'output_path', 'data', 'image', 'value', 'transformer', 'error')
+
+    def __init__(self, index: int, input_path: str, output_path: str):
+        self.index = index
+        self.input_path = input_path
+        self.output_path = output_path
+        self.data: Optional[bytes] = None
+        self.image = None
+        self.value: Any = None
+        self.transformer: Optional[ImageTransformer] = None
+        self.error: Optional[Exception] = None
+
+class _Stage:
+    """A pool of threads applying one step to the items of a queue and passing them on."""
+
+    def __init__(self, name: str, step: Callable[[_Item], None], threads: int,
+                 source: 'queue.Queue', target: 'queue.Queue', stop: threading.Event):
+        self.step = step
+        self.source = source
+        self.target = target
+        self.stop = stop
+        self._running = threads
+        self._lock = threading.Lock()
+        # Every thread runs in a copy of the creating context, so e.g. an active profiler
+        # records the work of the stages
+        self.threads = [threading.Thread(target=contextvars.copy_context().run, args=(self._work,),
+                                         name=f'image-utils-{name}-{i}', daemon=True)
+                        for i in range(threads)]
+
+    def start(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            item = _get(self.source, self.stop)
+            if item is _DONE or item is None:
+                break
+            if item.error is None:
+                try:
+                    self.step(item)
+                except Exception as e:
+                    item.error = e
+                    item.data = item.image = item.value = item.transformer = None
+            if not _put(self.target, item, self.stop):
+                return
+        # Let the sibling threads see the end too; the last one passes it downstream
+        _put(self.source, _DONE, self.stop)
+        with self._lock:
+            self._running -= 1
+            last = not self._running
+        if last:
+            _put(self.target, _DONE, self.stop)
+
+def _get(source: 'queue.Queue', stop: threading.Event) -> Any:
+    """Take the next item of a queue, or return None once the run is abandoned."""
+    while not stop.is_set():
+        try:
+            return source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return None
+
+def _put(target: 'queue.Queue', item: Any, stop: threading.Event) -> bool:
+    """Put an item on a queue, waiting for room; return False once the run is abandoned."""
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def run_staged(transformer: ImageTransformer, targets: Iterable[Tuple[str, str]], threads: int = 4,
+               io_threads: int = DEFAULT_IO_THREADS, queue_depth: Optional[int] = None,
+               opaque: bool = False, draft: bool = False, format: Optional[str] = None,
+               encoder: Optional[Dict[str, Any]] = None) -> Iterator[Result]:
+    """
+    Process (input path, output path) pairs in overlapping thread stages.
+
+    Each file goes through five stages: read (the file bytes), decode, transform, encode and
+    write. Every stage has its own threads and hands its items to the next one through a
+    bounded queue, so reading and writing files overlap with the pixel work of other files,
+    and at most about `queue_depth` items wait between two stages. Pillow releases the GIL
+    while decoding, encoding and in most operators, so the CPU stages run in parallel without
+    the pickling of a process pool; the transformer must therefore be safe to call from
+    several threads at once (all the built-in operators are).
+
+    Files are processed exactly as by `batch.process_file`: the output format follows
+    `format`, the output extension or the input format, unchanged images are written as a
+    copy of their input bytes, and animated inputs are transformed frame by frame when the
+    output format can hold several frames. Failures are reported per file.
+
+    Args:
+        transformer (ImageTransformer): The transformer (usually a Pipeline) to apply.
+        targets (Iterable[Tuple[str, str]]): The input and output path of each file.
+        threads (int): Threads of each CPU stage (decode, transform and encode). Default is 4.
+        io_threads (int): Threads of the read and write stages. Default is 2.
+        queue_depth (Optional[int]): Capacity of the queues between stages. Defaults to
+                                     `2 * threads`.
+        opaque (bool): Convert the output images to an opaque format. Default is False.
+        draft (bool): Decode at a reduced scale ahead of a leading downscale. Default is False.
+        format (Optional[str]): The output format, instead of the one of the output extension.
+        encoder (Optional[Dict[str, Any]]): Encoder settings (see `image_io.encoder_params`).
+
+    Yields:
+        Tuple[str, Optional[str], Optional[Exception]]: The input path, the output path
+        (None on failure) and the error raised (None on success), in input order.
+    """
+    depth = queue_depth or 2 * threads
+
+    def read(item: _Item) -> None:
+        with open(item.input_path, 'rb') as f:
+            item.data = f.read()
+
+    def output_format(item: _Item) -> Optional[str]:
+        return format or format_for_path(item.output_path, item.image.format)
+
+    def animated(item: _Item) -> bool:
+        return is_animated(item.image) and saves_frames(output_format(item))
+
+    def decode(item: _Item) -> None:
+        image = open_image(BytesIO(item.data))
+        item.image = image
+        if draft and not animated(item):
+            source, item.transformer = reduce_for(image, transformer)
+        else:
+            source, item.transformer = image, transformer
+        source.load()
+        item.value = source
+
+    def transform(item: _Item) -> None:
+        if animated(item):
+            # The frames are decoded here, one at a time
+            item.value = list(iter_frames(transformer, item.image))
+        else:
+            item.value = item.transformer(item.value)
+
+    def encode(item: _Item) -> None:
+        image, output_image = item.image, item.value
+        if isinstance(output_image, list):
+            buffer = BytesIO()
+            save_frames(output_image, buffer, format=output_format(item), opaque=opaque, encoder=encoder,
+                        loop=image.info.get('loop'))
+            item.data = buffer.getvalue()
+        elif not (not reencodes(encoder) and is_passthrough(image, output_image, output_format(item), opaque)):
+            buffer = BytesIO()
+            save_image(output_image, buffer, format=output_format(item), opaque=opaque, encoder=encoder)
+            item.data = buffer.getvalue()
+        item.image = item.value = item.transformer = None
+
+    def write(item: _Item) -> None:
+        with open(item.output_path, 'wb') as f:
+            f.write(item.data)
+        item.data = None
+
+    steps = [('read', read, io_threads), ('decode', decode, threads), ('transform', transform, threads),
+             ('encode', encode, threads), ('write', write, io_threads)]
+    stop = threading.Event()
+    queues: List['queue.Queue'] = [queue.Queue(maxsize=depth) for _ in range(len(steps))]
+    # The results are small, so the last queue is unbounded and never blocks the writers
+    queues.append(queue.Queue())
+    stages = [_Stage(name, step, count, queues[i], queues[i + 1], stop)
+              for i, (name, step, count) in enumerate(steps)]
+    feeder = threading.Thread(target=_feed, args=(targets, queues[0], stop),
+                              name='image-utils-feed', daemon=True)
+    for stage in stages:
+        stage.start()
+    feeder.start()
+
+    try:
+        # Reorder the finished items into input order
+        finished: Dict[int, _Item] = {}
+        next_index = 0
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            finished[item.index] = item
+            while next_index in finished:
+                done = finished.pop(next_index)
+                next_index += 1
+                if done.error is None:
+                    yield done.input_path, done.output_path, None
+                else:
+                    yield done.input_path, None, done.error
+    finally:
+        # Stop the threads if the consumer gave up early
+        stop.set()
+
+def _feed(targets: Iterable[Tuple[str, str]], first: 'queue.Queue', stop: threading.Event) -> None:
+    """Put the files on the first queue, then the end marker."""
+    for index, (input_path, output_path) in enumerate(targets):
+        if not _put(first, _Item(index, input_path, output_path), stop):
+            return
+    _put(first, _DONE, stop)
@@ -0,0 +1,476 @@
+import contextvars
+import math
+import os
+import struct
+import zlib
+from concurrent.futures import Executor, ThreadPoolExecutor
+from PIL import Image, ImageChops
+from typing import BinaryIO, List, Optional, Sequence, Tuple, Union
+from .core.image_transformer import ImageTransformer
+from .operators.convert_operator import ConvertOperator
+from .operators.crop_operator import CropOperator
+from .operators.expand_operator import ExpandOperator
+from .operators.flip_operator import FlipOperator
+from .operators.gray_scale_operator import GrayScaleOperator
+from .operators.resize_operator import ResizeOperator
+from .operators.roll_operator import RollOperator
+from .core.color import color_for_mode
+from .optimizer import flatten
+from .profiling import active_profiler, call, transformer_name
+
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024
+
+# zlib level of streamed PNG output, PIL's default for PNG
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Bands are never thinner than this, so the resize overlap stays small next to the band
+_MIN_BAND_ROWS = 64
+
+# Filter support radius (in source pixels at scale 1) of PIL's resize filters
+_RESIZE_SUPPORT = {
+    'nearest': 0.5,
+    'box': 0.5,
+    'bilinear': 1.0,
+    'hamming': 1.0,
+    'bicubic': 2.0,
+    'lanczos': 3.0,
+}
+
+class StripStats:
+    """
+    Memory statistics of a strip-based run.
+
+    Attributes:
+        strip_height (int): Number of output rows rendered per strip.
+        strips (int): Number of strips rendered.
+        peak_strip_bytes (int): Largest amount of pixel memory allocated for a single strip,
+                                summed over all pipeline stages.
+        peak_rss (Optional[int]): Peak resident set size of the process in bytes, if available.
+    """
+
+    def __init__(self, strip_height: int, strips: int, peak_strip_bytes: int,
+                 peak_rss: Optional[int]):
+        self.strip_height = strip_height
+        self.strips = strips
+        self.peak_strip_bytes = peak_strip_bytes
+        self.peak_rss = peak_rss
+
+    def __repr__(self) -> str:
+        return (f"StripStats(strip_height={self.strip_height}, strips={self.strips}, "
+                f"peak_strip_bytes={self.peak_strip_bytes}, peak_rss={self.peak_rss})")
+
+class _Stage:
+    """A pipeline stage that renders a horizontal strip of its output on demand."""
+    size: Tuple[int, int]
+    mode: str
+
+    def __init__(self, upstream: Optional['_Stage'], counter: List[int]):
+        self.upstream = upstream
+        self.counter = counter
+
+    def render(self, y0: int, y1: int) -> Image.Image:
+        """Return output rows [y0, y1) of this stage."""
+        strip = self._render(y0, y1)
+        self.counter[0] += _image_bytes(strip)
+        return strip
+
+    def _render(self, y0: int, y1: int) -> Image.Image:
+        raise NotImplementedError("Subclasses must implement this method.")
+
+class _SourceStage(_Stage):
+    def __init__(self, image: Image.Image, counter: List[int]):
+        super().__init__(None, counter)
+        self.image = image
+        self.size = image.size
+        self.mode = image.mode
+
+    def _render(self, y0, y1):
+        return self.image.crop((0, y0, self.size[0], y1))
+
+class _CropStage(_Stage):
+    def __init__(self, upstream, counter, operator: CropOperator):
+        super().__init__(upstream, counter)
+        self.box = operator.box(upstream.size)
+        left, top, right, bottom = self.box
+        self.size = (right - left, bottom - top)
+        self.mode = upstream.mode
+
+    def _render(self, y0, y1):
+        left, top, right, _ = self.box
+        strip = self.upstream.render(top + y0, top + y1)
+        if (left, right) == (0, self.upstream.size[0]):
+            return strip
+        return strip.crop((left, 0, right, y1 - y0))
+
+class _FlipStage(_Stage):
+    def __init__(self, upstream, counter, operator: FlipOperator):
+        super().__init__(upstream, counter)
+        self.operator = operator
+        self.size = upstream.size
+        self.mode = upstream.mode
+
+    def _render(self, y0, y1):
+        if self.operator.direction == 'h':
+            return self.operator(self.upstream.render(y0, y1))
+        height = self.size[1]
+        return self.upstream.render(height - y1, height - y0).transpose(Image.FLIP_TOP_BOTTOM)
+
+class _RollStage(_Stage):
+    def __init__(self, upstream, counter, operator: RollOperator):
+        super().__init__(upstream, counter)
+        self.size = upstream.size
+        self.mode = upstream.mode
+        self.dx, self.dy = operator.offset(upstream.size)
+
+    def _render(self, y0, y1):
+        width, height = self.size
+        if not self.dy:
+            strip = self.upstream.render(y0, y1)
+        else:
+            strip = Image.new(self.mode, (width, y1 - y0))
+            y = y0
+            while y < y1:
+                # Copy the longest run of source rows that does not wrap around
+                source = (y - self.dy) % height
+                rows = min(y1 - y, height - source)
+                strip.paste(self.upstream.render(source, source + rows), (0, y - y0))
+                y += rows
+        # Horizontal shifts work row by row
+        return ImageChops.offset(strip, self.dx, 0) if self.dx else strip
+
+class _ExpandStage(_Stage):
+    def __init__(self, upstream, counter, operator: ExpandOperator):
+        super().__init__(upstream, counter)
+        self.size, self.position = operator.layout(upstream.size)
+        self.mode = operator.canvas_mode(upstream.mode)
+        self.passthrough = self.size == upstream.size and upstream.mode == self.mode
+        pos = operator.fill_position(upstream.size)
+        if pos:
+            x, y = pos
+            self.fill_color = upstream.render(y, y + 1).convert(self.mode).getpixel((x, 0))
+        else:
+            self.fill_color = color_for_mode(operator.fill_color(), self.mode)
+
+    def _render(self, y0, y1):
+        if self.passthrough:
+            return self.upstream.render(y0, y1)
+        paste_x, paste_y = self.position
+        strip = Image.new(self.mode, (self.size[0], y1 - y0), self.fill_color)
+        top = max(y0, paste_y)
+        bottom = min(y1, paste_y + self.upstream.size[1])
+        if top < bottom:
+            strip.paste(self.upstream.render(top - paste_y, bottom - paste_y), (paste_x, top - y0))
+        return strip
+
+class _PixelStage(_Stage):
+    """A stage for operators that map each pixel on its own (gray scale, mode conversion)."""
+
+    def __init__(self, upstream, counter, operator: Union[ConvertOperator, GrayScaleOperator]):
+        super().__init__(upstream, counter)
+        self.operator = operator
+        self.size = upstream.size
+        self.mode = operator(Image.new(upstream.mode, (1, 1))).mode
+
+    def _render(self, y0, y1):
+        return self.operator(self.upstream.render(y0, y1))
+
+class _ResizeStage(_Stage):
+    def __init__(self, upstream, counter, operator: ResizeOperator):
+        super().__init__(upstream, counter)
+        self.operator = operator
+        self.size = operator.target_size(upstream.size)
+        self.mode = upstream.mode
+        self.box = operator.source_box(upstream.size) or (0, 0) + upstream.size
+        self.scale = (self.box[3] - self.box[1]) / self.size[1]
+        # Source rows needed on each side of a strip for the filter to see the same pixels;
+        # with a reducing gap, also enough rows for the reduction blocks at the strip edges
+        scale = max(self.scale, 1.0)
+        self.margin = _RESIZE_SUPPORT[operator.resample] * scale + 1
+        if operator.reducing_gap:
+            self.margin += scale
+
+    def _render(self, y0, y1):
+        width, height = self.upstream.size
+        if self.size == (width, height) and self.box == (0, 0, width, height):
+            return self.upstream.render(y0, y1)
+        left, top, right, bottom = self.box
+        source_top = top + y0 * self.scale
+        source_bottom = min(top + y1 * self.scale, bottom)
+        first = max(0, math.floor(source_top - self.margin))
+        last = min(height, math.ceil(source_bottom + self.margin))
+        strip = self.upstream.render(first, last)
+        return self.operator.resize_to(strip, (self.size[0], y1 - y0),
+                                       (left, source_top - first, right, source_bottom - first))
+
+_STAGES = {
+    ConvertOperator: _PixelStage,
+    CropOperator: _CropStage,
+    ExpandOperator: _ExpandStage,
+    FlipOperator: _FlipStage,
+    GrayScaleOperator: _PixelStage,
+    ResizeOperator: _ResizeStage,
+    RollOperator: _RollStage,
+}
+
+def supports_strips(transformer: ImageTransformer) -> bool:
+    """
+    Tell whether every operator of the transformer can be executed in strips.
+
+    Args:
+        transformer (ImageTransformer): A pipeline or a single transformer.
+
+    Returns:
+        bool: True if `run_in_strips` can execute the transformer.
+    """
+    return all(type(operator) in _STAGES for operator in flatten(transformer, expand_fused=True))
+
+def run_in_strips(transformer: ImageTransformer, image: Image.Image, fp: Optional[BinaryIO] = None,
+                  max_memory: int = DEFAULT_MAX_MEMORY,
+                  opaque: bool = False,
+                  compress_level: int = DEFAULT_COMPRESS_LEVEL) -> Tuple[Optional[Image.Image], StripStats]:
+    """
+    Apply a transformer to an image one horizontal strip at a time, with bounded memory.
+
+    Each stage of the pipeline only materialises the rows needed for the current output strip,
+    so intermediate full-size canvases are never allocated. The output is either assembled into
+    a single image, or streamed to `fp` as PNG without ever holding the whole output in memory.
+
+    Crop, flip, roll, expand and gray scale are exact. Resize uses an overlap of the filter
+    support between strips; PIL computes the filter weights of a sub-box with slightly different
+    rounding, so resized pixels may differ from a single-pass resize by one or two levels. With
+    a reducing gap, the integer reduction blocks are aligned to each strip rather than to the
+    whole image, so the differences can be somewhat larger.
+
+    Args:
+        transformer (ImageTransformer): A pipeline of crop, flip, roll, expand, gray_scale and
+                                        resize operators.
+        image (Image.Image): The input image.
+        fp (Optional[BinaryIO]): If given, stream the output to this file object as PNG.
+        max_memory (int): Target pixel memory per strip, in bytes (excluding the input image).
+        opaque (bool): Drop the alpha channel of the output (RGBA to RGB, LA to L), like
+                       `save_image`. Default is False.
+        compress_level (int): zlib level (0-9) of the PNG streamed to `fp`. Default is 6.
+
+    Returns:
+        Tuple[Optional[Image.Image], StripStats]: The output image (None when streamed to `fp`)
+        and the memory statistics of the run. Output streamed to `fp` in a mode the PNG writer
+        cannot stream is converted strip by strip: palettes to RGB or RGBA, CMYK to RGB, and
+        other single-band modes ('1', 'I', 'F', ...) to L.
+
+    Raises:
+        ValueError: If the transformer contains an operator that cannot run in strips.
+    """
+    counter = [0]
+    stage: _Stage = _SourceStage(image, counter)
+    stages = [stage]
+    for operator in flatten(transformer, expand_fused=True):
+        if type(operator) not in _STAGES:
+            raise ValueError(f"{operator!r} cannot be executed in strips.")
+        stage = _STAGES[type(operator)](stage, counter, operator)
+        stages.append(stage)
+
+    width, height = stage.size
+    mode = stage.mode
+    if fp is not None and mode not in PngStripWriter._COLOR_TYPES:
+        mode = _streamable_mode(mode, image)
+    if opaque and mode in ('RGBA', 'LA'):
+        mode = mode[:-1]
+    strip_height = _strip_height(stages, max_memory)
+    if fp is not None:
+        writer = PngStripWriter(fp, (width, height), mode, compress_level)
+        output = None
+    else:
+        output = Image.new(mode, (width, height))
+
+    strips = peak = 0
+    for y0 in range(0, height, strip_height):
+        y1 = min(height, y0 + strip_height)
+        counter[0] = 0
+        strip = stage.render(y0, y1)
+        if strip.mode != mode:
+            strip = strip.convert(mode)
+        if output is None:
+            writer.write(strip)
+        else:
+            output.paste(strip, (0, y0))
+        strips += 1
+        peak = max(peak, counter[0])
+    if output is None:
+        writer.close()
+    return output, StripStats(strip_height, strips, peak, _peak_rss())
+
+def _streamable_mode(mode: str, image: Image.Image) -> str:
+    """Return the mode among L, LA, RGB and RGBA closest to a mode the PNG writer cannot stream."""
+    if mode in ('P', 'PA'):
+        return 'RGBA' if mode == 'PA' or 'transparency' in image.info else 'RGB'
+    return 'L' if Image.getmodebands(mode) == 1 else 'RGB'
+
+def run_in_bands(transformer: ImageTransformer, image: Image.Image, workers: Optional[int] = None,
+                 bands: Optional[int] = None) -> Image.Image:
+    """
+    Apply a transformer to one image, rendering horizontal bands of the output in parallel.
+
+    Every run of consecutive crop, flip, roll, expand, gray scale, convert and resize operators
+    is executed band by band on a pool of threads, with the same per-stage row mapping as
+    `run_in_strips`, and the bands are pasted into a preallocated output image. Pillow releases
+    the GIL while resampling, converting and copying pixels, so the bands run on several cores.
+    Other operators (e.g. rotate or trim) run on the whole image in between.
+
+    The result is identical to applying the transformer directly, except that resized pixels
+    may differ by a level or two at the band edges (see `run_in_strips`).
+
+    When profiling, the run is recorded as a 'Pipeline' span holding a span per whole-image
+    operator and per run of banded operators, with a nested span for each band.
+
+    Args:
+        transformer (ImageTransformer): A pipeline or a single transformer.
+        image (Image.Image): The input image.
+        workers (Optional[int]): Number of threads. Defaults to the CPU count.
+        bands (Optional[int]): Number of bands per run of operators. Defaults to `workers`;
+                               bands are at least 64 rows high.
+
+    Returns:
+        Image.Image: The transformed image.
+    """
+    workers = workers or os.cpu_count() or 1
+    bands = bands or workers
+    profiler = active_profiler()
+    if profiler is None:
+        return _run_bands(transformer, image, workers, bands)
+    with profiler.span('Pipeline', 'pipeline', image, workers=workers, bands=bands) as span:
+        result = _run_bands(transformer, image, workers, bands)
+        span.set_output(result)
+    return result
+
+def _run_bands(transformer: ImageTransformer, image: Image.Image, workers: int, bands: int) -> Image.Image:
+    """Apply the operators of a transformer, banding the runs of strip operators."""
+    profiler = active_profiler()
+    result = image
+    run: List[ImageTransformer] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-utils-band') as executor:
+        for operator in flatten(transformer, expand_fused=True):
+            if type(operator) in _STAGES:
+                run.append(operator)
+                continue
+            result = _render_bands(run, result, executor, bands)
+            result = call(profiler, operator, result) if profiler else operator(result)
+            run = []
+        return _render_bands(run, result, executor, bands)
+
+def _render_bands(operators: Sequence[ImageTransformer], image: Image.Image, executor: Executor,
+                  bands: int) -> Image.Image:
+    """Render the output of a run of strip operators band by band into a new image."""
+    if not operators:
+        return image
+    profiler = active_profiler()
+    if profiler is None:
+        return _render_run(operators, image, executor, bands)
+    name = ' + '.join(transformer_name(operator) for operator in operators)
+    with profiler.span(name, 'transform', image, bands=bands) as span:
+        result = _render_run(operators, image, executor, bands)
+        span.set_output(result)
+    return result
+
+def _render_run(operators: Sequence[ImageTransformer], image: Image.Image, executor: Executor,
+                bands: int) -> Image.Image:
+    """Render the bands of a run of strip operators on the executor and stitch them."""
+    # Decode once, before the bands read from the image concurrently
+    image.load()
+    counter = [0]
+    stage: _Stage = _SourceStage(image, counter)
+    for operator in operators:
+        stage = _STAGES[type(operator)](stage, counter, operator)
+    width, height = stage.size
+    output = Image.new(stage.mode, (width, height))
+    band_height = max(_MIN_BAND_ROWS, math.ceil(height / bands))
+
+    def render(y0: int) -> None:
+        y1 = min(height, y0 + band_height)
+        profiler = active_profiler()
+        if profiler is None:
+            output.paste(stage.render(y0, y1), (0, y0))
+            return
+        with profiler.span('band', 'transform', top=y0, bottom=y1):
+            output.paste(stage.render(y0, y1), (0, y0))
+
+    # Each band runs in a copy of the current context, so it sees the active profiler and
+    # nests its span in the current one
+    futures = [executor.submit(contextvars.copy_context().run, render, y0)
+               for y0 in range(0, height, band_height)]
+    # Wait for every band, re-raising the errors raised in one
+    for future in futures:
+        future.result()
+    return output
+
+class PngStripWriter:
+    """
+    A minimal streaming PNG encoder that writes rows as they are produced.
+
+    Rows are stored without PNG row filters, so files are usually larger than those written
+    by PIL, but only one strip is ever held in memory.
+
+    Attributes:
+        size (Tuple[int, int]): The (width, height) of the image being written.
+        mode (str): The image mode ('L', 'LA', 'RGB' or 'RGBA').
+    """
+    _COLOR_TYPES = {'L': 0, 'RGB': 2, 'LA': 4, 'RGBA': 6}
+
+    def __init__(self, fp: BinaryIO, size: Tuple[int, int], mode: str,
+                 compress_level: int = DEFAULT_COMPRESS_LEVEL):
+        if mode not in self._COLOR_TYPES:
+            raise ValueError(f"Mode '{mode}' cannot be streamed as PNG.")
+        self.fp = fp
+        self.size = size
+        self.mode = mode
+        self._compressor = zlib.compressobj(compress_level)
+        fp.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', size[0], size[1], 8,
+                                         self._COLOR_TYPES[mode], 0, 0, 0))
+
+    def write(self, strip: Image.Image) -> None:
+        """Append the rows of a strip to the image."""
+        data = strip.tobytes()
+        row_bytes = self.size[0] * len(self.mode)
+        # Prefix every row with filter type 0 (None)
+        rows = b''.join(b'\x00' + data[i:i + row_bytes] for i in range(0, len(data), row_bytes))
+        compressed = self._compressor.compress(rows)
+        if compressed:
+            self._chunk(b'IDAT', compressed)
+
+    def close(self) -> None:
+        """Write the remaining compressed data and the end of the image."""
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        self.fp.write(struct.pack('>I', len(data)) + kind + data
+                      + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+def _strip_height(stages: List[_Stage], max_memory: int) -> int:
+    """Choose the number of output rows per strip so that all stages fit in `max_memory`."""
+    width, height = stages[-1].size
+    if not height:
+        return 1
+    # Each stage holds about (its height / output height) rows per output row
+    row_bytes = sum(
+        stage.size[0] * _bytes_per_pixel(stage.mode) * max(1.0, stage.size[1] / height)
+        for stage in stages
+    )
+    return max(1, min(height, int(max_memory // row_bytes)))
+
+def _bytes_per_pixel(mode: str) -> int:
+    return 1 if mode in ('1', 'L', 'P') else 2 if mode in ('LA', 'I;16') else 4
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * _bytes_per_pixel(image.mode)
+
+def _peak_rss() -> Optional[int]:
+    """Return the peak resident set size of the process in bytes, if the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -14,6 +14,10 @@ setup(
         'Pillow',
         'click',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+        'bench': ['pytest-benchmark'],
+    },
     tests_require=['pytest'],
     test_suite='tests',
     entry_points={
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+import pytest
+from PIL import Image
+from image_utils.aio import AsyncRunner, read_source
+from image_utils.operators import flip, gray_scale, resize
+from image_utils.pipeline import pipe
+
+def _png(size=(40, 20), color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class _Reader:
+    """An async reader like aiohttp's StreamReader."""
+
+    def __init__(self, data):
+        self.data = data
+
+    async def read(self):
+        await asyncio.sleep(0)
+        return self.data
+
+def test_arun_sources(tmp_path):
+    path = tmp_path / 'input.png'
+    path.write_bytes(_png())
+    pipeline = pipe(resize(width=20), gray_scale())
+
+    async def main():
+        results = [await pipeline.arun(source)
+                   for source in (str(path), path, _png(), _Reader(_png()), Image.open(BytesIO(_png())))]
+        encoded = await pipeline.arun(_png(), format='JPEG', encoder={'quality': 50})
+        return results, encoded
+
+    results, encoded = asyncio.run(main())
+    for result in results:
+        assert result.size == (20, 10) and result.mode == 'L'
+    assert Image.open(BytesIO(encoded)).format == 'JPEG'
+
+def test_read_source_rejects_unknown():
+    with pytest.raises(TypeError):
+        asyncio.run(read_source(42))
+
+def test_arun_does_not_block_the_loop():
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(image):
+        started.set()
+        release.wait(5)
+        return image
+
+    async def main():
+        task = asyncio.ensure_future(pipe(slow).arun(_png()))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        # The loop keeps running while the worker is busy
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        release.set()
+        return await task
+
+    assert asyncio.run(main()).size == (40, 20)
+
+def test_max_pending_limits_admitted_requests():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def tracked(image):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+        return image
+
+    async def main():
+        async with AsyncRunner(workers=4, max_pending=2) as runner:
+            pipeline = pipe(tracked)
+            return await asyncio.gather(*(pipeline.arun(_png(), runner=runner) for _ in range(8)))
+
+    assert len(asyncio.run(main())) == 8
+    assert max(peak) <= 2
+
+def test_cancel_stops_before_next_transformer():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def first(image):
+        started.set()
+        release.wait(5)
+        return image
+
+    def second(image):
+        calls.append(image)
+        return image
+
+    async def main():
+        runner = AsyncRunner(workers=1)
+        task = asyncio.ensure_future(pipe(first, second).arun(_png(), runner=runner))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        release.set()
+        runner.close()
+
+    asyncio.run(main())
+    assert calls == []
+
+def test_amap_ordered_and_unordered():
+    sources = [_png((10 * (i + 1), 10)) for i in range(6)]
+    pipeline = pipe(flip('h'))
+
+    async def collect(ordered, sources):
+        async with AsyncRunner(workers=3, max_pending=2) as runner:
+            return [image.width async for image in pipeline.amap(sources, ordered=ordered, runner=runner)]
+
+    async def agen():
+        for source in sources:
+            yield source
+
+    assert asyncio.run(collect(True, sources)) == [10, 20, 30, 40, 50, 60]
+    assert sorted(asyncio.run(collect(False, agen()))) == [10, 20, 30, 40, 50, 60]
+
+def test_amap_pulls_sources_lazily():
+    pulled = []
+
+    def sources():
+        for i in range(100):
+            pulled.append(i)
+            yield _png()
+
+    async def main():
+        async with AsyncRunner(workers=2, max_pending=3) as runner:
+            results = pipe(flip('v')).amap(sources(), runner=runner)
+            first = await results.__anext__()
+            await results.aclose()
+            return first
+
+    assert asyncio.run(main()).size == (40, 20)
+    assert len(pulled) <= 4
+
+def test_amap_propagates_errors():
+    def fail(image):
+        raise RuntimeError('boom')
+
+    async def main():
+        return [result async for result in pipe(fail).amap([_png()])]
+
+    with pytest.raises(RuntimeError, match='boom'):
+        asyncio.run(main())
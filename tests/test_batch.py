@@ -0,0 +1,111 @@
+import os
+import pytest
+from click.testing import CliRunner
+from PIL import Image
+from image_utils.batch import collect_inputs, output_path, output_paths, run_batch
+from image_utils.cli import cli
+from image_utils.operators import resize
+from image_utils.pipeline import pipe
+
+def test_collect_inputs_filters_non_images(tmp_path):
+    for name in ('b.png', 'a.jpg', 'notes.txt'):
+        (tmp_path / name).write_bytes(b'')
+
+    assert collect_inputs(input_dir=str(tmp_path)) == [
+        str(tmp_path / 'a.jpg'), str(tmp_path / 'b.png')
+    ]
+
+def test_output_path_template():
+    path = output_path('/in/shot.png', '/out', '{stem}_{index}.jpg', index=3)
+
+    assert path == os.path.join('/out', 'shot_3.jpg')
+
+def _nested_inputs(tmp_path):
+    for folder in ('a', 'b'):
+        (tmp_path / 'in' / folder).mkdir(parents=True)
+        Image.new("RGB", (200, 100), "blue").save(tmp_path / 'in' / folder / 'shot.png')
+    return collect_inputs(input_glob=str(tmp_path / 'in' / '**' / '*.png'))
+
+def test_output_paths_reject_collisions(tmp_path):
+    inputs = _nested_inputs(tmp_path)
+
+    with pytest.raises(ValueError, match='both be written'):
+        output_paths(inputs, str(tmp_path / 'out'))
+    with pytest.raises(ValueError, match='overwrite the input'):
+        output_paths(inputs[:1], str(tmp_path / 'in' / 'a'))
+    assert [target for _, target in output_paths(inputs, str(tmp_path / 'out'), '{path}')] == [
+        os.path.join(str(tmp_path / 'out'), 'a', 'shot.png'), os.path.join(str(tmp_path / 'out'), 'b', 'shot.png')
+    ]
+
+def test_run_batch_keeps_relative_paths(tmp_path):
+    inputs = _nested_inputs(tmp_path)
+
+    results = list(run_batch(pipe(resize(width=50)), inputs, str(tmp_path / 'out'), template='{path}'))
+
+    assert all(error is None for _, _, error in results)
+    assert Image.open(tmp_path / 'out' / 'a' / 'shot.png').size == (50, 25)
+    assert Image.open(tmp_path / 'out' / 'b' / 'shot.png').size == (50, 25)
+
+def test_cli_rejects_colliding_outputs(tmp_path):
+    _nested_inputs(tmp_path)
+
+    result = CliRunner().invoke(cli, ['resize', '50x', '--input-glob', str(tmp_path / 'in' / '**' / '*.png'),
+                                      '--output-dir', str(tmp_path / 'out')])
+
+    assert result.exit_code == 2
+    assert '{index}' in result.output and '{path}' in result.output
+    assert not (tmp_path / 'out').exists()
+
+def test_run_batch(tmp_path):
+    Image.new("RGB", (200, 100), "blue").save(tmp_path / 'wide.png')
+    Image.new("RGB", (400, 200), "blue").save(tmp_path / 'large.png')
+    inputs = collect_inputs(input_dir=str(tmp_path))
+
+    results = list(run_batch(pipe(resize(width=50)), inputs, str(tmp_path / 'out')))
+
+    assert all(error is None for _, _, error in results)
+    assert Image.open(tmp_path / 'out' / 'wide.png').size == (50, 25)
+    assert Image.open(tmp_path / 'out' / 'large.png').size == (50, 25)
+
+def test_pipeline_map_in_order(tmp_path):
+    paths = []
+    for i, width in enumerate((200, 300, 400)):
+        path = str(tmp_path / f'{i}.png')
+        Image.new("RGB", (width, 100), "blue").save(path)
+        paths.append(path)
+
+    results = list(pipe(resize(50, 10)).map(paths, workers=2))
+
+    assert [image.size for image in results] == [(50, 10)] * 3
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_pipeline_map_pulls_sources_lazily(tmp_path, ordered):
+    path = str(tmp_path / 'in.png')
+    Image.new("RGB", (200, 100), "blue").save(path)
+    pulled = []
+
+    def sources():
+        while True:
+            pulled.append(path)
+            yield path
+
+    results = pipe(resize(50, 10)).map(sources(), workers=2, chunksize=2, ordered=ordered)
+    first = [next(results) for _ in range(3)]
+    results.close()
+
+    assert [image.size for image in first] == [(50, 10)] * 3
+    # At most 2 * workers chunks are in flight, topped up once a chunk is yielded
+    assert len(pulled) <= 2 * 2 * 2 + 2
+
+def test_run_batch_with_format_and_encoder(tmp_path):
+    Image.new("RGB", (200, 100), "blue").save(tmp_path / 'wide.png')
+    inputs = collect_inputs(input_dir=str(tmp_path))
+
+    results = list(run_batch(pipe(resize(width=50)), inputs, str(tmp_path / 'out'), template='{stem}.out',
+                             format='JPEG', encoder={'quality': 50}))
+    # Unchanged images are re-encoded when encoder settings are given
+    unchanged = list(run_batch(pipe(), inputs, str(tmp_path / 'copy'), encoder={'compress_level': 0}))
+
+    assert all(error is None for _, _, error in results + unchanged)
+    assert Image.open(tmp_path / 'out' / 'wide.out').format == 'JPEG'
+    assert os.path.getsize(tmp_path / 'copy' / 'wide.png') > os.path.getsize(tmp_path / 'wide.png')
@@ -0,0 +1,62 @@
+import json
+from click.testing import CliRunner
+import pytest
+from image_utils import bench
+from image_utils.bench import CASES, compare, dump_results, make_image, run_benchmarks
+from image_utils.cli import cli
+
+def test_make_image_has_margin():
+    image = make_image(64, 'RGBA')
+    assert image.size == (64, 64)
+    assert image.getbbox() == (4, 4, 60, 60)
+
+def test_run_benchmarks_covers_matrix():
+    results = run_benchmarks(cases=['crop', 'pipeline_thumbnail', 'encode', 'decode'], sizes=[32],
+                             modes=['RGB', 'RGBA'], formats=['PNG', 'JPEG'], min_time=0)
+    keys = [result.key() for result in results]
+    assert 'crop/32/RGB' in keys
+    assert 'decode/32/RGB/JPEG' in keys
+    # JPEG cannot store alpha, so those cases are skipped
+    assert 'encode/32/RGBA/JPEG' not in keys
+    assert 'encode/32/RGBA/PNG' in keys
+    for result in results:
+        assert result.iterations >= 3
+        assert result.ops_per_sec > 0 and result.mb_per_sec > 0
+
+def test_every_case_runs():
+    results = run_benchmarks(cases=list(CASES), sizes=[48], modes=['L'], formats=[], min_time=0)
+    assert [result.case for result in results] == list(CASES)
+
+def test_unknown_case():
+    with pytest.raises(ValueError):
+        run_benchmarks(cases=['sharpen'])
+
+def test_dump_and_compare():
+    results = run_benchmarks(cases=['flip'], sizes=[32], modes=['L'], min_time=0)
+    document = json.loads(dump_results(results))
+    assert document['environment']['pillow']
+    assert document['results'][0]['case'] == 'flip'
+    [(key, seconds, speedup)] = compare(results, document)
+    assert key == 'flip/32/L'
+    assert speedup == pytest.approx(1.0)
+
+def test_bench_command(tmp_path):
+    output = tmp_path / 'results.json'
+    args = ['bench', '-c', 'trim', '-s', '32', '-m', 'L', '--min-time', '0']
+    result = CliRunner().invoke(cli, args + ['-o', str(output)])
+    assert result.exit_code == 0, result.output
+    assert 'trim/32/L' in result.output
+
+    result = CliRunner().invoke(cli, args + ['--compare', str(output)])
+    assert result.exit_code == 0, result.output
+    assert 'Compared with' in result.output
+
+def test_bench_all_sizes(monkeypatch):
+    monkeypatch.setattr(bench, 'ALL_SIZES', (32, 48))
+    args = ['bench', '-c', 'trim', '-m', 'L', '--min-time', '0', '--all-sizes']
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert 'trim/32/L' in result.output and 'trim/48/L' in result.output
+
+    result = CliRunner().invoke(cli, args + ['-s', '32'])
+    assert result.exit_code == 2
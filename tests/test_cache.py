@@ -0,0 +1,43 @@
+import os
+from PIL import Image
+from image_utils.batch import run_batch
+from image_utils.cache import ResultCache, cache_key
+from image_utils.operators import concat_map, flip, resize
+from image_utils.pipeline import pipe
+
+def test_cache_key_depends_on_input_spec_format_and_options():
+    key = cache_key('abc', pipe(resize(width=50)), 'PNG', opaque=False)
+
+    assert key == cache_key('abc', pipe(resize(width=50)), 'PNG', opaque=False)
+    assert key != cache_key('abd', pipe(resize(width=50)), 'PNG', opaque=False)
+    assert key != cache_key('abc', pipe(resize(width=51)), 'PNG', opaque=False)
+    assert key != cache_key('abc', pipe(resize(width=50)), 'JPEG', opaque=False)
+    assert key != cache_key('abc', pipe(resize(width=50)), 'PNG', opaque=True)
+    assert cache_key('abc', pipe(concat_map(lambda image: flip('h'))), 'PNG') is None
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size=250)
+    cache.put('aa1', b'x' * 100)
+    cache.put('bb2', b'x' * 100)
+    os.utime(cache._path('aa1'), (0, 0))
+    os.utime(cache._path('bb2'), (1, 1))
+
+    assert cache.get('aa1') == b'x' * 100
+    cache.put('cc3', b'x' * 100)
+
+    assert cache.get('bb2') is None
+    assert cache.get('aa1') is not None and cache.get('cc3') is not None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (3, 1, 1)
+
+def test_run_batch_uses_cache(tmp_path):
+    Image.new("RGB", (200, 100), "blue").save(tmp_path / 'a.png')
+    Image.new("RGB", (200, 100), "red").save(tmp_path / 'b.png')
+    inputs = [str(tmp_path / 'a.png'), str(tmp_path / 'b.png')]
+    cache = ResultCache(str(tmp_path / 'cache'))
+
+    list(run_batch(pipe(resize(width=50)), inputs, str(tmp_path / 'out1'), cache=cache))
+    results = list(run_batch(pipe(resize(width=50)), inputs, str(tmp_path / 'out2'), cache=cache))
+
+    assert [error for _, _, error in results] == [None, None]
+    assert (cache.stats.hits, cache.stats.misses) == (2, 2)
+    assert (tmp_path / 'out2' / 'b.png').read_bytes() == (tmp_path / 'out1' / 'b.png').read_bytes()
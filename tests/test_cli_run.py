@@ -0,0 +1,70 @@
+import json
+from io import BytesIO
+from click.testing import CliRunner
+from PIL import Image
+from image_utils.cli import cli, split_steps
+from image_utils.operators import crop, expand, flip, resize
+from image_utils.pipeline import pipe
+from image_utils.spec import dumps
+
+def make_input(tmp_path):
+    path = str(tmp_path / 'input.png')
+    Image.effect_noise((60, 40), 60).convert('RGB').save(path)
+    return path
+
+def run(*args):
+    result = CliRunner().invoke(cli, ['run', *args])
+    return result, (Image.open(BytesIO(result.stdout_bytes)) if result.exit_code == 0 else None)
+
+def test_split_steps():
+    assert split_steps(['crop', '-l', '10', 'then', 'resize', '20x']) == [['crop', '-l', '10'], ['resize', '20x']]
+
+def test_run_chains_steps_in_one_pass(tmp_path):
+    path = make_input(tmp_path)
+
+    result, output = run('-i', path, 'crop', '-l', '10', 'then', 'resize', '25x',
+                         'then', 'expand', '30x30', '--fillwith', '#ffffff')
+
+    assert result.exit_code == 0, result.output
+    expected = pipe(crop(left=10), resize(width=25), expand(width=30, height=30, fillwith='#ffffff'))
+    assert output.tobytes() == expected(Image.open(path)).tobytes()
+
+def test_run_with_pipeline_spec(tmp_path):
+    path = make_input(tmp_path)
+    spec_path = tmp_path / 'pipeline.json'
+    spec_path.write_text(dumps(pipe(flip('h'), resize(width=20))))
+
+    from_file = run('-i', path, '--pipeline', str(spec_path), 'flip', 'v')[1]
+    from_string = run('-i', path, '--pipeline', json.dumps({'op': 'flip', 'direction': 'h'}))[1]
+
+    image = Image.open(path)
+    assert from_file.tobytes() == pipe(flip('h'), resize(width=20), flip('v'))(image).tobytes()
+    assert from_string.tobytes() == flip('h')(image).tobytes()
+
+def test_run_rejects_invalid_steps(tmp_path):
+    path = make_input(tmp_path)
+
+    for args in [[], ['bogus'], ['trim', 'then'], ['serve'], ['trim', 'then', 'flip', 'h', '--opaque'],
+                 ['--pipeline', '{"op": "nope"}']]:
+        result, _ = run('-i', path, *args)
+        assert result.exit_code == 2, args
+
+def test_run_keeps_zero_encoder_settings(tmp_path):
+    path = str(tmp_path / 'noise.png')
+    Image.effect_noise((200, 200), 60).convert('RGB').save(path)
+
+    default, _ = run('-i', path, 'flip', 'h')
+    uncompressed, _ = run('-i', path, '--compress-level', '0', 'flip', 'h')
+
+    assert default.exit_code == uncompressed.exit_code == 0
+    assert len(uncompressed.stdout_bytes) > len(default.stdout_bytes)
+
+def test_run_converts_modes_the_format_cannot_write(tmp_path):
+    rgba_path, palette_path = str(tmp_path / 'rgba.png'), str(tmp_path / 'palette.gif')
+    Image.new('RGBA', (20, 10), (255, 0, 0, 128)).save(rgba_path)
+    Image.new('P', (20, 10)).save(palette_path)
+
+    for path, expected in [(rgba_path, 'RGB'), (palette_path, 'RGB')]:
+        result, output = run('-i', path, '--format', 'jpeg', 'flip', 'h')
+        assert result.exit_code == 0, result.output
+        assert (output.format, output.mode) == ('JPEG', expected)
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a command actually needs them
+DEFERRED_MODULES = ('tkinter', 'PIL.Image', 'importlib.metadata', 'image_utils.operators.trim_operator',
+                    'image_utils.pipeline', 'image_utils.tiling', 'image_utils.batch')
+
+def import_times(*args):
+    # Map each imported module to its cumulative import time, from `python -X importtime`
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                            capture_output=True, text=True, env=env, cwd=ROOT)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return result, times
+
+def test_cli_import_defers_heavy_modules():
+    _, times = import_times('-c', 'import image_utils.cli')
+
+    assert 'image_utils.cli' in times
+    assert [module for module in DEFERRED_MODULES if module in times] == []
+
+def test_help_does_not_import_tkinter_or_pil():
+    result, times = import_times('-m', 'image_utils.cli', 'resize', '--help')
+
+    assert result.returncode == 0
+    assert 'tkinter' not in times
+    assert 'PIL.Image' not in times
+
+def test_specs_load_without_importing_operators_first():
+    code = ("from image_utils.spec import loads; "
+            "print(loads('{\"op\": \"pipe\", \"transformers\": [{\"op\": \"trim\"}, {\"op\": \"fused_geometry\", "
+            "\"operators\": [{\"op\": \"flip\", \"direction\": \"h\"}]}]}'))")
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, cwd=ROOT)
+
+    assert result.returncode == 0, result.stderr
+    assert 'TrimOperator' in result.stdout
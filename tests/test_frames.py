@@ -0,0 +1,95 @@
+import io
+import pytest
+from click.testing import CliRunner
+from PIL import Image, ImageSequence
+from image_utils.batch import run_batch
+from image_utils.cli import cli
+from image_utils.frames import is_animated, iter_frames, save_animation, saves_frames
+from image_utils.operators import flip, resize, trim
+from image_utils.pipeline import pipe
+
+DURATIONS = [100, 200, 300]
+
+def _frames():
+    # A red square moving right on a transparent canvas
+    frames = []
+    for i in range(len(DURATIONS)):
+        frame = Image.new('RGBA', (40, 30))
+        frame.paste((255, 0, 0, 255), (5 + 10 * i, 10, 15 + 10 * i, 20))
+        frames.append(frame)
+    return frames
+
+def _animation(format, path=None):
+    fp = path or io.BytesIO()
+    frames = _frames()
+    frames[0].save(fp, format=format, save_all=True, append_images=frames[1:], duration=DURATIONS, loop=0)
+    if path is None:
+        fp.seek(0)
+    return Image.open(fp)
+
+def _load(data):
+    return Image.open(io.BytesIO(data))
+
+@pytest.mark.parametrize('format', ['GIF', 'PNG', 'WEBP', 'TIFF'])
+def test_save_animation_round_trip(format):
+    image = _animation(format)
+    buffer = io.BytesIO()
+    save_animation(pipe(resize(width=20)), image, buffer)
+
+    output = _load(buffer.getvalue())
+    assert output.format == format
+    assert output.n_frames == 3
+    assert output.size == (20, 15)
+    if format != 'TIFF':
+        assert output.info.get('loop') == 0
+        durations = []
+        for frame in ImageSequence.Iterator(output):
+            frame.load()
+            durations.append(frame.info['duration'])
+        assert durations == DURATIONS
+
+def test_iter_frames_is_lazy():
+    image = _animation('PNG')
+    frames = iter_frames(pipe(flip('h')), image)
+    first = next(frames)
+    assert image.tell() == 0
+    assert first.size == (40, 30)
+    assert len(list(frames)) == 2
+
+def test_trim_uses_union_of_frame_boxes():
+    image = _animation('PNG')
+    frames = list(iter_frames(pipe(trim()), image))
+
+    # The square covers x 5..35 over the animation, and y 10..20 in every frame
+    assert [frame.size for frame in frames] == [(30, 10)] * 3
+    assert frames[0].getpixel((0, 0))[3] == 255
+    assert frames[2].getpixel((0, 0))[3] == 0
+
+def test_single_frame_formats_keep_first_frame(tmp_path):
+    _animation('GIF', str(tmp_path / 'in.gif'))
+    results = list(run_batch(pipe(flip('h')), [str(tmp_path / 'in.gif')], str(tmp_path / 'out'),
+                             template='{stem}.bmp'))
+    assert results[0][2] is None
+    output = Image.open(results[0][1])
+    assert not is_animated(output)
+    assert saves_frames('GIF') and not saves_frames('JPEG')
+
+@pytest.mark.parametrize('threads', [1, 2])
+@pytest.mark.parametrize('template', ['{name}', '{stem}.png'])
+def test_batch_keeps_frames(tmp_path, threads, template):
+    _animation('GIF', str(tmp_path / 'in.gif'))
+    results = list(run_batch(pipe(trim()), [str(tmp_path / 'in.gif')], str(tmp_path / 'out'),
+                             template=template, threads=threads))
+    assert results[0][2] is None
+    output = Image.open(results[0][1])
+    assert output.format == ('GIF' if template == '{name}' else 'PNG')
+    assert output.n_frames == 3
+    assert output.size == (30, 10)
+
+def test_cli_keeps_frames(tmp_path):
+    _animation('WEBP', str(tmp_path / 'in.webp'))
+    result = CliRunner().invoke(cli, ['flip', 'h', '-i', str(tmp_path / 'in.webp'), '--format', 'gif'])
+    assert result.exit_code == 0, result.output
+    output = _load(result.stdout_bytes)
+    assert output.format == 'GIF'
+    assert output.n_frames == 3
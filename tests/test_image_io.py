@@ -0,0 +1,107 @@
+from PIL import Image
+from io import BytesIO
+import pytest
+from image_utils.image_io import (encoder_params, extension_for_format, format_for_name, open_image,
+                                  reduce_for, reencodes, save_image)
+from image_utils.operators import crop, flip, resize
+from image_utils.pipeline import pipe
+
+def encode(image, format):
+    buffer = BytesIO()
+    image.save(buffer, format=format)
+    return BytesIO(buffer.getvalue())
+
+def test_reduce_for_drafts_jpeg():
+    image = open_image(encode(Image.new("RGB", (800, 600), "blue"), 'JPEG'))
+    pipeline = pipe(flip('h'), resize(width=100))
+
+    reduced, steps = reduce_for(image, pipeline)
+
+    assert reduced.size == (200, 150)
+    assert steps(reduced).size == (100, 75)
+
+def test_reduce_for_other_formats():
+    image = open_image(encode(Image.new("RGB", (800, 600), "blue"), 'PNG'))
+
+    reduced, _ = reduce_for(image, pipe(resize(width=100)))
+
+    assert reduced.size == (200, 150)
+
+def test_reduce_for_ignores_resize_after_crop():
+    image = open_image(encode(Image.new("RGB", (800, 600), "blue"), 'PNG'))
+
+    pipeline = pipe(crop(left=10), resize(width=100))
+
+    assert reduce_for(image, pipeline) == (image, pipeline)
+
+@pytest.mark.parametrize('format', ['JPEG', 'PNG'])
+@pytest.mark.parametrize('size', [(1000, 999), (1003, 601), (999, 1000)])
+@pytest.mark.parametrize('operator', [resize(width=100), resize(height=100), resize(100, 100, fit='contain')])
+def test_reduce_for_keeps_output_size(format, size, operator):
+    pipeline = pipe(operator)
+    expected = pipeline(Image.new("RGB", size)).size
+
+    reduced, steps = reduce_for(open_image(encode(Image.new("RGB", size, "blue"), format)), pipeline)
+
+    assert reduced.size != size
+    assert steps(reduced).size == expected
+
+def test_no_op_pipeline_returns_input_image():
+    image = open_image(encode(Image.new("RGB", (800, 600), "blue"), 'PNG'))
+    pipeline = pipe(resize(width=800), crop(right=1.0), resize(800, 600))
+
+    assert pipeline(image) is image
+
+def test_encoder_params_fast_preset():
+    assert encoder_params('PNG', {'fast': True}) == {'compress_level': 1}
+    assert encoder_params('PNG', {'fast': True, 'compress_level': 4}) == {'compress_level': 4}
+    assert encoder_params('JPEG', {'quality': 70, 'subsampling': None}) == {'quality': 70}
+    assert encoder_params('PNG', None) == {}
+    assert not reencodes({'fast': True}) and reencodes({'quality': 70})
+
+def test_format_names():
+    assert format_for_name('jpg') == 'JPEG'
+    assert format_for_name('png') == 'PNG'
+    assert format_for_name('IURAW') == 'IURAW'
+    assert extension_for_format('PNG') == '.png'
+    with pytest.raises(ValueError):
+        format_for_name('nope')
+
+def test_save_image_with_encoder_settings():
+    image = Image.effect_noise((64, 48), 60).convert("RGB")
+    default, low_quality, uncompressed = BytesIO(), BytesIO(), BytesIO()
+
+    save_image(image, default, 'JPEG')
+    save_image(image, low_quality, 'JPEG', encoder={'quality': 30})
+    save_image(image, uncompressed, 'PNG', encoder={'compress_level': 0})
+
+    assert len(low_quality.getvalue()) < len(default.getvalue())
+    assert Image.open(uncompressed).tobytes() == image.tobytes()
+
+@pytest.mark.parametrize("mode", ["1", "L", "LA", "RGB", "RGBA", "I", "F"])
+def test_raw_format_round_trip(mode):
+    image = Image.effect_noise((33, 17), 60).convert(mode)
+    buffer = BytesIO()
+
+    save_image(image, buffer, 'IURAW')
+    decoded = open_image(BytesIO(buffer.getvalue()))
+
+    assert buffer.getvalue().startswith(f"IURAW {mode} 33 17\n".encode())
+    assert (decoded.format, decoded.mode, decoded.size) == ('IURAW', mode, (33, 17))
+    assert decoded.tobytes() == image.tobytes()
+
+def test_raw_format_rejects_palettes():
+    with pytest.raises(OSError):
+        Image.new("P", (4, 4)).save(BytesIO(), 'IURAW')
+
+@pytest.mark.parametrize("mode, format, expected", [
+    ("RGBA", "JPEG", "RGB"), ("LA", "JPEG", "L"), ("P", "JPEG", "RGB"), ("P", "IURAW", "RGB"),
+    ("RGBA", "PPM", "RGB"), ("CMYK", "PNG", "RGB"), ("F", "PNG", "L"), ("P", "PNG", "P"),
+    ("RGBA", "WEBP", "RGBA"),
+])
+def test_save_image_converts_to_a_mode_the_format_can_write(mode, format, expected):
+    buffer = BytesIO()
+
+    save_image(Image.new(mode, (4, 4)), buffer, format)
+
+    assert Image.open(BytesIO(buffer.getvalue())).mode == expected
@@ -0,0 +1,26 @@
+from PIL import Image
+from image_utils.operators import convert, expand, gray_scale, roll, rotate
+from image_utils.pipeline import pipe
+from image_utils.spec import from_spec
+
+def test_grayscale_chain_stays_single_band():
+    # Create an in-memory grayscale image
+    original_image = Image.new("L", (40, 30), 200)
+    pipeline = pipe(gray_scale(), roll(5), expand(60, 40, fillwith="#FFFFFF"), rotate(10, fillwith="#000000"))
+
+    assert pipeline(original_image).mode == "L"
+
+def test_fill_color_promotes_mode_only_when_needed():
+    original_image = Image.new("L", (10, 10), 200)
+
+    assert expand(20, 20, fillwith="#FF0000")(original_image).mode == "RGB"
+    assert expand(20, 20)(original_image).mode == "LA"
+    assert expand(20, 20, fillwith="#FF000080")(original_image).mode == "RGBA"
+    assert gray_scale()(Image.new("RGBA", (4, 4))).mode == "LA"
+
+def test_pipeline_mode_converts_output():
+    pipeline = pipe(expand(20, 20), mode='RGB')
+
+    assert pipeline(Image.new("L", (10, 10))).mode == "RGB"
+    assert from_spec(pipeline.to_spec()).mode == 'RGB'
+    assert convert('RGB')(Image.new("RGB", (2, 2))).mode == "RGB"
@@ -0,0 +1,99 @@
+import random
+import pytest
+from PIL import Image
+from image_utils.operators import crop, expand, flip, gray_scale, resize, roll, trim
+from image_utils.pipeline import pipe
+
+np = pytest.importorskip('numpy')
+from image_utils.numpy_backend import run_stack, to_array, to_images
+
+def make_image(mode, size, seed):
+    # Noise with a random transparent margin, so trim finds a different box per image
+    noise = Image.effect_noise(size, 90).convert(mode)
+    rng = random.Random(seed)
+    image = Image.new(mode, size)
+    box = (rng.randint(0, 4), rng.randint(0, 4), size[0] - rng.randint(0, 4), size[1] - rng.randint(0, 4))
+    image.paste(noise.crop(box), box[:2])
+    return image
+
+def random_operator(rng):
+    kind = rng.choice(['crop', 'expand', 'expand_pos', 'flip', 'gray', 'resize', 'roll', 'trim'])
+    if kind == 'crop':
+        return crop(left=rng.randint(0, 3), top=rng.randint(0, 3), right=rng.uniform(0.7, 1.0))
+    if kind == 'expand':
+        return expand(width=60, height=60, fillwith=rng.choice(['#ff000080', '#00ff00']),
+                      align=rng.choice(['c', 'lt', 'rb']), dx=rng.randint(-3, 3))
+    if kind == 'expand_pos':
+        return expand(width=60, height=60, fillwithpos=(rng.randint(-2, 2), 0))
+    if kind == 'flip':
+        return flip(rng.choice('hv'))
+    if kind == 'gray':
+        return gray_scale()
+    if kind == 'resize':
+        return resize(width=rng.randint(10, 40))
+    if kind == 'roll':
+        return roll(shift=rng.randint(0, 7), direction=rng.choice('lrub'))
+    return rng.choice([trim(), trim(tolerance=40), trim(background='#000000', tolerance=30),
+                       trim(background='auto', tolerance=10)])
+
+@pytest.mark.parametrize('mode', ['RGBA', 'RGB', 'LA', 'L'])
+@pytest.mark.parametrize('seed', range(15))
+def test_run_stack_is_pixel_identical(mode, seed):
+    rng = random.Random(seed)
+    pipeline = pipe(*[random_operator(rng) for _ in range(rng.randint(1, 5))])
+    images = [make_image(mode, (40, 30), seed * 10 + i) for i in range(6)]
+    try:
+        expected_images = [pipeline(image) for image in images]
+    except TypeError:
+        # Unsupported by the operators themselves (e.g. sampling a fill color from LA)
+        with pytest.raises(TypeError):
+            run_stack(pipeline, images)
+        return
+
+    for expected, actual in zip(expected_images, run_stack(pipeline, images)):
+        assert actual.mode == expected.mode
+        assert actual.size == expected.size
+        assert actual.tobytes() == expected.tobytes()
+
+def test_run_stack_handles_mixed_sizes_and_blank_images():
+    pipeline = pipe(trim(), flip('h'))
+    images = [make_image('RGBA', (20, 20), 0), Image.new('RGBA', (20, 20)), make_image('RGB', (10, 30), 1)]
+
+    results = run_stack(pipeline, images)
+
+    assert [r.tobytes() for r in results] == [pipeline(i).tobytes() for i in images]
+
+def test_array_round_trip():
+    images = [make_image('RGB', (8, 6), i) for i in range(3)]
+
+    array = to_array(images)
+
+    assert array.shape == (3, 6, 8, 3)
+    assert [i.tobytes() for i in to_images(array)] == [i.tobytes() for i in images]
+    with pytest.raises(ValueError):
+        to_array([images[0], make_image('RGB', (6, 6), 0)])
+
+def test_arrays_flow_through_pipelines_and_operators():
+    image = make_image('RGBA', (40, 30), 3)
+    frame = np.asarray(image).copy()
+    pipeline = pipe(crop(2, 3, 30, 25), flip('h'), roll(4, 'u'), resize(20), gray_scale())
+
+    result = pipeline(frame)
+
+    assert isinstance(result, np.ndarray)
+    assert result.tobytes() == pipeline(image).tobytes()
+    assert flip('v')(frame).tobytes() == flip('v')(image).tobytes()
+
+def test_crop_flip_and_trim_return_views():
+    frame = np.asarray(make_image('RGB', (40, 30), 4)).copy()
+
+    result = pipe(crop(left=5, right=35), flip('h'), flip('v'), trim())(frame)
+
+    assert np.shares_memory(result, frame)
+
+def test_single_channel_arrays_stay_two_dimensional():
+    frame = np.asarray(make_image('L', (12, 10), 5)).copy()
+
+    assert crop(0, 0, 6, 6)(frame).shape == (6, 6)
+    with pytest.raises(ValueError):
+        flip('h')(frame.astype(np.float32))
@@ -0,0 +1,74 @@
+import random
+import pytest
+from PIL import Image, ImageChops
+from image_utils.operators import crop, flip, gray_scale, resize, roll, trim
+from image_utils.optimizer import FusedGeometryOperator
+from image_utils.pipeline import pipe
+
+def make_image(mode, size, seed):
+    # Noise with a transparent margin so trim has something to remove
+    noise = Image.effect_noise(size, 90).convert(mode)
+    rng = random.Random(seed)
+    image = Image.new(mode, size)
+    margin = rng.randint(0, min(size) // 4)
+    box = (margin, margin, size[0] - margin, size[1] - margin)
+    image.paste(noise.crop(box), box[:2])
+    return image
+
+def random_operator(rng):
+    kind = rng.choice(['crop_px', 'crop_ratio', 'flip', 'resize', 'roll', 'trim'])
+    if kind == 'crop_px':
+        return crop(left=rng.randint(0, 4), top=rng.randint(0, 4),
+                    right=rng.randint(6, 60), bottom=rng.randint(6, 60))
+    if kind == 'crop_ratio':
+        return crop(left=rng.uniform(0, 0.3), top=rng.uniform(0, 0.3),
+                    right=rng.uniform(0.6, 1.0), bottom=rng.uniform(0.6, 1.0))
+    if kind == 'flip':
+        return flip(rng.choice('hv'))
+    if kind == 'resize':
+        return resize(width=rng.randint(8, 48), height=rng.choice([None, rng.randint(8, 48)]))
+    if kind == 'roll':
+        return roll(shift=rng.randint(0, 7), direction=rng.choice('lrub'))
+    return trim()
+
+def assert_identical(expected, actual):
+    assert actual.mode == expected.mode
+    assert actual.size == expected.size
+    assert actual.tobytes() == expected.tobytes()
+
+@pytest.mark.parametrize('mode', ['RGBA', 'RGB', 'L'])
+@pytest.mark.parametrize('seed', range(40))
+def test_optimized_pipeline_is_pixel_identical(mode, seed):
+    rng = random.Random(seed)
+    operators = [random_operator(rng) for _ in range(rng.randint(2, 7))]
+    if rng.random() < 0.3:
+        operators.insert(rng.randrange(len(operators)), gray_scale())
+    pipeline = pipe(*operators)
+    image = make_image(mode, (rng.randint(10, 40), rng.randint(10, 40)), seed)
+
+    assert_identical(pipeline(image), pipeline.optimize()(image))
+
+def test_example_chain_is_fused_into_one_operator():
+    pipeline = pipe(crop(2, 2, 30, 30), crop(left=0.1), flip('h'), resize(16, 16), crop(0, 0, 8, 8))
+    image = make_image('RGBA', (40, 40), 0)
+
+    optimized = pipeline.optimize()
+
+    assert len(optimized.transformers) == 1
+    assert isinstance(optimized.transformers[0], FusedGeometryOperator)
+    assert_identical(pipeline(image), optimized(image))
+
+def test_double_flips_cancel():
+    pipeline = pipe(flip('h'), pipe(flip('h')), gray_scale())
+
+    assert pipeline.optimize().transformers == [gray_scale()]
+
+def test_fuse_resize_stays_close():
+    pipeline = pipe(resize(60, 50), crop(5, 7, 40, 33))
+    image = make_image('RGB', (97, 83), 1)
+
+    expected = pipeline(image)
+    actual = pipeline.optimize(fuse_resize=True)(image)
+
+    assert actual.size == expected.size
+    assert max(high for _, high in ImageChops.difference(expected, actual).getextrema()) <= 3
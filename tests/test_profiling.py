@@ -0,0 +1,100 @@
+import json
+from click.testing import CliRunner
+from PIL import Image
+from image_utils.cli import cli
+from image_utils.operators import concat_map, flip, gray_scale, resize, trim
+from image_utils.pipeline import pipe
+from image_utils.profiling import active_profiler, image_bytes, profile
+
+def _pick(image):
+    return flip('h') if image.width > image.height else flip('v')
+
+def test_profile_records_span_per_transformer():
+    image = Image.new('RGB', (80, 40), 'red')
+    pipeline = pipe(resize(width=40), gray_scale())
+    result, profiler = pipeline.profile(image)
+    assert result.size == (40, 20)
+    names = [span.name for span in sorted(profiler.spans, key=lambda span: span.start)]
+    assert names == ['Pipeline', 'ResizeOperator', 'GrayScaleOperator']
+    resize_span = next(span for span in profiler.spans if span.name == 'ResizeOperator')
+    assert resize_span.input == ((80, 40), 'RGB')
+    assert resize_span.output == ((40, 20), 'RGB')
+    assert resize_span.bytes_allocated == 40 * 20 * 3
+    assert resize_span.wall >= 0 and resize_span.cpu >= 0
+    assert resize_span.args['width'] == 40
+
+def test_nested_pipelines_and_concat_map_are_nested_spans():
+    image = Image.new('RGBA', (60, 30), (0, 0, 255, 255))
+    pipeline = pipe(trim(), pipe(flip('v')), concat_map(_pick), mode='RGB')
+    _, profiler = pipeline.profile(image)
+    spans = {span.id: span for span in profiler.spans}
+    by_name = {}
+    for span in profiler.spans:
+        by_name.setdefault(span.name, []).append(span)
+    outer, inner = sorted(by_name['Pipeline'], key=lambda span: span.start)
+    assert outer.parent is None
+    assert inner.parent == outer.id
+    assert by_name['TrimOperator'][0].parent == outer.id
+    # The flip chosen by concat_map is nested in the concat_map span
+    concat_span = by_name['ConcatMapOperator'][0]
+    chosen = [span for span in by_name['FlipOperator'] if span.parent == concat_span.id]
+    assert len(chosen) == 1 and chosen[0].args == {'direction': 'h'}
+    assert by_name['convert'][0].output == ((60, 30), 'RGB')
+    assert all(span.parent is None or span.parent in spans for span in profiler.spans)
+
+def test_profile_callback_and_deactivation():
+    seen = []
+    with profile(callback=seen.append) as profiler:
+        assert active_profiler() is profiler
+        pipe(flip('h'))(Image.new('L', (4, 4)))
+    assert active_profiler() is None
+    assert [span.name for span in seen] == ['FlipOperator', 'Pipeline']
+    # Pipelines run outside the block are not recorded
+    pipe(flip('h'))(Image.new('L', (4, 4)))
+    assert len(profiler.spans) == 2
+
+def test_chrome_trace_format():
+    _, profiler = pipe(flip('h')).profile(Image.new('RGB', (8, 8)))
+    trace = profiler.to_chrome_trace()
+    assert [event['name'] for event in trace['traceEvents']] == ['Pipeline', 'FlipOperator']
+    event = trace['traceEvents'][1]
+    assert event['ph'] == 'X' and event['dur'] >= 0
+    assert event['args']['output'] == {'width': 8, 'height': 8, 'mode': 'RGB'}
+    json.dumps(trace)
+
+def test_image_bytes():
+    assert image_bytes(Image.new('RGBA', (3, 2))) == 24
+    assert image_bytes(Image.new('I;16', (3, 2))) == 12
+    assert image_bytes(Image.new('F', (3, 2))) == 24
+
+def test_cli_profile(tmp_path):
+    input_path = tmp_path / 'input.png'
+    Image.new('RGB', (50, 40), 'green').save(input_path)
+    for format in ('json', 'chrome'):
+        profile_path = tmp_path / f'profile-{format}.json'
+        result = CliRunner().invoke(cli, ['run', '-i', str(input_path), '--profile', str(profile_path),
+                                          '--profile-format', format, 'resize', '20x', 'then', 'flip', 'h'])
+        assert result.exit_code == 0, result.output
+        document = json.loads(profile_path.read_text())
+        if format == 'json':
+            names = [span['name'] for span in document['spans']]
+        else:
+            names = [event['name'] for event in document['traceEvents']]
+        assert names[0] == 'decode' and names[-1] == 'encode'
+        assert 'ResizeOperator' in names and 'FlipOperator' in names
+
+def test_cli_profile_with_bands(tmp_path):
+    input_path, profile_path = tmp_path / 'input.png', tmp_path / 'profile.json'
+    Image.new('RGB', (400, 300), 'green').save(input_path)
+
+    result = CliRunner().invoke(cli, ['resize', '300x', '-i', str(input_path), '--threads', '2',
+                                      '--profile', str(profile_path)])
+
+    assert result.exit_code == 0, result.output
+    spans = json.loads(profile_path.read_text())['spans']
+    names = [span['name'] for span in spans]
+    assert names[:3] == ['decode', 'Pipeline', 'ResizeOperator'] and names[-1] == 'encode'
+    resize_span = spans[2]
+    bands = [span for span in spans if span['name'] == 'band']
+    assert len(bands) == 2
+    assert all(span['parent'] == resize_span['id'] for span in bands)
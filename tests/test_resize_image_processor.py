@@ -1,3 +1,4 @@
+import pytest
 from PIL import Image
 from io import BytesIO
 from image_utils.operators import resize
@@ -40,3 +41,63 @@ def test_resize_operator_height_only():
     resized_image = operator(Image.open(img_byte_arr))
 
     assert resized_image.size == (100, 50)
+
+def test_resize_operator_reused_across_images():
+    # A proportional resize must not keep the first image's aspect ratio
+    operator = resize(width=50)
+
+    wide_image = operator(Image.new("RGB", (200, 100), "blue"))
+    tall_image = operator(Image.new("RGB", (100, 200), "blue"))
+
+    assert wide_image.size == (50, 25)
+    assert tall_image.size == (50, 100)
+    assert operator.height is None
+
+def test_resize_operator_default_matches_plain_resize():
+    original_image = Image.effect_noise((120, 80), 60).convert("RGB")
+
+    resized_image = resize(50, 30)(original_image)
+
+    assert resized_image.tobytes() == original_image.resize((50, 30)).tobytes()
+
+def test_resize_operator_presets_and_overrides():
+    operator = resize(width=10, preset="fast", resample="lanczos")
+
+    assert operator.resample == "lanczos"
+    assert operator.reducing_gap == 2.0
+    assert resize(width=10, preset="best").resample == "lanczos"
+
+    original_image = Image.effect_noise((400, 300), 60).convert("RGB")
+    expected = original_image.resize((40, 30), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    assert resize(width=40, preset="fast")(original_image).tobytes() == expected.tobytes()
+
+def test_resize_operator_fit_modes():
+    original_image = Image.new("RGB", (200, 100), "blue")
+    original_image.paste("red", (0, 0, 50, 100))
+
+    assert resize(100, 100, fit="fill")(original_image).size == (100, 100)
+    assert resize(100, 100, fit="contain")(original_image).size == (100, 50)
+
+    covered_image = resize(100, 100, fit="cover")(original_image)
+    # The left quarter is cropped away around the center
+    assert covered_image.size == (100, 100)
+    assert covered_image.getpixel((0, 50)) == (0, 0, 255)
+
+def test_resize_operator_cover_same_aspect_returns_input():
+    original_image = Image.new("RGB", (100, 50), "blue")
+
+    assert resize(100, 50, fit="cover")(original_image) is original_image
+
+def test_resize_operator_cover_box_stays_inside_image():
+    # A scale that is not exact in floating point must not push the box past the edges
+    left, top, right, bottom = resize(900, 300, fit="cover").source_box((1750, 1750))
+
+    assert (left, right) == (0, 1750)
+    assert 0 < top < bottom < 1750
+    assert resize(900, 300, fit="cover")(Image.new("RGB", (1750, 1750))).size == (900, 300)
+
+@pytest.mark.parametrize("kwargs", [{"resample": "cubic"}, {"preset": "slow"},
+                                    {"fit": "stretch"}, {"reducing_gap": 0.5}])
+def test_resize_operator_rejects_invalid_options(kwargs):
+    with pytest.raises(ValueError):
+        resize(width=10, **kwargs)
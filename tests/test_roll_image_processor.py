@@ -0,0 +1,28 @@
+from PIL import Image
+from image_utils.operators import roll
+
+def make_image(mode):
+    # Create an in-memory image with distinct pixel values
+    return Image.linear_gradient("L").resize((40, 30)).convert(mode)
+
+def test_roll_operator_preserves_mode():
+    original_image = make_image("L")
+
+    rolled_image = roll(10, 'r')(original_image)
+
+    assert rolled_image.mode == "L"
+    assert rolled_image.getpixel((10, 5)) == original_image.getpixel((0, 5))
+    assert rolled_image.getpixel((0, 5)) == original_image.getpixel((30, 5))
+
+def test_roll_operator_wraps_large_shifts():
+    original_image = make_image("RGB")
+
+    assert roll(45, 'l')(original_image).tobytes() == roll(5, 'l')(original_image).tobytes()
+    assert roll(0, dx=40, dy=-30)(original_image) is original_image
+
+def test_roll_operator_2d_shift_matches_two_rolls():
+    original_image = make_image("RGBA")
+
+    combined = roll(dx=-7, dy=12)(original_image)
+
+    assert combined.tobytes() == roll(12, 'b')(roll(7, 'l')(original_image)).tobytes()
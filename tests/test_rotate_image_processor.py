@@ -0,0 +1,28 @@
+import pytest
+from PIL import Image
+from image_utils.operators import rotate
+
+def test_rotate_operator_multiple_of_90_is_lossless():
+    # Create an in-memory image with a gradient, so any resampling would show
+    original_image = Image.linear_gradient("L").resize((64, 32)).convert("RGBA")
+
+    rotated_image = rotate(90)(original_image)
+
+    assert rotated_image.size == (32, 64)
+    assert rotated_image.tobytes() == original_image.transpose(Image.ROTATE_90).tobytes()
+    assert rotate(-270)(original_image).tobytes() == rotated_image.tobytes()
+
+def test_rotate_operator_fills_corners():
+    # Create an in-memory RGB image
+    original_image = Image.new("RGB", (100, 100), "blue")
+
+    rotated_image = rotate(45, fillwith="#FF0000", resample='bicubic')(original_image)
+
+    assert rotated_image.mode == "RGB"
+    assert rotated_image.size[0] > 100
+    assert rotated_image.getpixel((0, 0)) == (255, 0, 0)
+    assert rotated_image.getpixel((rotated_image.width // 2, rotated_image.height // 2)) == (0, 0, 255)
+
+def test_rotate_operator_rejects_unknown_resample():
+    with pytest.raises(ValueError):
+        rotate(30, resample='lanczos')
@@ -0,0 +1,124 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import pytest
+from io import BytesIO
+from PIL import Image
+from image_utils.operators import flip, resize, trim
+from image_utils.pipeline import pipe
+from image_utils.server import Client, PipelineServer, ServerError, read_frame, write_frame
+from image_utils.spec import to_spec
+
+def encode(image, format='PNG'):
+    buffer = BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+def make_image():
+    image = Image.new('RGBA', (40, 30))
+    image.paste(Image.effect_noise((20, 10), 60).convert('RGBA'), (5, 8))
+    return image
+
+def request(spec, data, **options):
+    frames = BytesIO()
+    write_frame(frames, json.dumps({'spec': spec, **options}).encode('utf-8'))
+    write_frame(frames, data)
+    return frames.getvalue()
+
+def read_responses(data):
+    stream, responses = BytesIO(data), []
+    while True:
+        header = read_frame(stream)
+        if header is None:
+            return responses
+        responses.append((json.loads(header), read_frame(stream)))
+
+def test_serve_stream_answers_in_order():
+    pipelines = [pipe(trim(), flip('h')), pipe(resize(width=10)), pipe(flip('v'))]
+    image = make_image()
+    requests = b''.join(request(to_spec(p), encode(image)) for p in pipelines * 3)
+    output = BytesIO()
+
+    server = PipelineServer(workers=2)
+    server.serve_stream(BytesIO(requests), output)
+    server.close()
+
+    responses = read_responses(output.getvalue())
+    assert len(responses) == 9
+    for pipeline, (header, payload) in zip(pipelines * 3, responses):
+        assert header == {'ok': True, 'format': 'PNG'}
+        assert Image.open(BytesIO(payload)).tobytes() == pipeline(image).tobytes()
+
+def test_serve_stream_reports_errors_and_options():
+    requests = (request({'op': 'nope'}, encode(make_image()))
+                + request(to_spec(trim()), b'not an image')
+                + request(to_spec(trim()), encode(make_image()), format='JPEG', opaque=True, mode='L'))
+    output = BytesIO()
+
+    PipelineServer(workers=1).serve_stream(BytesIO(requests), output)
+
+    (first, _), (second, _), (third, payload) = read_responses(output.getvalue())
+    assert not first['ok'] and 'nope' in first['error']
+    assert not second['ok']
+    assert third == {'ok': True, 'format': 'JPEG'}
+    assert Image.open(BytesIO(payload)).mode == 'L'
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix domain sockets are not available')
+def test_unix_socket_client():
+    path = os.path.join(tempfile.mkdtemp(), 'image-utils.sock')
+    server = PipelineServer(workers=2)
+    threading.Thread(target=server.serve_unix, args=(path,), daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.01)
+
+    image = make_image()
+    pipeline = pipe(trim(), resize(width=8))
+    with Client(path) as client:
+        for _ in range(3):
+            output = client.process(pipeline, encode(image))
+            assert Image.open(BytesIO(output)).tobytes() == pipeline(image).tobytes()
+        # Unchanged images are sent back as-is
+        assert client.process(pipe(), encode(image)) == encode(image)
+        with pytest.raises(ServerError):
+            client.process(trim(), b'garbage')
+
+def mirror(image):
+    return image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+
+def test_serve_stream_rejects_functions_not_allowed():
+    specs = [{'op': 'function', 'ref': 'builtins:print'},
+             {'op': 'pipe', 'transformers': [{'op': 'concat_map', 'fn': 'os:system'}]},
+             {'op': 'function', 'ref': 'tests.test_server:mirror'}]
+    image = make_image()
+    requests = b''.join(request(spec, encode(image)) for spec in specs)
+    output = BytesIO()
+
+    PipelineServer(workers=1, allowed_functions=['tests.test_server:mirror']).serve_stream(BytesIO(requests), output)
+
+    (first, _), (second, _), (third, payload) = read_responses(output.getvalue())
+    assert not first['ok'] and 'builtins:print' in first['error']
+    assert not second['ok'] and 'os:system' in second['error']
+    assert third['ok']
+    assert Image.open(BytesIO(payload)).tobytes() == mirror(image).tobytes()
+
+def test_serve_stream_keeps_frames():
+    frames = [Image.new('RGB', (20, 10), color) for color in ('red', 'green', 'blue')]
+    buffer = BytesIO()
+    frames[0].save(buffer, format='GIF', save_all=True, append_images=frames[1:], duration=100, loop=0)
+    requests = request(to_spec(resize(width=10)), buffer.getvalue()) + \
+        request(to_spec(resize(width=10)), buffer.getvalue(), format='JPEG')
+    output = BytesIO()
+
+    PipelineServer(workers=1).serve_stream(BytesIO(requests), output)
+
+    (animated, animated_payload), (still, still_payload) = read_responses(output.getvalue())
+    assert animated == {'ok': True, 'format': 'GIF'}
+    assert Image.open(BytesIO(animated_payload)).n_frames == 3
+    assert Image.open(BytesIO(animated_payload)).size == (10, 5)
+    assert still == {'ok': True, 'format': 'JPEG'}
+    assert getattr(Image.open(BytesIO(still_payload)), 'n_frames', 1) == 1
@@ -0,0 +1,54 @@
+import pickle
+import pytest
+from PIL import Image
+from image_utils import spec
+from image_utils.operators import concat_map, crop, expand, flip, gray_scale, resize, roll, rotate, trim
+from image_utils.pipeline import pipe
+
+def choose_resize(image):
+    return resize(width=10) if image.width >= image.height else resize(height=10)
+
+def build_pipeline():
+    return pipe(
+        crop(left=0.1, top=2, right=1.0, bottom=0.9),
+        concat_map(choose_resize),
+        expand(width=20, height=20, fillwithpos=(0, 0)),
+        roll(shift=3, direction='l'),
+        flip('h'),
+        rotate(angle=15, fillwith='#FFFFFF'),
+        gray_scale(),
+        pipe(trim())
+    )
+
+def test_spec_round_trip():
+    pipeline = build_pipeline()
+
+    rebuilt = spec.loads(spec.dumps(pipeline))
+
+    assert spec.dumps(rebuilt) == spec.dumps(pipeline)
+    assert rebuilt.transformers[0] == crop(left=0.1, top=2, right=1.0, bottom=0.9)
+
+def test_pickled_pipeline_gives_same_result():
+    pipeline = build_pipeline()
+    image = Image.new("RGBA", (40, 30), (255, 0, 0, 255))
+
+    rebuilt = pickle.loads(pickle.dumps(pipeline))
+
+    assert rebuilt(image).tobytes() == pipeline(image).tobytes()
+
+def test_operators_are_immutable():
+    operator = resize(width=10)
+
+    with pytest.raises(AttributeError):
+        operator.width = 20
+
+@pytest.mark.parametrize('operator', [gray_scale(), flip('h'), trim()])
+def test_every_operator_is_frozen(operator):
+    with pytest.raises(AttributeError):
+        operator.extra = 1
+
+def test_lambda_cannot_be_serialised():
+    operator = concat_map(lambda image: flip('h'))
+
+    with pytest.raises(ValueError):
+        operator.to_spec()
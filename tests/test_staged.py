@@ -0,0 +1,114 @@
+import threading
+import time
+from click.testing import CliRunner
+from PIL import Image, ImageChops
+from image_utils.batch import run_batch
+from image_utils.cli import cli
+from image_utils.operators import flip, gray_scale, resize
+from image_utils.pipeline import pipe
+from image_utils.staged import run_staged
+
+def _inputs(tmp_path, count=12):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f'{i:02d}.png'
+        Image.effect_noise((60 + i, 40), 50).convert('RGB').save(path)
+        paths.append(str(path))
+    return paths
+
+def test_run_staged_matches_sequential(tmp_path):
+    inputs = _inputs(tmp_path)
+    pipeline = pipe(resize(width=30), flip('h'), gray_scale())
+    sequential = list(run_batch(pipeline, inputs, str(tmp_path / 'seq')))
+    staged = list(run_batch(pipeline, inputs, str(tmp_path / 'staged'), threads=3, queue_depth=2))
+
+    assert [input_path for input_path, _, _ in staged] == inputs
+    assert all(error is None for _, _, error in staged)
+    for (_, expected, _), (_, actual, _) in zip(sequential, staged):
+        assert ImageChops.difference(Image.open(expected), Image.open(actual)).getbbox() is None
+
+def test_run_staged_reports_failures_in_order(tmp_path):
+    inputs = _inputs(tmp_path, 4)
+    (tmp_path / 'broken.png').write_bytes(b'not an image')
+    inputs.insert(2, str(tmp_path / 'broken.png'))
+    targets = [(path, str(tmp_path / f'out{i}.png')) for i, path in enumerate(inputs)]
+
+    results = list(run_staged(pipe(flip('v')), targets, threads=2))
+
+    assert [input_path for input_path, _, _ in results] == inputs
+    assert [error is None for _, _, error in results] == [True, True, False, True, True]
+    assert results[2][1] is None
+
+def test_run_staged_copies_unchanged_images(tmp_path):
+    inputs = _inputs(tmp_path, 2)
+    targets = [(path, str(tmp_path / f'copy{i}.png')) for i, path in enumerate(inputs)]
+
+    list(run_staged(pipe(), targets, threads=2))
+
+    for input_path, output_path in targets:
+        with open(input_path, 'rb') as source, open(output_path, 'rb') as copy:
+            assert source.read() == copy.read()
+
+def test_run_staged_overlaps_and_bounds_work(tmp_path):
+    inputs = _inputs(tmp_path, 16)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow(image):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+        return image.transpose(Image.FLIP_LEFT_RIGHT)
+
+    targets = [(path, str(tmp_path / f'o{i}.png')) for i, path in enumerate(inputs)]
+    results = list(run_staged(slow, targets, threads=3, queue_depth=1))
+
+    assert all(error is None for _, _, error in results)
+    assert 1 < max(peak) <= 3
+
+def test_run_staged_stops_when_abandoned(tmp_path):
+    inputs = _inputs(tmp_path, 30)
+    targets = [(path, str(tmp_path / f'o{i}.png')) for i, path in enumerate(inputs)]
+    before = threading.active_count()
+
+    results = run_staged(pipe(flip('h')), targets, threads=2, queue_depth=1)
+    next(results)
+    results.close()
+
+    deadline = time.time() + 5
+    while threading.active_count() > before and time.time() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() <= before
+
+def test_cli_threads(tmp_path):
+    _inputs(tmp_path, 5)
+    result = CliRunner().invoke(cli, ['flip', 'h', '--input-dir', str(tmp_path), '--output-dir',
+                                      str(tmp_path / 'out'), '--threads', '3', '--queue-depth', '2'])
+    assert result.exit_code == 0, result.output
+    assert len(list((tmp_path / 'out').iterdir())) == 5
+
+def test_cli_threads_single_image(tmp_path):
+    input_path = tmp_path / 'input.png'
+    Image.effect_noise((200, 300), 50).convert('RGB').save(input_path)
+    steps = ['flip', 'v', 'then', 'gray-scale']
+
+    banded = CliRunner().invoke(cli, ['run', '-i', str(input_path), '--threads', '3'] + steps)
+    plain = CliRunner().invoke(cli, ['run', '-i', str(input_path)] + steps)
+
+    assert banded.exit_code == 0, banded.output
+    assert banded.stdout_bytes == plain.stdout_bytes
+
+def test_run_staged_records_profiling_spans(tmp_path):
+    from image_utils.profiling import profile
+
+    inputs = _inputs(tmp_path, 3)
+    with profile() as profiler:
+        results = list(run_batch(pipe(flip('h')), inputs, str(tmp_path / 'out'), threads=2))
+
+    assert all(error is None for _, _, error in results)
+    names = [span.name for span in profiler.spans]
+    assert names.count('Pipeline') == names.count('FlipOperator') == 3
@@ -0,0 +1,139 @@
+import pytest
+from PIL import Image, ImageChops
+from io import BytesIO
+from image_utils.operators import crop, expand, flip, gray_scale, resize, roll, rotate, trim
+from image_utils.pipeline import pipe
+from image_utils.tiling import run_in_bands, run_in_strips, supports_strips
+
+def make_image(mode='RGBA', size=(60, 45)):
+    return Image.effect_noise(size, 90).convert(mode)
+
+@pytest.mark.parametrize('mode', ['RGBA', 'RGB', 'L'])
+@pytest.mark.parametrize('max_memory', [100, 1000, 10 ** 6])
+def test_strips_match_whole_image(mode, max_memory):
+    pipeline = pipe(
+        crop(left=3, top=0.1, right=0.9, bottom=40),
+        roll(shift=7, direction='b'),
+        flip('v'),
+        expand(width=70, height=60, align='rb', fillwithpos=(0, -1)),
+        roll(shift=5, direction='l'),
+        gray_scale(),
+        flip('h')
+    )
+    image = make_image(mode)
+
+    expected = pipeline(image)
+    actual, stats = run_in_strips(pipeline, image, max_memory=max_memory)
+
+    assert actual.mode == expected.mode
+    assert actual.tobytes() == expected.tobytes()
+    assert stats.strips >= 1
+
+def test_resize_in_strips_stays_close():
+    pipeline = pipe(resize(width=37), flip('v'))
+    image = make_image('RGB', (97, 83))
+
+    expected = pipeline(image)
+    actual, stats = run_in_strips(pipeline, image, max_memory=500)
+
+    assert stats.strips > 1
+    assert actual.size == expected.size
+    assert max(high for _, high in ImageChops.difference(expected, actual).getextrema()) <= 2
+
+def test_png_stream_matches_assembled_output():
+    pipeline = pipe(expand(width=80, height=50), flip('h'))
+    image = make_image('RGB')
+    buffer = BytesIO()
+
+    assembled, _ = run_in_strips(pipeline, image, max_memory=2000)
+    run_in_strips(pipeline, image, fp=buffer, max_memory=2000)
+    streamed = Image.open(BytesIO(buffer.getvalue()))
+
+    assert streamed.mode == assembled.mode
+    assert streamed.tobytes() == assembled.tobytes()
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_opaque_strips_match_save_image(stream):
+    from image_utils.image_io import save_image
+
+    image = Image.new('LA', (40, 30), (120, 60))
+    expected = BytesIO()
+    save_image(flip('h')(image), expected, 'PNG', opaque=True)
+    buffer = BytesIO()
+
+    assembled, _ = run_in_strips(pipe(flip('h')), image, fp=buffer if stream else None, max_memory=500,
+                                 opaque=True)
+    output = Image.open(buffer) if stream else assembled
+
+    assert output.mode == Image.open(expected).mode == 'L'
+
+@pytest.mark.parametrize('mode, expected', [('P', 'RGB'), ('1', 'L'), ('I', 'L'), ('CMYK', 'RGB')])
+def test_png_stream_converts_unstreamable_modes(mode, expected):
+    image = Image.new('RGB', (40, 30), 'red').convert(mode)
+    buffer = BytesIO()
+
+    run_in_strips(pipe(flip('h')), image, fp=buffer, max_memory=500)
+    streamed = Image.open(BytesIO(buffer.getvalue()))
+
+    assert streamed.mode == expected
+    assert streamed.tobytes() == flip('h')(image).convert(expected).tobytes()
+
+def test_unsupported_operator():
+    pipeline = pipe(flip('h'), rotate(angle=30))
+
+    assert not supports_strips(pipeline)
+    with pytest.raises(ValueError):
+        run_in_strips(pipeline, make_image())
+
+def test_resize_options_in_strips_stay_close():
+    image = make_image('RGB', (97, 83))
+
+    for operator in [resize(40, 40, fit='cover'), resize(width=30, resample='lanczos')]:
+        pipeline = pipe(operator)
+        expected = pipeline(image)
+        actual, stats = run_in_strips(pipeline, image, max_memory=500)
+
+        assert stats.strips > 1
+        assert actual.size == expected.size
+        assert max(high for _, high in ImageChops.difference(expected, actual).getextrema()) <= 2
+
+@pytest.mark.parametrize('mode', ['RGBA', 'L'])
+def test_bands_match_whole_image(mode):
+    pipeline = pipe(
+        crop(left=3, top=0.1, right=0.9, bottom=380),
+        roll(dx=11, dy=57),
+        flip('v'),
+        expand(width=160, height=420, align='rb', fillwith='#336699'),
+        gray_scale(),
+        flip('h'),
+        mode='RGB'
+    )
+    image = make_image(mode, (150, 400))
+
+    expected = pipeline(image)
+    actual = run_in_bands(pipeline, image, workers=3, bands=4)
+
+    assert actual.mode == expected.mode
+    assert actual.tobytes() == expected.tobytes()
+
+def test_bands_run_other_operators_whole():
+    image = make_image('RGB', (150, 400))
+    pipeline = pipe(resize(width=120), rotate(angle=90), flip('h'), trim(), resize(width=300))
+
+    expected = pipeline(image)
+    actual = pipeline.run_bands(image, workers=2, bands=5)
+
+    assert actual.size == expected.size
+    assert max(high for _, high in ImageChops.difference(expected, actual).getextrema()) <= 2
+
+def test_cli_max_memory_with_palette_input(tmp_path):
+    from click.testing import CliRunner
+    from image_utils.cli import cli
+
+    path = str(tmp_path / 'palette.png')
+    Image.new('RGB', (40, 30), 'red').convert('P').save(path)
+
+    result = CliRunner().invoke(cli, ['flip', 'h', '-i', path, '--max-memory', '1'])
+
+    assert result.exit_code == 0, result.output
+    assert Image.open(BytesIO(result.stdout_bytes)).getpixel((0, 0)) == (255, 0, 0)
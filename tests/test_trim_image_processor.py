@@ -0,0 +1,57 @@
+import random
+from PIL import Image
+from image_utils.operators import trim
+
+def make_page(size=(300, 200), box=(40, 30, 250, 170), margin=(250, 250, 250)):
+    # A near-white page with slightly noisy margins and dark content inside the box
+    rng = random.Random(0)
+    page = Image.new("RGB", size, margin)
+    for _ in range(200):
+        xy = (rng.randrange(size[0]), rng.randrange(size[1]))
+        page.putpixel(xy, tuple(value + rng.randint(-5, 5) for value in margin))
+    page.paste((20, 20, 20), box)
+    return page
+
+def test_trim_operator_matches_getbbox():
+    for mode in ["RGBA", "RGB", "LA", "L", "P"]:
+        image = Image.new(mode, (120, 90))
+        image.paste(Image.effect_noise((50, 20), 90).convert(mode), (7, 61))
+
+        trimmed_image = trim()(image)
+
+        assert trimmed_image.size == (50, 20)
+        assert trimmed_image.tobytes() == image.crop(image.getbbox()).tobytes()
+
+def test_trim_operator_with_tolerance():
+    page = make_page()
+
+    assert trim(background="#ffffff")(page).size == page.size
+    assert trim(background="#ffffff", tolerance=12)(page).size == (210, 140)
+    assert trim(background="auto", tolerance=6)(page).size == (210, 140)
+
+def test_trim_operator_with_tolerance_on_transparency():
+    image = Image.new("RGBA", (50, 50), (255, 0, 0, 8))
+    image.paste((0, 0, 255, 255), (10, 20, 15, 30))
+
+    assert trim()(image).size == (50, 50)
+    assert trim(tolerance=8)(image).size == (5, 10)
+
+def test_trim_operator_auto_background():
+    image = Image.new("RGB", (64, 48), "#123456")
+    image.paste((255, 255, 255), (3, 4, 60, 5))
+
+    trimmed_image = trim(background="auto")(image)
+
+    assert trimmed_image.size == (57, 1)
+
+def test_trim_operator_returns_input_without_margins():
+    image = Image.effect_noise((30, 30), 90).convert("RGB")
+    image.putpixel((0, 0), (1, 1, 1))
+    image.putpixel((29, 29), (1, 1, 1))
+
+    assert trim()(image) is image
+
+def test_trim_operator_blank_image():
+    trimmed_image = trim(background="#ffffff", tolerance=10)(make_page(box=(0, 0, 0, 0)))
+
+    assert trimmed_image.size == (1, 1)